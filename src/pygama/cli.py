@@ -10,10 +10,6 @@ import numpy as np
 
 import pygama
 import pygama.logging
-from pygama.dsp import build_dsp
-from pygama.hit import build_hit
-from pygama.lgdo import show
-from pygama.raw import build_raw
 
 
 def pygama_cli():
@@ -57,6 +53,8 @@ def pygama_cli():
     add_lh5ls_parser(subparsers)
     add_build_raw_parser(subparsers)
     add_build_dsp_parser(subparsers)
+    add_warmup_dsp_parser(subparsers)
+    add_benchmark_dsp_parser(subparsers)
     add_build_hit_parser(subparsers)
 
     if len(sys.argv) < 2:
@@ -97,6 +95,7 @@ def add_lh5ls_parser(subparsers):
 
 def lh5_show_cli(args):
     """Passes command line arguments to :func:`.lgdo.lh5_store.show`."""
+    from pygama.lgdo import show
 
     show(args.lh5_file, args.lh5_group)
 
@@ -138,12 +137,33 @@ def add_build_raw_parser(subparsers):
     parser_d2r.add_argument(
         "--overwrite", "-w", action="store_true", help="""Overwrite output files"""
     )
+    parser_d2r.add_argument(
+        "--dsp-config",
+        "-c",
+        help="""JSON DSP configuration file. If given, DSP-tier data is also
+                produced from the raw buffers, without reading back the raw
+                files""",
+    )
+    parser_d2r.add_argument(
+        "--database", "-d", help="""JSON file to read DB parameters from"""
+    )
+    parser_d2r.add_argument(
+        "--dsp-output",
+        help="""Output DSP file name. Defaults to the raw file name with the
+                _dsp.lh5 suffix""",
+    )
+    parser_d2r.add_argument(
+        "--no-raw",
+        action="store_true",
+        help="""Only write the DSP-tier data (requires --dsp-config)""",
+    )
 
     parser_d2r.set_defaults(func=build_raw_cli)
 
 
 def build_raw_cli(args):
     """Passes command line arguments to :func:`.raw.build_raw.build_raw`."""
+    from pygama.raw import build_raw
 
     for stream in args.in_stream:
         basename = os.path.splitext(os.path.basename(stream))[0]
@@ -154,6 +174,10 @@ def build_raw_cli(args):
             buffer_size=args.buffer_size,
             n_max=args.max_rows,
             overwrite=args.overwrite,
+            dsp_config=args.dsp_config,
+            database=args.database,
+            dsp_out_spec=args.dsp_output,
+            write_raw=not args.no_raw,
             orig_basename=basename,
         )
 
@@ -232,6 +256,35 @@ def add_build_dsp_parser(subparsers):
         help="""Number of waveforms to read from disk at a time. Default is
                 3200""",
     )
+    parser_r2d.add_argument(
+        "--profile",
+        action="store_true",
+        help="""Report wall time, number of calls and throughput of every
+                processor and I/O buffer copy. The report is also stored in
+                the output file, under dsp_info/profile""",
+    )
+    parser_r2d.add_argument(
+        "--autotune",
+        action="store_true",
+        help="""Ignore --chunk and --block and use the fastest values found by
+                timing the DSP config on the first rows of each table. The
+                results are cached (see PYGAMA_AUTOTUNE_CACHE) and stored in
+                the output file, under dsp_info/autotune""",
+    )
+    parser_r2d.add_argument(
+        "--max-memory",
+        default=None,
+        type=float,
+        help="""Memory budget for the buffers of each table, in MB. --chunk
+                and --block are reduced if needed to fit in it""",
+    )
+    parser_r2d.add_argument(
+        "--resume",
+        action="store_true",
+        help="""Record checkpoints while writing, continue output files left
+                incomplete by an interrupted job with --resume from their last
+                checkpoint, and skip complete ones""",
+    )
 
     group = parser_r2d.add_mutually_exclusive_group()
     group.add_argument(
@@ -260,12 +313,22 @@ def add_build_dsp_parser(subparsers):
         dest="writemode",
         help="""Append values to existing file""",
     )
+    group.add_argument(
+        "--incremental",
+        "-i",
+        action="store_const",
+        const="i",
+        dest="writemode",
+        help="""Update existing file, recomputing only the values whose
+                configuration or database parameters changed""",
+    )
 
     parser_r2d.set_defaults(func=build_dsp_cli)
 
 
 def build_dsp_cli(args):
     """Passes command line arguments to :func:`.dsp.build_dsp.build_dsp`."""
+    from pygama.dsp import build_dsp
 
     if len(args.raw_lh5_file) > 1 and args.output is not None:
         raise NotImplementedError("not possible to set multiple output file names yet")
@@ -296,7 +359,208 @@ def build_dsp_cli(args):
             write_mode=args.writemode,
             buffer_len=args.chunk,
             block_width=args.block,
+            profile=args.profile,
+            autotune=args.autotune,
+            max_memory=(
+                None if args.max_memory is None else int(args.max_memory * 1024**2)
+            ),
+            resume=args.resume,
+        )
+
+
+def add_warmup_dsp_parser(subparsers):
+    """Configure :func:`.dsp.warmup.warmup` command line interface"""
+
+    parser_warmup = subparsers.add_parser(
+        "warmup-dsp",
+        description="""Compile the DSP processors ahead of time and store them
+        in Numba's on-disk cache""",
+    )
+    parser_warmup.add_argument(
+        "raw_lh5_file",
+        nargs="?",
+        default=None,
+        help="""Input raw LH5 file used to run the DSP configuration""",
+    )
+    parser_warmup.add_argument(
+        "--config",
+        "-c",
+        default=None,
+        help="""JSON file holding configuration of signal processing routines.
+                Requires an input raw LH5 file""",
+    )
+    parser_warmup.add_argument(
+        "--hdf5-groups",
+        "-g",
+        nargs="*",
+        default=None,
+        help="""Name of group in the LH5 file. By default process all base
+                groups. Supports wildcards""",
+    )
+    parser_warmup.add_argument(
+        "--database",
+        "-d",
+        default=None,
+        help="""JSON file to read database parameters from""",
+    )
+    parser_warmup.add_argument(
+        "--cache-dir",
+        default=None,
+        help="""Directory to store the compiled code in. By default use the
+                NUMBA_CACHE_DIR environment variable or Numba's default""",
+    )
+    parser_warmup.add_argument(
+        "--max-rows",
+        "-n",
+        default=16,
+        type=int,
+        help="""Number of rows of each table to process. Default is 16""",
+    )
+    parser_warmup.add_argument(
+        "--fftw-wisdom",
+        default=None,
+        help="""File to store FFTW wisdom for the FFTs of the DSP config in.
+                Point the PYGAMA_FFTW_WISDOM environment variable to it to use
+                it in later jobs""",
+    )
+
+    parser_warmup.set_defaults(func=warmup_dsp_cli)
+
+
+def warmup_dsp_cli(args):
+    """Passes command line arguments to :func:`.dsp.warmup.warmup`."""
+    from pygama.dsp import warmup
+
+    warmup(
+        dsp_config=args.config,
+        f_raw=args.raw_lh5_file,
+        lh5_tables=args.hdf5_groups,
+        database=args.database,
+        cache_dir=args.cache_dir,
+        n_max=args.max_rows,
+        fftw_wisdom=args.fftw_wisdom,
+    )
+
+
+def add_benchmark_dsp_parser(subparsers):
+    """Configure :func:`.dsp.benchmark.run_benchmarks` command line interface"""
+
+    parser_bench = subparsers.add_parser(
+        "benchmark-dsp",
+        description="""Measure the throughput of the DSP processors and
+        configurations on synthetic waveforms, and compare it to a baseline""",
+    )
+    parser_bench.add_argument(
+        "--config",
+        "-c",
+        nargs="*",
+        default=[],
+        help="""JSON files holding DSP configurations to benchmark. Append
+                ':sipm' to a file name to run it on SiPM waveforms""",
+    )
+    parser_bench.add_argument(
+        "--processors",
+        "-p",
+        nargs="*",
+        default=None,
+        help="""Processors to benchmark. By default benchmark all of them,
+                give the option without names to benchmark none""",
+    )
+    parser_bench.add_argument(
+        "--n-wfs",
+        "-n",
+        default=1000,
+        type=int,
+        help="""Number of waveforms to process. Default is 1000""",
+    )
+    parser_bench.add_argument(
+        "--dtype",
+        default="uint16",
+        help="""Data type of the waveforms. Default is uint16""",
+    )
+    parser_bench.add_argument(
+        "--block-widths",
+        nargs="+",
+        default=None,
+        type=int,
+        help="""Block widths to run the configurations with""",
+    )
+    parser_bench.add_argument(
+        "--repeat",
+        default=3,
+        type=int,
+        help="""Number of timed runs, the best is kept. Default is 3""",
+    )
+    parser_bench.add_argument(
+        "--output",
+        "-o",
+        default=None,
+        help="""JSON file to write the results to""",
+    )
+    parser_bench.add_argument(
+        "--baseline",
+        "-b",
+        default=None,
+        help="""JSON file with results to compare to. Exit with an error if
+                anything got slower by more than the tolerance""",
+    )
+    parser_bench.add_argument(
+        "--results",
+        default=None,
+        help="""JSON file with results to compare to the baseline, instead of
+                running the benchmarks""",
+    )
+    parser_bench.add_argument(
+        "--tolerance",
+        default=0.25,
+        type=float,
+        help="""Largest fractional loss of throughput allowed by the
+                comparison. Default is 0.25""",
+    )
+
+    parser_bench.set_defaults(func=benchmark_dsp_cli)
+
+
+def benchmark_dsp_cli(args):
+    """Passes command line arguments to :func:`.dsp.benchmark.run_benchmarks`
+    and :func:`.dsp.benchmark.compare`."""
+    import json
+
+    from pygama.dsp.benchmark import compare, run_benchmarks
+
+    if args.results is not None:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        results = run_benchmarks(
+            configs=[tuple(c.rsplit(":", 1)) if ":" in c else c for c in args.config],
+            processors=args.processors,
+            n_wfs=args.n_wfs,
+            dtype=args.dtype,
+            block_widths=args.block_widths,
+            repeat=args.repeat,
         )
+        if args.output is not None:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+    log = logging.getLogger("pygama")
+    for name, rate in results["processors"].items():
+        log.info(f"{name:30} {rate:12.0f} wf/s")
+    for name, chain in results["chains"].items():
+        for block_width, rate in chain.items():
+            if block_width != "build_time":
+                label = f"{name} ({block_width})"
+                log.info(f"{label:30} {rate:12.0f} wf/s")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            log.error(regression)
+        if regressions:
+            sys.exit(1)
 
 
 def add_build_hit_parser(subparsers):
@@ -381,6 +645,7 @@ def add_build_hit_parser(subparsers):
 
 def build_hit_cli(args):
     """Passes command line arguments to :func:`.hit.build_hit.build_hit`."""
+    from pygama.hit import build_hit
 
     if len(args.dsp_lh5_file) > 1 and args.output is not None:
         raise NotImplementedError("not possible to set multiple output file names yet")
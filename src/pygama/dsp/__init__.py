@@ -15,9 +15,33 @@ main contents of this submodule are:
 * :func:`.build_dsp`: A function that runs :func:`.build_processing_chain` to build a
   :class:`.ProcessingChain` from a JSON config file and then processes an input
   file and writes into an output file, using the LH5 file format
+* :func:`.build_dsp_multi`: A function that runs several DSP configurations on
+  one read of the input file
+* :func:`.warmup`: A function that compiles the processors ahead of time and
+  stores them in Numba's on-disk cache
+* :func:`.autotune`: A function that finds the fastest block width and buffer
+  length of :func:`.build_dsp` for a configuration
+* :mod:`.registry`: The registry of the processors and of their properties
+* :mod:`.kernel_cache`: A cache of the filter kernels computed by factory
+  processors
+* :mod:`.benchmark`: Throughput benchmarks of the processors and of DSP
+  configurations on synthetic waveforms
 """
 
-from pygama.dsp.build_dsp import build_dsp
-from pygama.dsp.processing_chain import ProcessingChain, build_processing_chain
+import sys
 
-__all__ = ["build_dsp", "ProcessingChain", "build_processing_chain"]
+from pygama.dsp.utils import LazyPackage
+
+# imported from their module on first access
+__lazy__ = {
+    "build_dsp": "build_dsp",
+    "build_dsp_multi": "build_dsp",
+    "ProcessingChain": "processing_chain",
+    "build_processing_chain": "processing_chain",
+    "warmup": "warmup",
+    "autotune": "autotune",
+}
+
+__all__ = list(__lazy__)
+
+sys.modules[__name__].__class__ = LazyPackage
@@ -0,0 +1,387 @@
+"""
+This module provides routines for choosing the block width and buffer length
+used by :func:`~.build_dsp.build_dsp`, by timing a DSP configuration on the
+first rows of a raw table or by fitting its buffers in a memory budget.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import platform
+import tempfile
+import time
+from typing import Any
+
+import h5py
+
+import pygama.lgdo.lh5_store as lh5
+from pygama.dsp.build_dsp import (
+    _get_processing_chain,
+    _proc_chain_cache,
+    _release_processing_chain,
+)
+from pygama.dsp.processing_chain import build_processing_chain
+
+log = logging.getLogger(__name__)
+
+#: Block widths tried by :func:`autotune`.
+block_widths = [8, 16, 32, 64, 128]
+
+#: Buffer lengths tried by :func:`autotune`. They are rounded up to a multiple
+#: of the block width.
+buffer_lens = [800, 1600, 3200, 6400]
+
+#: Default memory budget of :func:`autotune` in bytes.
+max_memory_default = 2 * 1024**3
+
+#: JSON file the results of :func:`autotune` are cached in. Defaults to the
+#: ``PYGAMA_AUTOTUNE_CACHE`` environment variable, or
+#: ``~/.cache/pygama/dsp_autotune.json``.
+cache_file = os.getenv(
+    "PYGAMA_AUTOTUNE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pygama", "dsp_autotune.json"),
+)
+
+
+def autotune(
+    f_raw: str,
+    lh5_table: str,
+    dsp_config: dict,
+    db_dict: dict = None,
+    outputs: list[str] = None,
+    max_memory: int = None,
+    n_rows: int = 6400,
+    use_cache: bool = True,
+) -> dict[str, Any]:
+    """Find the fastest block width and buffer length for a DSP configuration.
+
+    The processing chain is first timed on `n_rows` rows of `lh5_table` for
+    every block width in :data:`block_widths`, then reading the rows is timed
+    for every buffer length in :data:`buffer_lens`. Only
+    the combinations whose estimated memory use (the chain's variables for a
+    block plus the input and output buffers) is below `max_memory` are
+    considered.
+
+    The result is cached in :data:`cache_file` for the configuration, the
+    layout of the input table (e.g. the waveform length, read from the file
+    metadata) and the host, so later calls return immediately, without
+    reading any rows.
+
+    Parameters
+    ----------
+    f_raw
+        name of the raw-tier LH5 file.
+    lh5_table
+        name of the table in `f_raw` to time the configuration on.
+    dsp_config
+        :class:`~.processing_chain.ProcessingChain` configuration. See
+        :func:`~.processing_chain.build_processing_chain`.
+    db_dict
+        parameter database of the table. See
+        :func:`~.processing_chain.build_processing_chain`.
+    outputs
+        list of parameters to write. If ``None``, use the ``"outputs"`` of
+        `dsp_config`.
+    max_memory
+        memory budget in bytes. Defaults to :data:`max_memory_default`.
+    n_rows
+        number of rows to time the configuration on.
+    use_cache
+        if ``False``, always run the calibration (the result is still stored
+        in the cache).
+
+    Returns
+    -------
+    settings
+        a :class:`dict` with keys ``block_width``, ``buffer_len``,
+        ``memory`` (estimated memory use in bytes) and ``time_per_row``
+        (seconds, as measured during the calibration).
+    """
+    if max_memory is None:
+        max_memory = max_memory_default
+
+    store = lh5.LH5Store()
+    n_rows = min(n_rows, store.read_n_rows(lh5_table, f_raw))
+    if n_rows == 0:
+        raise ValueError(f"{lh5_table} in {f_raw} is empty")
+
+    key = hashlib.sha1(
+        json.dumps(
+            [
+                dsp_config,
+                db_dict,
+                outputs,
+                _h5_layout(f_raw, lh5_table),
+                platform.node(),
+                max_memory,
+                block_widths,
+                buffer_lens,
+            ],
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+    if use_cache:
+        settings = _load_cache().get(key)
+        if settings is not None:
+            log.debug(f"using cached autotune settings for {lh5_table}: {settings}")
+            return settings
+
+    lh5_in, n_rows = store.read_object(lh5_table, f_raw, n_rows=n_rows)
+
+    # time the processors for every block width
+    cached_bytes = _cached_chains_nbytes()
+    field_mask = None
+    exec_times = {}
+    bytes_per_row = {}
+    for block_width in block_widths:
+        proc_chain, field_mask, _ = build_processing_chain(
+            lh5_in, dsp_config, db_dict, outputs, block_width
+        )
+        # the first execution compiles what is compiled on first use, and
+        # allocates the arrays of the processors
+        proc_chain.execute(0, min(block_width, n_rows))
+        fixed_bytes, block_bytes, io_bytes = _bytes_per_row(proc_chain.memory_report())
+        fixed_bytes += cached_bytes
+        memory = fixed_bytes + block_bytes * block_width + io_bytes * min(buffer_lens)
+        # the smallest settings are always tried, even if over budget
+        if memory > max_memory and exec_times:
+            continue
+        bytes_per_row[block_width] = (fixed_bytes, block_bytes, io_bytes)
+
+        proc_chain.execute(0, n_rows)
+        exec_times[block_width] = min(
+            _time(proc_chain.execute, 0, n_rows) for _ in range(3)
+        )
+        log.debug(f"block_width {block_width}: {exec_times[block_width]:.3f} s")
+    block_width = min(exec_times, key=exec_times.get)
+    fixed_bytes, block_bytes, io_bytes = bytes_per_row[block_width]
+
+    # the processing time does not depend on the buffer length, so only
+    # reading the input is timed for every buffer length
+    read_times = {}
+    for buffer_len in buffer_lens:
+        buffer_len = math.ceil(buffer_len / block_width) * block_width
+        memory = fixed_bytes + block_bytes * block_width + io_bytes * buffer_len
+        if memory > max_memory and read_times:
+            continue
+
+        lh5_it = lh5.LH5Iterator(
+            f_raw, lh5_table, field_mask=field_mask, buffer_len=buffer_len
+        )
+        t_start = time.perf_counter()
+        entry = 0
+        while entry < n_rows:
+            entry += lh5_it.read(entry)[1]
+        read_times[buffer_len] = (time.perf_counter() - t_start) * n_rows / entry
+        log.debug(f"buffer_len {buffer_len}: {read_times[buffer_len]:.3f} s")
+    buffer_len = min(read_times, key=read_times.get)
+
+    memory = fixed_bytes + block_bytes * block_width + io_bytes * buffer_len
+    if memory > max_memory:
+        log.warning(
+            f"the DSP configuration needs {memory/1024**2:.0f} MB for "
+            f"{lh5_table}, more than the budget of {max_memory/1024**2:.0f} MB"
+        )
+
+    settings = {
+        "block_width": block_width,
+        "buffer_len": buffer_len,
+        "memory": int(memory),
+        "time_per_row": (exec_times[block_width] + read_times[buffer_len]) / n_rows,
+    }
+    log.info(f"autotuned settings for {lh5_table}: {settings}")
+    _save_cache(key, settings)
+    return settings
+
+
+def plan_memory(
+    f_raw: str,
+    lh5_table: str,
+    dsp_config: dict,
+    db_dict: dict = None,
+    outputs: list[str] = None,
+    max_memory: int = None,
+    block_width: int = 16,
+    buffer_len: int = 3200,
+) -> dict[str, Any]:
+    """Reduce the block width and buffer length to fit a memory budget.
+
+    The memory used by a processing chain grows linearly with the block width
+    (internal variables) and the buffer length (input and output buffers).
+    The bytes per row of both are measured with
+    :meth:`~.processing_chain.ProcessingChain.memory_report` on a chain built
+    for the first buffer of `lh5_table` and executed on its first block, so
+    that the arrays the processors allocate (e.g. FFT buffers) are counted
+    too, together with the chains cached by :func:`~.build_dsp.build_dsp`.
+    If `block_width` and `buffer_len` do not fit in `max_memory`, the buffer
+    length is reduced first, then the block width is halved until they do.
+    If they fit, the chain is cached so that :func:`~.build_dsp.build_dsp`
+    reuses it.
+
+    Parameters
+    ----------
+    f_raw
+        name of the raw-tier LH5 file.
+    lh5_table
+        name of the table in `f_raw`.
+    dsp_config
+        :class:`~.processing_chain.ProcessingChain` configuration. See
+        :func:`~.processing_chain.build_processing_chain`.
+    db_dict
+        parameter database of the table.
+    outputs
+        list of parameters to write. If ``None``, use the ``"outputs"`` of
+        `dsp_config`.
+    max_memory
+        memory budget in bytes. Defaults to :data:`max_memory_default`.
+    block_width
+        requested block width.
+    buffer_len
+        requested buffer length.
+
+    Returns
+    -------
+    settings
+        a :class:`dict` with keys ``block_width``, ``buffer_len`` and
+        ``memory`` (estimated memory use in bytes).
+    """
+    if max_memory is None:
+        max_memory = max_memory_default
+
+    # read the first buffer as build_dsp does, to build the same chain
+    lh5_it = lh5.LH5Iterator(f_raw, lh5_table, buffer_len=buffer_len)
+    lh5_in, n_rows = lh5_it.read(0)
+    if n_rows == 0:
+        raise ValueError(f"{lh5_table} in {f_raw} is empty")
+    proc_chain, _, _ = _get_processing_chain(
+        lh5_in, dsp_config, db_dict, outputs, block_width
+    )
+    # the arrays of some processors are only allocated on the first execution
+    proc_chain.execute(0, min(block_width, n_rows))
+    fixed_bytes, block_bytes, io_bytes = _bytes_per_row(proc_chain.memory_report())
+    fixed_bytes += _cached_chains_nbytes()
+    requested = (block_width, buffer_len)
+
+    # a buffer must hold at least one block
+    while (
+        block_width > 1
+        and fixed_bytes + (block_bytes + io_bytes) * block_width > max_memory
+    ):
+        block_width //= 2
+    if io_bytes > 0:
+        max_buffer_len = int(
+            (max_memory - fixed_bytes - block_bytes * block_width) / io_bytes
+        )
+        if buffer_len > max_buffer_len:
+            buffer_len = max(max_buffer_len // block_width, 1) * block_width
+
+    # build_dsp reuses the chain if the settings are kept
+    if (block_width, buffer_len) == requested:
+        _release_processing_chain(proc_chain)
+
+    memory = fixed_bytes + block_bytes * block_width + io_bytes * buffer_len
+    if memory > max_memory:
+        log.warning(
+            f"the DSP configuration needs {memory/1024**2:.0f} MB for "
+            f"{lh5_table}, more than the budget of {max_memory/1024**2:.0f} MB"
+        )
+
+    settings = {
+        "block_width": block_width,
+        "buffer_len": buffer_len,
+        "memory": int(memory),
+    }
+    log.info(f"memory planned settings for {lh5_table}: {settings}")
+    return settings
+
+
+def _h5_layout(f_raw: str, lh5_table: str) -> list:
+    """Description of the data types, shapes of the elements and attributes
+    of the datasets in `lh5_table`, from the file metadata (and the sampling
+    period of the first waveform), as :func:`.build_dsp._lgdo_layout` does for
+    a table in memory.
+    """
+    layout = []
+
+    def visit(name: str, obj: h5py.Group | h5py.Dataset) -> None:
+        attrs = sorted((k, str(v)) for k, v in obj.attrs.items())
+        if isinstance(obj, h5py.Dataset):
+            layout.append((name, attrs, obj.dtype.str, obj.shape[1:]))
+            if name.split("/")[-1] == "dt" and obj.ndim == 1 and len(obj) > 0:
+                layout.append((name, float(obj[0])))
+        else:
+            layout.append((name, attrs))
+
+    with h5py.File(f_raw, "r") as f:
+        visit("", f[lh5_table])
+        f[lh5_table].visititems(visit)
+    return layout
+
+
+def _time(func, *args) -> float:
+    t_start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t_start
+
+
+def _bytes_per_row(report: dict[str, Any]) -> tuple[float, float, float]:
+    """Bytes of the arrays held by the processors, and bytes per row of the
+    chain's variables and of its I/O buffers, from a
+    :meth:`~.processing_chain.ProcessingChain.memory_report`."""
+    proc_bytes = sum(proc["bytes"] for proc in report["processors"])
+    var_bytes = sum(var["bytes"] for var in report["variables"])
+    io_bytes = sum(buf["bytes"] for buf in report["inputs"] + report["outputs"])
+    return (
+        proc_bytes,
+        var_bytes / report["block_width"],
+        io_bytes / report["buffer_len"],
+    )
+
+
+def _cached_chains_nbytes() -> int:
+    """Bytes held by the processing chains cached by :func:`.build_dsp`."""
+    return sum(
+        proc_chain.memory_report()["total"] for proc_chain in _proc_chain_cache.values()
+    )
+
+
+_cache = None
+
+
+def _load_cache() -> dict:
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if cache_file is not None and os.path.isfile(cache_file):
+            try:
+                with open(cache_file) as f:
+                    _cache = json.load(f)
+            except (OSError, ValueError):
+                log.warning(f"could not read autotune cache {cache_file}")
+    return _cache
+
+
+def _save_cache(key: str, settings: dict[str, Any]) -> None:
+    global _cache
+    _cache = None
+    cache = _load_cache()
+    cache[key] = settings
+    if cache_file is None:
+        return
+
+    # write to a temporary file first, so that concurrent jobs never read a
+    # partially written file
+    try:
+        dir_name = os.path.dirname(os.path.abspath(cache_file))
+        os.makedirs(dir_name, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=dir_name, delete=False) as f:
+            json.dump(cache, f, indent=2)
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, cache_file)
+    except OSError:
+        log.warning(f"could not write autotune cache {cache_file}")
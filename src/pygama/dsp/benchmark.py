@@ -0,0 +1,961 @@
+"""
+This module provides a benchmark suite for the DSP: it measures the throughput
+(waveforms per second) of every processor in :mod:`pygama.dsp.processors` and
+of full DSP configurations on synthetic waveforms, and compares the results to
+a baseline.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from typing import Any
+
+import numba
+import numpy as np
+
+import pygama
+from pygama import lgdo
+from pygama.dsp.processing_chain import build_processing_chain
+
+log = logging.getLogger(__name__)
+
+#: Block widths tried by :func:`benchmark_chain` by default.
+default_block_widths = [8, 16, 32, 64]
+
+#: Default waveform length of :func:`synthetic_waveforms` for each kind of
+#: detector.
+wf_lens = {"hpge": 5592, "sipm": 4000}
+
+# processors the benchmarked processors are computed from
+_hpge_prereqs = {
+    "wf_blsub": {
+        "function": "bl_subtract",
+        "module": "pygama.dsp.processors",
+        "args": ["waveform", "baseline", "wf_blsub"],
+        "unit": "ADC",
+    },
+    "bl_mean, bl_std, bl_slope, bl_intercept": {
+        "function": "linear_slope_fit",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_blsub[0:750]", "bl_mean", "bl_std", "bl_slope", "bl_intercept"],
+        "unit": ["ADC", "ADC", "ADC", "ADC"],
+    },
+    "wf_pz": {
+        "function": "pole_zero",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_blsub", "400*us", "wf_pz"],
+        "unit": "ADC",
+    },
+    "wf_trap": {
+        "function": "trap_norm",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_pz", "4*us", "1*us", "wf_trap"],
+        "unit": "ADC",
+    },
+    "tp_trapmin, tp_trapmax, trapTmin, trapTmax": {
+        "function": "min_max",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_trap", "tp_trapmin", "tp_trapmax", "trapTmin", "trapTmax"],
+        "unit": ["ns", "ns", "ADC", "ADC"],
+    },
+    "tp_0": {
+        "function": "time_point_thresh",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_pz", "0.1*trapTmax", "tp_trapmax", 0, "tp_0"],
+        "unit": "ns",
+    },
+    "wf_le": {
+        "function": "windower",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_pz", "tp_0", "wf_le(301, 'f')"],
+        "unit": "ADC",
+    },
+    "wf_dft": {
+        "function": "dft",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_blsub", "wf_dft"],
+        "init_args": ["wf_blsub", "wf_dft(len(wf_blsub)//2+1, 'complex64')"],
+    },
+}
+
+_sipm_prereqs = {
+    "wf_gaus": {
+        "function": "gaussian_filter1d",
+        "module": "pygama.dsp.processors",
+        "args": ["waveform", "wf_gaus(len(waveform))"],
+        "init_args": ["1", "4.0"],
+        "unit": "ADC",
+    },
+    "curr": {
+        "function": "avg_current",
+        "module": "pygama.dsp.processors",
+        "args": ["wf_gaus", 5, "curr(len(wf_gaus)-5)"],
+        "unit": "ADC",
+    },
+    "hist_weights, hist_borders": {
+        "function": "histogram",
+        "module": "pygama.dsp.processors",
+        "args": ["curr", "hist_weights(100)", "hist_borders(101)"],
+        "unit": ["none", "ADC"],
+    },
+    "fwhm, idx_out_c, max_out": {
+        "function": "histogram_stats",
+        "module": "pygama.dsp.processors",
+        "args": [
+            "hist_weights",
+            "hist_borders",
+            "idx_out_c",
+            "max_out",
+            "fwhm",
+            "np.nan",
+        ],
+        "unit": ["ADC", "none", "ADC"],
+    },
+    "vt_max, vt_min, n_max, n_min, flag": {
+        "function": "get_multi_local_extrema",
+        "module": "pygama.dsp.processors",
+        "args": [
+            "curr",
+            5,
+            "3*fwhm",
+            0,
+            "vt_max(20)",
+            "vt_min(20)",
+            "n_max",
+            "n_min",
+            "flag",
+        ],
+        "unit": ["ns", "ns", "none", "none", "none"],
+    },
+}
+
+
+def _proc(function: str, args: list, unit: str | list = "ADC", **kwargs) -> dict:
+    return {
+        "function": function,
+        "module": "pygama.dsp.processors",
+        "args": args,
+        "unit": unit,
+        **kwargs,
+    }
+
+
+_cusp_args = ["len(wf_blsub)-100", "20*us/wf_blsub.period", "3*us/wf_blsub.period"]
+_cusp_bank_args = ["len(wf_blsub)-100", "[625, 1250, 1875]", "187"]
+
+#: Processing chains used by :func:`benchmark_processors`, as
+#: ``(kind, key, node)`` tuples: `kind` is the kind of waveforms passed to
+#: :func:`synthetic_waveforms`, `key` and `node` the configuration of the
+#: benchmarked processor (see
+#: :func:`~.processing_chain.build_processing_chain`). Its inputs are
+#: computed by a few common processors, which are not included in the
+#: throughput.
+processor_benchmarks = {
+    "bl_subtract": (
+        "hpge",
+        "out",
+        _proc("bl_subtract", ["waveform", "baseline", "out"]),
+    ),
+    "cusp_filter": (
+        "hpge",
+        "out",
+        _proc(
+            "cusp_filter",
+            ["wf_blsub", "out(101, 'f')"],
+            init_args=_cusp_args + ["400*us/wf_blsub.period"],
+        ),
+    ),
+    "cusp_filter_bank": (
+        "hpge",
+        "out",
+        _proc(
+            "cusp_filter_bank",
+            ["wf_blsub", "out([3, 101], 'f')"],
+            init_args=_cusp_bank_args + ["25000"],
+        ),
+    ),
+    "t0_filter": (
+        "hpge",
+        "out",
+        _proc(
+            "t0_filter",
+            ["wf_pz", "out(len(wf_pz), 'f', grid=wf_pz.grid)"],
+            init_args=["128*ns/wf_pz.period", "2*us/wf_pz.period"],
+        ),
+    ),
+    "zac_filter": (
+        "hpge",
+        "out",
+        _proc(
+            "zac_filter",
+            ["wf_blsub", "out(101, 'f')"],
+            init_args=_cusp_args + ["400*us/wf_blsub.period"],
+        ),
+    ),
+    "zac_filter_bank": (
+        "hpge",
+        "out",
+        _proc(
+            "zac_filter_bank",
+            ["wf_blsub", "out([3, 101], 'f')"],
+            init_args=_cusp_bank_args + ["25000"],
+        ),
+    ),
+    "discrete_wavelet_transform": (
+        "hpge",
+        "out",
+        _proc(
+            "discrete_wavelet_transform",
+            ["wf_blsub", "out(len(wf_blsub)//8)"],
+            init_args=["'haar'", "3"],
+        ),
+    ),
+    "dft": (
+        "hpge",
+        "out",
+        _proc(
+            "dft",
+            ["wf_blsub", "out"],
+            init_args=["wf_blsub", "out(len(wf_blsub)//2+1, 'complex64')"],
+            unit=None,
+        ),
+    ),
+    "inv_dft": (
+        "hpge",
+        "out",
+        _proc(
+            "inv_dft",
+            ["wf_dft", "out"],
+            init_args=["wf_dft", "out(len(wf_blsub), 'f')"],
+            unit=None,
+        ),
+    ),
+    "psd": (
+        "hpge",
+        "out",
+        _proc(
+            "psd",
+            ["wf_blsub", "out"],
+            init_args=["wf_blsub", "out(len(wf_blsub)//2+1, 'f')"],
+        ),
+    ),
+    "wiener_filter": (
+        "hpge",
+        "out",
+        # the filter file is written by benchmark_processors
+        _proc(
+            "wiener_filter", ["wf_dft", "out"], init_args=["db.wiener_file"], unit=None
+        ),
+    ),
+    "fixed_time_pickoff": (
+        "hpge",
+        "out",
+        _proc("fixed_time_pickoff", ["wf_trap", "tp_0+5*us", "'l'", "out"]),
+    ),
+    "gaussian_filter1d": (
+        "hpge",
+        "out",
+        _proc(
+            "gaussian_filter1d",
+            ["wf_pz", "out(len(wf_pz))"],
+            init_args=["5", "4.0"],
+        ),
+    ),
+    "get_multi_local_extrema": (
+        "sipm",
+        "out_max, out_min, out_n_max, out_n_min, out_flag",
+        _proc(
+            "get_multi_local_extrema",
+            [
+                "curr",
+                5,
+                "3*fwhm",
+                0,
+                "out_max(20)",
+                "out_min(20)",
+                "out_n_max",
+                "out_n_min",
+                "out_flag",
+            ],
+            unit=["ns", "ns", "none", "none", "none"],
+        ),
+    ),
+    "histogram": (
+        "sipm",
+        "out, out_borders",
+        _proc(
+            "histogram",
+            ["curr", "out(100)", "out_borders(101)"],
+            unit=["none", "ADC"],
+        ),
+    ),
+    "histogram_stats": (
+        "sipm",
+        "out, out_idx, out_max",
+        _proc(
+            "histogram_stats",
+            ["hist_weights", "hist_borders", "out_idx", "out_max", "out", "np.nan"],
+            unit=["ADC", "none", "ADC"],
+        ),
+    ),
+    "linear_slope_fit": (
+        "hpge",
+        "out, out_std, out_slope, out_intercept",
+        _proc(
+            "linear_slope_fit",
+            ["wf_blsub[0:750]", "out", "out_std", "out_slope", "out_intercept"],
+            unit=["ADC", "ADC", "ADC", "ADC"],
+        ),
+    ),
+    "log_check": ("hpge", "out", _proc("log_check", ["wf_pz[3000:]", "out"])),
+    "min_max": (
+        "hpge",
+        "out, out_tp_max, out_min, out_max",
+        _proc(
+            "min_max",
+            ["waveform", "out", "out_tp_max", "out_min", "out_max"],
+            unit=["ns", "ns", "ADC", "ADC"],
+        ),
+    ),
+    "avg_current": (
+        "hpge",
+        "out",
+        _proc("avg_current", ["wf_pz", 1, "out(len(wf_pz)-1, 'f')"]),
+    ),
+    "moving_window_left": (
+        "hpge",
+        "out",
+        _proc("moving_window_left", ["wf_pz", "96*ns", "out"]),
+    ),
+    "moving_window_multi": (
+        "hpge",
+        "out",
+        _proc("moving_window_multi", ["wf_pz", "96*ns", 3, 0, "out"]),
+    ),
+    "moving_window_right": (
+        "hpge",
+        "out",
+        _proc("moving_window_right", ["wf_pz", "96*ns", "out"]),
+    ),
+    "multi_a_filter": (
+        "sipm",
+        "out",
+        _proc("multi_a_filter", ["curr", "vt_max", "out(20)"]),
+    ),
+    "multi_t_filter": (
+        "sipm",
+        "out",
+        _proc(
+            "multi_t_filter",
+            ["curr", "fwhm", "vt_max", "vt_min", "out(20)"],
+            unit="ns",
+        ),
+    ),
+    "remove_duplicates": (
+        "sipm",
+        "out",
+        _proc("remove_duplicates", ["vt_max", "vt_min", "out(20)"], unit="ns"),
+    ),
+    "optimize_1pz": (
+        "hpge",
+        "out",
+        _proc(
+            "optimize_1pz",
+            ["waveform", "baseline", "0", "20*us", "500*us", "out"],
+            unit="us",
+        ),
+    ),
+    "optimize_2pz": (
+        "hpge",
+        "out, out_tau2, out_frac",
+        _proc(
+            "optimize_2pz",
+            [
+                "waveform",
+                "baseline",
+                "0",
+                "20*us",
+                "500*us",
+                "20*us",
+                "0.02",
+                "out",
+                "out_tau2",
+                "out_frac",
+            ],
+            unit="us",
+        ),
+    ),
+    "double_pole_zero": (
+        "hpge",
+        "out",
+        _proc("double_pole_zero", ["wf_blsub", "400*us", "20*us", "0.02", "out"]),
+    ),
+    "pole_zero": ("hpge", "out", _proc("pole_zero", ["wf_blsub", "400*us", "out"])),
+    "presum": (
+        "hpge",
+        "out",
+        _proc("presum", ["wf_blsub", "out(len(wf_blsub)//4, 'f')"]),
+    ),
+    "inject_exp_pulse": (
+        "hpge",
+        "out",
+        _proc("inject_exp_pulse", ["wf_blsub", 1000, 100, 500, "400*us", "out"]),
+    ),
+    "inject_sig_pulse": (
+        "hpge",
+        "out",
+        _proc("inject_sig_pulse", ["wf_blsub", 1000, 100, 500, "400*us", "out"]),
+    ),
+    "saturation": (
+        "hpge",
+        "out, out_hi",
+        _proc("saturation", ["waveform", "16", "out", "out_hi"]),
+    ),
+    "peak_snr_threshold": (
+        "sipm",
+        "out, out_n",
+        _proc(
+            "peak_snr_threshold",
+            ["curr", "vt_max", 0.8, 10, "out", "out_n"],
+            unit=["ns", "none"],
+        ),
+    ),
+    "soft_pileup_corr": (
+        "hpge",
+        "out",
+        _proc("soft_pileup_corr", ["waveform", "1000", "400*us", "out"]),
+    ),
+    "soft_pileup_corr_bl": (
+        "hpge",
+        "out",
+        _proc("soft_pileup_corr_bl", ["waveform", "1000", "400*us", "baseline", "out"]),
+    ),
+    "time_point_thresh": (
+        "hpge",
+        "out",
+        _proc(
+            "time_point_thresh",
+            ["wf_pz", "0.5*trapTmax", "tp_trapmax", 1, "out"],
+            unit="ns",
+        ),
+    ),
+    "interpolated_time_point_thresh": (
+        "hpge",
+        "out",
+        _proc(
+            "interpolated_time_point_thresh",
+            ["wf_pz", "0.5*trapTmax", "tp_trapmax", 0, "'s'", "out"],
+            unit="ns",
+        ),
+    ),
+    "asym_trap_filter": (
+        "hpge",
+        "out",
+        _proc("asym_trap_filter", ["wf_pz", "128*ns", "64*ns", "2*us", "out"]),
+    ),
+    "trap_filter": (
+        "hpge",
+        "out",
+        _proc("trap_filter", ["wf_pz", "10*us", "3*us", "out"]),
+    ),
+    "trap_filter_bank": (
+        "hpge",
+        "out",
+        _proc(
+            "trap_filter_bank", ["wf_pz", "[250, 500, 750]", "[125, 125, 125]", "out"]
+        ),
+    ),
+    "trap_norm": ("hpge", "out", _proc("trap_norm", ["wf_pz", "10*us", "3*us", "out"])),
+    "trap_pickoff": (
+        "hpge",
+        "out",
+        _proc("trap_pickoff", ["wf_pz", "1.5*us", 0, "tp_0", "out"]),
+    ),
+    "trap_pickoff_bank": (
+        "hpge",
+        "out",
+        _proc(
+            "trap_pickoff_bank",
+            ["wf_pz", "[250, 500, 750]", "[125, 125, 125]", "tp_0", "out"],
+        ),
+    ),
+    "upsampler": (
+        "hpge",
+        "out",
+        _proc("upsampler", ["wf_le", "16", "out(len(wf_le)*16, 'f')"]),
+    ),
+    "interpolating_upsampler": (
+        "hpge",
+        "out",
+        _proc(
+            "interpolating_upsampler",
+            ["wf_le", "'s'", "out(len(wf_le)*16, period=wf_le.period/16)"],
+        ),
+    ),
+    "windower": ("hpge", "out", _proc("windower", ["wf_pz", "tp_0", "out(301, 'f')"])),
+    "time_over_threshold": (
+        "hpge",
+        "out",
+        _proc("time_over_threshold", ["wf_pz", "0.5*trapTmax", "out"], unit="ns"),
+    ),
+    "subline": (
+        "hpge",
+        "out",
+        _proc("subline", ["wf_blsub", "bl_slope", "bl_intercept", "out"]),
+    ),
+    "denoise_wave": ("hpge", "out", _proc("denoise_wave", ["waveform", "3", "out"])),
+    "moving_window_max": (
+        "hpge",
+        "out, out_times",
+        _proc(
+            "moving_window_max",
+            ["waveform", "0.7*us", "0.2*us", "out", "out_times"],
+        ),
+    ),
+}
+
+#: Processors that :func:`benchmark_processors` cannot run on synthetic
+#: waveforms, with the reason.
+skipped_processors = {
+    "param_lookup": "needs a channel map, which the configuration cannot express",
+}
+
+
+def synthetic_waveforms(
+    n_wfs: int = 1000,
+    kind: str = "hpge",
+    wf_len: int = None,
+    dtype: str = "uint16",
+    dt: float = 16,
+    noise: float = None,
+    pileup: float = 0.05,
+    seed: int = None,
+) -> lgdo.Table:
+    """Generate a table of synthetic raw waveforms.
+
+    ``hpge`` waveforms are charge pulses of an HPGe detector: a baseline,
+    the exponentially decaying tail of a previous pulse for some waveforms,
+    and a step with a rise time of a few hundred ns and a 400 µs exponential
+    decay, at 45 % of the waveform. ``sipm`` waveforms hold a few SiPM pulses
+    (a few photo-electrons with a 100 ns decay) at 40 % of the waveform, on top
+    of dark counts. In both cases, Gaussian noise is added, and with
+    probability `pileup` a second pulse at a random time.
+
+    Parameters
+    ----------
+    n_wfs
+        number of waveforms.
+    kind
+        ``hpge`` or ``sipm``.
+    wf_len
+        number of samples of the waveforms. Defaults to :data:`wf_lens`.
+    dtype
+        data type of the waveforms. Samples are rounded for integer types.
+    dt
+        sampling period in ns.
+    noise
+        standard deviation of the noise in ADC. Defaults to 3 for ``hpge``
+        and 2 for ``sipm``.
+    pileup
+        probability of a second pulse in a waveform.
+    seed
+        seed of the random number generator.
+
+    Returns
+    -------
+    table
+        a :class:`~.lgdo.table.Table` with columns ``waveform``
+        (:class:`~.lgdo.waveform_table.WaveformTable`), ``baseline`` (the
+        baseline level), ``timestamp`` and ``channel``.
+    """
+    if kind not in wf_lens:
+        raise ValueError(f"unknown kind of waveforms {kind}")
+    if wf_len is None:
+        wf_len = wf_lens[kind]
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(wf_len) * dt
+
+    if kind == "hpge":
+        bl = 10000.0
+        if noise is None:
+            noise = 3.0
+        wfs = _hpge_pulse(
+            t,
+            t[int(wf_len * 0.45)] + rng.normal(0, 50, size=(n_wfs, 1)),
+            rng.uniform(50, 5000, size=(n_wfs, 1)),
+            rng.uniform(200, 800, size=(n_wfs, 1)),
+        )
+        # tail of a previous pulse
+        tail = rng.random(size=(n_wfs, 1)) < 0.3
+        wfs += (
+            tail
+            * rng.uniform(0, 500, size=(n_wfs, 1))
+            * np.exp(-(t + rng.uniform(0, 400000, size=(n_wfs, 1))) / 400000)
+        )
+        wfs += (rng.random(size=(n_wfs, 1)) < pileup) * _hpge_pulse(
+            t,
+            rng.uniform(0, t[-1], size=(n_wfs, 1)),
+            rng.uniform(50, 5000, size=(n_wfs, 1)),
+            rng.uniform(200, 800, size=(n_wfs, 1)),
+        )
+    else:
+        bl = 1000.0
+        if noise is None:
+            noise = 2.0
+        n_pe = rng.poisson(3, size=(n_wfs, 1)) + 1
+        wfs = _sipm_pulse(
+            t, t[int(wf_len * 0.4)] + rng.normal(0, 20, size=(n_wfs, 1)), 30 * n_pe
+        )
+        # dark counts and pileup
+        for i in range(3):
+            wfs += (rng.random(size=(n_wfs, 1)) < (pileup if i == 0 else 0.2)) * (
+                _sipm_pulse(t, rng.uniform(0, t[-1], size=(n_wfs, 1)), 30)
+            )
+    wfs += bl + rng.normal(0, noise, size=wfs.shape)
+
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        info = np.iinfo(dtype)
+        wfs = np.clip(np.round(wfs), info.min, info.max)
+
+    tbl = lgdo.Table(size=n_wfs)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=np.zeros(n_wfs),
+            t0_units="ns",
+            dt=np.full(n_wfs, float(dt)),
+            dt_units="ns",
+            values=wfs.astype(dtype),
+            values_units="ADC",
+        ),
+    )
+    tbl.add_field("baseline", lgdo.Array(np.full(n_wfs, bl, dtype=dtype)))
+    tbl.add_field("timestamp", lgdo.Array(np.cumsum(rng.exponential(0.01, size=n_wfs))))
+    tbl.add_field("channel", lgdo.Array(np.zeros(n_wfs, dtype="uint32")))
+    return tbl
+
+
+def _hpge_pulse(
+    t: np.ndarray, t0: np.ndarray, amp: np.ndarray, rise: np.ndarray
+) -> np.ndarray:
+    # 10-90 % rise time of a logistic function is 2*log(9) times its scale
+    rising = 1 / (1 + np.exp(-np.clip((t - t0) * 4.39 / rise, -50, 50)))
+    return amp * rising * np.exp(-np.maximum(t - t0, 0) / 400000)
+
+
+def _sipm_pulse(t: np.ndarray, t0: np.ndarray, amp: np.ndarray) -> np.ndarray:
+    dt = np.maximum(t - t0, 0)
+    return amp * (1 - np.exp(-dt / 10)) * np.exp(-dt / 100)
+
+
+def benchmark_processors(
+    processors: list[str] = None,
+    n_wfs: int = 1000,
+    wf_len: int = None,
+    dtype: str = "uint16",
+    block_width: int = 16,
+    repeat: int = 3,
+    seed: int = 1234,
+) -> dict[str, float]:
+    """Measure the throughput of DSP processors.
+
+    Every processor is run on :func:`synthetic_waveforms` in a
+    :class:`~.processing_chain.ProcessingChain` configured from
+    :data:`processor_benchmarks`, and its time is taken from the chain's
+    :meth:`~.processing_chain.ProcessingChain.profile_report`. The best of
+    `repeat` runs is kept, after a first run that compiles what is compiled on
+    first use.
+
+    Parameters
+    ----------
+    processors
+        names of the processors to benchmark. Defaults to all the processors
+        in :data:`processor_benchmarks`.
+    n_wfs
+        number of waveforms to process.
+    wf_len
+        number of samples of the waveforms. Defaults to :data:`wf_lens`.
+    dtype
+        data type of the waveforms.
+    block_width
+        block width of the processing chains.
+    repeat
+        number of timed runs.
+    seed
+        seed of the random number generator used to generate the waveforms.
+
+    Returns
+    -------
+    throughput
+        waveforms per second of each processor.
+    """
+    if processors is None:
+        processors = list(processor_benchmarks)
+
+    tables = {}
+    results = {}
+    # files read by the factories (e.g. wiener_filter) are written on demand
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in processors:
+            if name in skipped_processors:
+                log.warning(f"skipping {name}: {skipped_processors[name]}")
+                continue
+            kind, key, node = processor_benchmarks[name]
+            if kind not in tables:
+                tables[kind] = synthetic_waveforms(
+                    n_wfs, kind, wf_len=wf_len, dtype=dtype, seed=seed
+                )
+
+            prereqs = _hpge_prereqs if kind == "hpge" else _sipm_prereqs
+            dsp_config = {
+                "outputs": [key.split(",")[0].strip()],
+                "processors": {**prereqs, key: node},
+            }
+            db_dict = {}
+            if "db.wiener_file" in node.get("init_args", []):
+                db_dict["wiener_file"] = [_wiener_file(tables[kind], tmp_dir)]
+            proc_chain, _, _ = build_processing_chain(
+                tables[kind], dsp_config, db_dict, block_width=block_width
+            )
+            proc_chain.execute(0, n_wfs)
+
+            # the benchmarked processor is added to the chain after its inputs,
+            # only the unit conversions of its outputs come after it
+            proc_time = np.inf
+            for _ in range(repeat):
+                proc_chain.enable_profiling()
+                proc_chain.execute(0, n_wfs)
+                report = proc_chain.profile_report()["processors"]
+                stats = [p for p in report if not p["name"].startswith("convert(")][-1]
+                proc_time = min(proc_time, stats["time"])
+            proc_chain.enable_profiling(False)
+            results[name] = n_wfs / proc_time
+            log.info(f"{name}: {results[name]:.0f} wf/s")
+
+    return results
+
+
+def _wiener_file(tbl: lgdo.Table, dir_name: str) -> str:
+    """Write the superpulse and noise waveform :func:`.wiener_filter` reads
+    for the spectra of the waveforms in `tbl` (of length ``wf_len//2+1``),
+    and return the name of the file.
+    """
+    n = tbl["waveform"].values.nda.shape[1] // 2 + 1
+    file_name = os.path.join(dir_name, f"wiener_{n}.lh5")
+    if not os.path.isfile(file_name):
+        t = np.arange(n)
+        superpulse = np.where(t > n // 10, np.exp(-(t - n // 10) / (n / 10)), 0)
+        noise_wf = np.random.default_rng(1234).normal(size=n)
+        store = lgdo.LH5Store()
+        for name, wf in (("superpulse", superpulse), ("noise_wf", noise_wf)):
+            store.write_object(lgdo.Array(wf), name, file_name, group="spms/processed")
+    return file_name
+
+
+def benchmark_chain(
+    dsp_config: str | dict,
+    kind: str = "hpge",
+    database: str | dict = None,
+    n_wfs: int = 1000,
+    wf_len: int = None,
+    dtype: str = "uint16",
+    block_widths: list[int] = None,
+    repeat: int = 3,
+    seed: int = 1234,
+) -> dict[str, float]:
+    """Measure the throughput of a DSP configuration.
+
+    The configuration is built with
+    :func:`~.processing_chain.build_processing_chain` on
+    :func:`synthetic_waveforms` and executed for several block widths. The
+    best of `repeat` runs is kept, after a first run that compiles what is
+    compiled on first use.
+
+    Parameters
+    ----------
+    dsp_config
+        :class:`dict` or name of JSON file containing a
+        :class:`~.processing_chain.ProcessingChain` config.
+    kind
+        kind of waveforms, see :func:`synthetic_waveforms`.
+    database
+        dictionary or name of JSON file containing a parameter database.
+    n_wfs
+        number of waveforms to process.
+    wf_len
+        number of samples of the waveforms. Defaults to :data:`wf_lens`.
+    dtype
+        data type of the waveforms.
+    block_widths
+        block widths to try. Defaults to :data:`default_block_widths`.
+    repeat
+        number of timed runs.
+    seed
+        seed of the random number generator used to generate the waveforms.
+
+    Returns
+    -------
+    throughput
+        waveforms per second for each block width (as a string), and the
+        time to build the chain in seconds under ``build_time``.
+    """
+    if isinstance(dsp_config, str):
+        with open(dsp_config) as f:
+            dsp_config = json.load(f)
+    if isinstance(database, str):
+        with open(database) as f:
+            database = json.load(f)
+    if block_widths is None:
+        block_widths = default_block_widths
+
+    tbl = synthetic_waveforms(n_wfs, kind, wf_len=wf_len, dtype=dtype, seed=seed)
+    results = {}
+    build_time = np.inf
+    for block_width in block_widths:
+        t_start = time.perf_counter()
+        proc_chain, _, _ = build_processing_chain(
+            tbl, dsp_config, database, block_width=block_width
+        )
+        build_time = min(build_time, time.perf_counter() - t_start)
+        proc_chain.execute(0, n_wfs)
+        exec_time = min(_time(proc_chain.execute, 0, n_wfs) for _ in range(repeat))
+        results[str(block_width)] = n_wfs / exec_time
+        log.info(f"block_width {block_width}: {results[str(block_width)]:.0f} wf/s")
+    results["build_time"] = build_time
+    return results
+
+
+def run_benchmarks(
+    configs: list[str | tuple[str, str]] = None,
+    processors: list[str] = None,
+    n_wfs: int = 1000,
+    dtype: str = "uint16",
+    block_widths: list[int] = None,
+    repeat: int = 3,
+) -> dict[str, Any]:
+    """Run :func:`benchmark_processors` and :func:`benchmark_chain`.
+
+    Parameters
+    ----------
+    configs
+        names of JSON files holding DSP configurations, or ``(file, kind)``
+        tuples to run them on another kind of waveforms than ``hpge`` (see
+        :func:`synthetic_waveforms`).
+    processors
+        names of the processors to benchmark. Defaults to all of them, pass an
+        empty list to skip them.
+
+    The remaining parameters are passed to :func:`benchmark_processors` and
+    :func:`benchmark_chain`.
+
+    Returns
+    -------
+    results
+        a :class:`dict` with keys ``info`` (versions, host and settings),
+        ``processors`` (waveforms per second of each processor) and
+        ``chains`` (the result of :func:`benchmark_chain` for each
+        configuration, by file name without extension). Suitable as a
+        baseline for :func:`compare`.
+    """
+    results = {
+        "info": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "numba_version": numba.__version__,
+            "pygama_version": pygama.__version__,
+            "n_wfs": n_wfs,
+            "dtype": dtype,
+        },
+        "processors": {},
+        "chains": {},
+    }
+    if processors is None or len(processors) > 0:
+        results["processors"] = benchmark_processors(
+            processors, n_wfs=n_wfs, dtype=dtype, repeat=repeat
+        )
+    for config in configs if configs is not None else []:
+        config, kind = (config, "hpge") if isinstance(config, str) else config
+        name = os.path.splitext(os.path.basename(config))[0]
+        log.info(f"benchmarking {name}")
+        results["chains"][name] = benchmark_chain(
+            config,
+            kind,
+            n_wfs=n_wfs,
+            dtype=dtype,
+            block_widths=block_widths,
+            repeat=repeat,
+        )
+    return results
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.25
+) -> list[str]:
+    """Compare benchmark results to a baseline.
+
+    Parameters
+    ----------
+    results
+        output of :func:`run_benchmarks`.
+    baseline
+        output of :func:`run_benchmarks` to compare to, e.g. on the main
+        branch.
+    tolerance
+        largest fractional loss of throughput that is not a regression.
+        Timings fluctuate by a few percent between runs, and much more between
+        machines.
+
+    Returns
+    -------
+    regressions
+        a description of every processor and configuration slower than in
+        `baseline` by more than `tolerance`. Benchmarks missing from either
+        are ignored.
+    """
+    if results["info"].get("host") != baseline["info"].get("host"):
+        log.warning(
+            "the baseline was measured on another host "
+            f"({baseline['info'].get('host')}), expect large differences"
+        )
+
+    pairs = []
+    for name, rate in results["processors"].items():
+        if name in baseline["processors"]:
+            pairs.append((name, rate, baseline["processors"][name]))
+    for name, chain in results["chains"].items():
+        for block_width, rate in chain.items():
+            if block_width != "build_time" and block_width in baseline["chains"].get(
+                name, {}
+            ):
+                pairs.append(
+                    (
+                        f"{name} (block_width {block_width})",
+                        rate,
+                        baseline["chains"][name][block_width],
+                    )
+                )
+
+    regressions = []
+    for name, rate, base_rate in pairs:
+        if rate < base_rate * (1 - tolerance):
+            regressions.append(
+                f"{name}: {rate:.0f} wf/s, {100 * (1 - rate / base_rate):.0f}% "
+                f"slower than the baseline ({base_rate:.0f} wf/s)"
+            )
+    return regressions
+
+
+def _time(func, *args) -> float:
+    t_start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t_start
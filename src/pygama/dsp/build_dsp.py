@@ -9,6 +9,10 @@ import logging
 import os
 import sys
 import time
+import weakref
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Any
 
 import h5py
 import numpy as np
@@ -18,10 +22,34 @@ import pygama
 import pygama.lgdo as lgdo
 import pygama.lgdo.lh5_store as lh5
 from pygama.dsp.errors import DSPFatal
-from pygama.dsp.processing_chain import build_processing_chain
+from pygama.dsp.processing_chain import (
+    ProcessingChain,
+    _identifiers,
+    _max_vector_length,
+    _produced_names,
+    build_processing_chain,
+    merge_dsp_configs,
+    recipe_hashes,
+)
+from pygama.lgdo.lgdo_utils import parse_datatype
+from pygama.math.units import unit_registry as ureg
 
 log = logging.getLogger(__name__)
 
+#: Maximum number of processing chains kept by :func:`build_dsp` to be reused
+#: by later files and tables with the same configuration and input layout
+#: (the least recently used chains are dropped first). The cached chains
+#: keep their internal buffers (`block_width` rows) and factory processors,
+#: but not the input and output buffers. Set to 0 to disable the cache.
+#: Defaults to the ``PYGAMA_CHAIN_CACHE`` environment variable, or 4.
+chain_cache_size = int(os.getenv("PYGAMA_CHAIN_CACHE", "4"))
+
+# released chains, see _get_processing_chain and _release_processing_chain
+_proc_chain_cache = OrderedDict()
+# chains in use -> (cache key, field mask, output fields, copied fields,
+# output attributes)
+_proc_chain_keys = weakref.WeakKeyDictionary()
+
 
 def build_dsp(
     f_raw: str,
@@ -35,6 +63,10 @@ def build_dsp(
     buffer_len: int = 3200,
     block_width: int = 16,
     chan_config: dict[str, str] = None,
+    profile: bool = False,
+    autotune: bool = False,
+    max_memory: int = None,
+    resume: bool = False,
 ) -> None:
     """Convert raw-tier LH5 data into dsp-tier LH5 data by running a sequence
     of processors via the :class:`~.processing_chain.ProcessingChain`.
@@ -65,6 +97,13 @@ def build_dsp(
         - `'r'` -- delete existing output file with same name before writing
         - `'a'` -- append to end of existing output file
         - `'u'` -- update values in existing output file
+        - `'i'` -- incremental update of an existing output file: only the
+          outputs whose recipe (processors and database values, including
+          those of their inputs) changed since the file was written are
+          recomputed and overwritten. Unchanged parameters the changed ones
+          depend on are read back from `f_dsp` instead of being recomputed,
+          if that reads less data than recomputing them. The recipes are
+          stored (as hashes) in ``dsp_info/recipes``.
     buffer_len
         number of waveforms to read/write from/to disk at a time.
     block_width
@@ -72,12 +111,46 @@ def build_dsp(
     chan_config
         contains JSON DSP configuration file names for every table in
         `lh5_tables`.
+    profile
+        if ``True``, accumulate the wall time, number of calls and bytes
+        touched by every processor and I/O buffer copy (see
+        :meth:`~.processing_chain.ProcessingChain.profile_report`). A summary
+        is logged for each table and the full report is stored as a JSON
+        string in ``dsp_info/profile``.
+    autotune
+        if ``True``, ignore `buffer_len` and `block_width` and use the fastest
+        values found by :func:`~.autotune.autotune` for each table instead.
+        The results are cached, so the (short) calibration only runs the
+        first time a configuration is used on a host. The chosen values are
+        stored as a JSON string in ``dsp_info/autotune``.
+    max_memory
+        memory budget in bytes for the buffers of each table. If given,
+        `buffer_len` (and, if needed, `block_width`) are reduced with
+        :func:`~.autotune.plan_memory` so that the estimate of
+        :meth:`~.processing_chain.ProcessingChain.memory_report` fits in it.
+        With `autotune`, only settings within the budget are tried.
+    resume
+        if ``True``, record the progress of the call so that it can be
+        resumed and, if `f_dsp` was left incomplete by an interrupted call with
+        `resume`, continue where it stopped. Before a table is written and
+        after every buffer written, the table, number of rows written and a
+        hash of the configuration are recorded in ``dsp_info/checkpoint``.
+        When resuming, the configuration is checked against the hash, rows
+        written after the last checkpoint are removed, completed tables are
+        skipped and the others continue from the last checkpoint. Unless
+        `write_mode` is ``'a'``, tables without a checkpoint are written again
+        from scratch. Without `resume`, no checkpoint is written.
+        Not supported with `write_mode` ``'u'`` or ``'i'``, which do not
+        append rows.
     """
 
+    if resume and write_mode in ["u", "i"]:
+        raise ValueError(f"resume is not supported with write_mode '{write_mode}'")
+
     if chan_config is not None:
         # clear existing output files
         if write_mode == "r":
-            if os.path.isfile(f_dsp):
+            if os.path.isfile(f_dsp) and not (resume and _has_checkpoint(f_dsp)):
                 os.remove(f_dsp)
             write_mode = "a"
 
@@ -95,6 +168,10 @@ def build_dsp(
                     write_mode,
                     buffer_len,
                     block_width,
+                    profile=profile,
+                    autotune=autotune,
+                    max_memory=max_memory,
+                    resume=resume,
                 )
             except RuntimeError:
                 log.debug(f"table {tb} not found")
@@ -113,26 +190,7 @@ def build_dsp(
         raise ValueError(f"input file not found: {f_raw}")
         return
 
-    # if no group is specified, assume we want to decode every table in the file
-    if lh5_tables is None:
-        lh5_tables = lh5.ls(f_raw)
-    elif isinstance(lh5_tables, str):
-        lh5_tables = [lh5_tables]
-    elif not (
-        hasattr(lh5_tables, "__iter__")
-        and all(isinstance(el, str) for el in lh5_tables)
-    ):
-        raise RuntimeError("lh5_tables must be None, a string, or a list of strings")
-
-    # check if group points to raw data; sometimes 'raw' is nested, e.g g024/raw
-    for i, tb in enumerate(lh5_tables):
-        if "raw" not in tb and lh5.ls(lh5_file, f"{tb}/raw"):
-            lh5_tables[i] = f"{tb}/raw"
-        elif not lh5.ls(lh5_file, tb):
-            del lh5_tables[i]
-
-    if len(lh5_tables) == 0:
-        raise RuntimeError(f"could not find any valid LH5 table in {f_raw}")
+    lh5_tables = _raw_tables(lh5_file, f_raw, lh5_tables)
 
     # load DSP config (default: one config file for all tables)
     if isinstance(dsp_config, str):
@@ -149,24 +207,29 @@ def build_dsp(
         database = None
         raise ValueError("input database is not a valid JSON file or dict")
 
-    if write_mode is None and os.path.isfile(f_dsp):
+    # tables of f_dsp with a checkpoint are resumed or, if complete, skipped
+    resuming = resume and _has_checkpoint(f_dsp)
+
+    if write_mode is None and os.path.isfile(f_dsp) and not resuming:
         raise FileExistsError(
             f"output file {f_dsp} exists. Set the 'write_mode' keyword"
         )
 
     # clear existing output files
-    if write_mode == "r":
+    if write_mode == "r" and not resuming:
         if os.path.isfile(f_dsp):
             os.remove(f_dsp)
 
+    checkpoint = {}
+    if os.path.isfile(f_dsp):
+        checkpoint = _read_json_info(raw_store, f_dsp, "checkpoint")
+
     # write processing metadata
-    dsp_info = lgdo.Struct()
-    dsp_info.add_field("timestamp", lgdo.Scalar(np.uint64(time.time())))
-    dsp_info.add_field("python_version", lgdo.Scalar(sys.version))
-    dsp_info.add_field("numpy_version", lgdo.Scalar(np.version.version))
-    dsp_info.add_field("h5py_version", lgdo.Scalar(h5py.version.version))
-    dsp_info.add_field("hdf5_version", lgdo.Scalar(h5py.version.hdf5_version))
-    dsp_info.add_field("pygama_version", lgdo.Scalar(pygama.__version__))
+    dsp_info = _dsp_info()
+
+    profiles = {}
+    autotuned = {}
+    recipes = {}
 
     # loop over tables to run DSP on
     for tb in lh5_tables:
@@ -179,24 +242,148 @@ def build_dsp(
         db_dict = database.get(chan_name) if database else None
         tb_name = tb.replace("/raw", "/dsp")
 
+        tb_outputs = outputs if outputs is not None else dsp_config["outputs"]
+        hashes = recipe_hashes(dsp_config, db_dict)
+        recipes[tb] = {out: hashes.get(out, "input") for out in tb_outputs}
+        config_hash = sha1(
+            json.dumps(
+                [dsp_config, db_dict, tb_outputs], sort_keys=True, default=str
+            ).encode()
+        ).hexdigest()
+
         write_offset = 0
+        first_row = 0
         raw_store.gimme_file(f_dsp, "a")
-        if write_mode == "a" and lh5.ls(f_dsp, tb_name):
+        if resuming and tb in checkpoint:
+            tb_checkpoint = checkpoint[tb]
+            if tb_checkpoint["config"] != config_hash:
+                raise ValueError(
+                    f"cannot resume {tb_name} in {f_dsp}, the DSP configuration "
+                    "or database changed"
+                )
+            if tb_checkpoint["done"]:
+                log.info(f"{tb_name} in {f_dsp} is complete")
+                continue
+            # drop the rows written after the last checkpoint
+            with h5py.File(f_dsp, "a") as dsp_file:
+                _truncate(dsp_file[tb_name], tb_checkpoint["rows"])
+            write_offset = tb_checkpoint["start"]
+            first_row = tb_checkpoint["rows"] - write_offset
+            log.info(f"resuming {tb_name} in {f_dsp} at row {first_row}")
+        elif resuming and write_mode != "a" and lh5.ls(f_dsp, tb_name):
+            # the table was being written when the job stopped, before
+            # anything was recorded for it
+            log.info(f"overwriting the incomplete {tb_name} in {f_dsp}")
+            with h5py.File(f_dsp, "a") as dsp_file:
+                del dsp_file[tb_name]
+        elif write_mode == "a" and lh5.ls(f_dsp, tb_name):
             write_offset = raw_store.read_n_rows(tb_name, f_dsp)
 
+        tb_config, read_back = dsp_config, []
+        old_fields = []
+        if write_mode in ["u", "i"] and lh5.ls(f_dsp, tb_name):
+            old_fields = _table_fields(raw_store, f_dsp, tb_name)
+        if write_mode == "i" and old_fields:
+            tb_config, read_back = _incremental_config(
+                raw_store,
+                f_raw,
+                tb,
+                f_dsp,
+                tb_name,
+                tot_n_rows,
+                dsp_config,
+                recipes[tb],
+            )
+            tb_outputs = tb_config["outputs"]
+            if not tb_outputs:
+                log.info(f"{tb_name} in {f_dsp} is up to date")
+                continue
+            log.info(f"updating {tb_outputs} in {tb_name}, reading back {read_back}")
+
+        tb_buffer_len, tb_block_width = buffer_len, block_width
+        if autotune and tot_n_rows > 0:
+            from pygama.dsp.autotune import autotune as autotune_chain
+
+            autotuned[tb] = autotune_chain(
+                f_raw, tb, dsp_config, db_dict, tb_outputs, max_memory
+            )
+            tb_buffer_len = autotuned[tb]["buffer_len"]
+            tb_block_width = autotuned[tb]["block_width"]
+        elif max_memory is not None and tot_n_rows > 0:
+            from pygama.dsp.autotune import plan_memory
+
+            planned = plan_memory(
+                f_raw,
+                tb,
+                dsp_config,
+                db_dict,
+                tb_outputs,
+                max_memory,
+                block_width,
+                buffer_len,
+            )
+            tb_buffer_len = planned["buffer_len"]
+            tb_block_width = planned["block_width"]
+
+        # record where the table starts before writing to it, so that the
+        # rows of an interrupted first write are removed when resuming too
+        if resume and not (resuming and tb in checkpoint):
+            checkpoint[tb] = {
+                "config": config_hash,
+                "start": write_offset,
+                "rows": write_offset,
+                "done": False,
+            }
+            _write_checkpoint(raw_store, f_dsp, checkpoint)
+
         # Main processing loop
-        lh5_it = lh5.LH5Iterator(f_raw, tb, buffer_len=buffer_len)
+        lh5_it = lh5.LH5Iterator(f_raw, tb, buffer_len=tb_buffer_len)
+        dsp_it = None
+        if read_back:
+            # open f_dsp for writing first, or it could not be written while
+            # it is open for reading
+            dsp_file = h5py.File(f_dsp, "a")
+            dsp_it = lh5.LH5Iterator(
+                f_dsp, tb_name, field_mask=read_back, buffer_len=tb_buffer_len
+            )
         proc_chain = None
-        for lh5_in, start_row, n_rows in lh5_it:
+        progress_bar = None
+        vec_lens = {}
+        tb_profiles = []
+        for lh5_in, start_row, n_rows in _iterate(lh5_it, first_row):
+            if dsp_it is not None:
+                dsp_in, _ = dsp_it.read(start_row)
+                lh5_in = lgdo.Table(
+                    size=lh5_in.size, col_dict=dict(lh5_in.items()) | dict(dsp_in)
+                )
+
+            # vectors are padded to the longest one of the buffer the chain
+            # was built from, so longer ones need a new chain
+            if proc_chain is not None and _needs_longer_vectors(lh5_in, vec_lens):
+                log.debug(f"rebuilding the processing chain of {tb} at {start_row}")
+                if profile:
+                    tb_profiles.append(proc_chain.profile_report())
+                _release_processing_chain(proc_chain)
+                proc_chain = None
+
             # Initialize
             if proc_chain is None:
-                proc_chain, lh5_it.field_mask, tb_out = build_processing_chain(
-                    lh5_in, dsp_config, db_dict, outputs, block_width
+                proc_chain, field_mask, tb_out = _get_processing_chain(
+                    lh5_in, tb_config, db_dict, tb_outputs, tb_block_width
                 )
-                if log.level <= logging.INFO:
+                vec_lens = _max_vector_lengths(lh5_in)
+                lh5_it.field_mask = [f for f in field_mask if f not in read_back]
+                if profile:
+                    proc_chain.enable_profiling()
+                log.debug(
+                    f"buffers of {tb} use "
+                    f"{proc_chain.memory_report()['total']/1024**2:.1f} MB"
+                )
+                if log.level <= logging.INFO and progress_bar is None:
                     progress_bar = tqdm(
                         desc=f"Processing table {tb}",
                         total=tot_n_rows,
+                        initial=first_row,
                         delay=2,
                         unit="rows",
                         file=sys.stdout,
@@ -215,9 +402,17 @@ def build_dsp(
                 name=tb_name,
                 lh5_file=f_dsp,
                 n_rows=n_rows,
-                wo_mode="o" if write_mode == "u" else "a",
+                wo_mode="o" if write_mode in ["u", "i"] else "a",
                 write_start=write_offset + start_row,
             )
+            if resume:
+                checkpoint[tb] = {
+                    "config": config_hash,
+                    "start": write_offset,
+                    "rows": write_offset + start_row + n_rows,
+                    "done": False,
+                }
+                _write_checkpoint(raw_store, f_dsp, checkpoint)
 
             if log.level <= logging.INFO:
                 progress_bar.update(n_rows)
@@ -225,7 +420,574 @@ def build_dsp(
             if start_row + n_rows >= tot_n_rows:
                 break
 
-        if log.level <= logging.INFO:
+        if log.level <= logging.INFO and proc_chain is not None:
             progress_bar.close()
+        if tb in checkpoint:
+            checkpoint[tb]["done"] = True
+            _write_checkpoint(raw_store, f_dsp, checkpoint)
+        if dsp_it is not None:
+            for h5f in dsp_it.lh5_st.files.values():
+                h5f.close()
+            dsp_file.close()
+
+        # overwriting some of the columns must not drop the others
+        if old_fields:
+            fields = old_fields + [f for f in tb_out.keys() if f not in old_fields]
+            raw_store.gimme_file(f_dsp, "a")[tb_name].attrs[
+                "datatype"
+            ] = f"table{{{','.join(fields)}}}"
+
+        if profile and proc_chain is not None:
+            profiles[tb] = _merge_profiles(tb_profiles + [proc_chain.profile_report()])
+            log.info(_format_profile(tb, profiles[tb]))
+        if proc_chain is not None:
+            _release_processing_chain(proc_chain)
+
+    # keep the values for tables processed by previous calls
+    old_recipes = _read_json_info(raw_store, f_dsp, "recipes")
+    for tb, tb_recipes in recipes.items():
+        if write_mode in ["u", "i"]:
+            tb_recipes = old_recipes.get(tb, {}) | tb_recipes
+        old_recipes[tb] = tb_recipes
+    dsp_info.add_field("recipes", lgdo.Scalar(json.dumps(old_recipes)))
+    if resume:
+        dsp_info.add_field("checkpoint", lgdo.Scalar(json.dumps(checkpoint)))
+    if profile:
+        profiles = _read_json_info(raw_store, f_dsp, "profile") | profiles
+        dsp_info.add_field("profile", lgdo.Scalar(json.dumps(profiles)))
+    if autotune:
+        autotuned = _read_json_info(raw_store, f_dsp, "autotune") | autotuned
+        dsp_info.add_field("autotune", lgdo.Scalar(json.dumps(autotuned)))
 
     raw_store.write_object(dsp_info, "dsp_info", f_dsp, wo_mode="o")
+
+
+def build_dsp_multi(
+    f_raw: str,
+    variants: list[tuple[str | dict, str | dict, str]],
+    lh5_tables: list[str] | str = None,
+    n_max: int = np.inf,
+    write_mode: str = None,
+    buffer_len: int = 3200,
+    block_width: int = 16,
+) -> None:
+    """Run several DSP configurations on the same raw-tier LH5 data.
+
+    Every buffer of raw data is read (and decompressed) only once, and all the
+    configurations are run on it by a single
+    :class:`~.processing_chain.ProcessingChain`, built from the configurations
+    merged with :func:`~.processing_chain.merge_dsp_configs`. Processors that
+    the configurations have in common (e.g. the baseline subtraction) are
+    run only once. The output files are the same as those of calling
+    :func:`build_dsp` for each configuration.
+
+    Parameters
+    ----------
+    f_raw
+        name of raw-tier LH5 file to read from.
+    variants
+        list of ``(dsp_config, database, f_dsp)`` tuples: the configuration
+        (:class:`dict` or name of JSON file), parameter database
+        (:class:`dict`, name of JSON file or ``None``) and name of the output
+        file of each configuration. See :func:`build_dsp`.
+    lh5_tables
+        list of HDF5 groups to consider in the input file. If ``None``, process
+        all valid groups.
+    n_max
+        number of waveforms to process.
+    write_mode
+        write mode of all the output files. See :func:`build_dsp`.
+    buffer_len
+        number of waveforms to read/write from/to disk at a time.
+    block_width
+        number of waveforms to process at a time.
+    """
+    configs, databases, f_dsps = [], [], []
+    for dsp_config, database, f_dsp in variants:
+        if isinstance(dsp_config, str):
+            with open(dsp_config) as config_file:
+                dsp_config = json.load(config_file)
+        if not isinstance(dsp_config, dict):
+            raise ValueError("dsp_config must be a dict")
+        if isinstance(database, str):
+            with open(database) as db_file:
+                database = json.load(db_file)
+        if database and not isinstance(database, dict):
+            raise ValueError("input database is not a valid JSON file or dict")
+        configs.append(dsp_config)
+        databases.append(database)
+        f_dsps.append(f_dsp)
+
+    if len(set(f_dsps)) != len(f_dsps):
+        raise ValueError("the output files of the variants must be different")
+
+    raw_store = lh5.LH5Store()
+    lh5_file = raw_store.gimme_file(f_raw, "r")
+    if lh5_file is None:
+        raise ValueError(f"input file not found: {f_raw}")
+    lh5_tables = _raw_tables(lh5_file, f_raw, lh5_tables)
+
+    for f_dsp in f_dsps:
+        if write_mode is None and os.path.isfile(f_dsp):
+            raise FileExistsError(
+                f"output file {f_dsp} exists. Set the 'write_mode' keyword"
+            )
+        if write_mode == "r" and os.path.isfile(f_dsp):
+            os.remove(f_dsp)
+
+    dsp_info = _dsp_info()
+
+    for tb in lh5_tables:
+        tot_n_rows = raw_store.read_n_rows(tb, f_raw)
+        if n_max and n_max < tot_n_rows:
+            tot_n_rows = n_max
+
+        chan_name = tb.split("/")[0]
+        db_dicts = [db.get(chan_name) if db else None for db in databases]
+        tb_name = tb.replace("/raw", "/dsp")
+
+        # the database values are looked up while merging
+        dsp_config, names = merge_dsp_configs(configs, db_dicts)
+        log.debug(
+            f"merged {sum(len(c['processors']) for c in configs)} processors "
+            f"into {len(dsp_config['processors'])}"
+        )
+
+        write_offsets = []
+        for f_dsp in f_dsps:
+            raw_store.gimme_file(f_dsp, "a")
+            if write_mode == "a" and lh5.ls(f_dsp, tb_name):
+                write_offsets.append(raw_store.read_n_rows(tb_name, f_dsp))
+            else:
+                write_offsets.append(0)
+
+        lh5_it = lh5.LH5Iterator(f_raw, tb, buffer_len=buffer_len)
+        proc_chain = None
+        progress_bar = None
+        vec_lens = {}
+        for lh5_in, start_row, n_rows in lh5_it:
+            if proc_chain is not None and _needs_longer_vectors(lh5_in, vec_lens):
+                _release_processing_chain(proc_chain)
+                proc_chain = None
+            if proc_chain is None:
+                proc_chain, lh5_it.field_mask, tb_out = _get_processing_chain(
+                    lh5_in, dsp_config, None, None, block_width
+                )
+                vec_lens = _max_vector_lengths(lh5_in)
+                # the outputs of every variant, sharing the buffers of tb_out
+                tb_outs = [
+                    lgdo.Table(
+                        size=tb_out.size,
+                        col_dict={
+                            par: tb_out[name]
+                            for par, name in variant_names.items()
+                            if name in tb_out
+                        },
+                    )
+                    for variant_names in names
+                ]
+                if log.level <= logging.INFO and progress_bar is None:
+                    progress_bar = tqdm(
+                        desc=f"Processing table {tb}",
+                        total=tot_n_rows,
+                        delay=2,
+                        unit="rows",
+                        file=sys.stdout,
+                    )
+
+            n_rows = min(tot_n_rows - start_row, n_rows)
+            try:
+                proc_chain.execute(0, n_rows)
+            except DSPFatal as e:
+                e.wf_range = f"{e.wf_range[0]+start_row}-{e.wf_range[1]+start_row}"
+                raise e
+
+            for f_dsp, variant_out, write_offset in zip(f_dsps, tb_outs, write_offsets):
+                raw_store.write_object(
+                    obj=variant_out,
+                    name=tb_name,
+                    lh5_file=f_dsp,
+                    n_rows=n_rows,
+                    wo_mode="o" if write_mode == "u" else "a",
+                    write_start=write_offset + start_row,
+                )
+
+            if log.level <= logging.INFO:
+                progress_bar.update(n_rows)
+
+            if start_row + n_rows >= tot_n_rows:
+                break
+
+        if log.level <= logging.INFO and proc_chain is not None:
+            progress_bar.close()
+        if proc_chain is not None:
+            _release_processing_chain(proc_chain)
+
+    for f_dsp in f_dsps:
+        raw_store.write_object(dsp_info, "dsp_info", f_dsp, wo_mode="o")
+
+
+def _incremental_config(
+    store: lh5.LH5Store,
+    f_raw: str,
+    tb: str,
+    f_dsp: str,
+    tb_name: str,
+    n_rows: int,
+    dsp_config: dict,
+    out_recipes: dict[str, str],
+) -> tuple[dict, list[str]]:
+    """Reduce `dsp_config` to the outputs that are missing from `tb_name` in
+    `f_dsp`, or whose recipe changed since they were written. Unchanged
+    parameters of `f_dsp` that are inputs of the changed ones are read back
+    instead of recomputed if they are smaller (per row) than the raw data they
+    are computed from (times are always recomputed, since their coordinate
+    grid is not stored).
+
+    Returns
+    -------
+    (dsp_config, read_back)
+        - `dsp_config` -- the reduced configuration, with the outputs to
+          recompute in ``"outputs"``
+        - `read_back` -- the parameters to read from `f_dsp`
+    """
+    if store.read_n_rows(tb_name, f_dsp) not in (n_rows, None):
+        raise ValueError(
+            f"{tb_name} in {f_dsp} does not have the {n_rows} rows to process, "
+            "cannot update it incrementally"
+        )
+
+    old_recipes = _read_json_info(store, f_dsp, "recipes").get(tb, {})
+    stored = _table_fields(store, f_dsp, tb_name)
+    clean = [
+        out
+        for out, recipe in out_recipes.items()
+        if out in stored and old_recipes.get(out) == recipe
+    ]
+    dirty = [out for out in out_recipes if out not in clean]
+
+    processors = dsp_config["processors"]
+    procs = _produced_names(processors)
+    raw_row, _ = store.read_object(tb, f_raw, n_rows=1)
+
+    def inputs(name: str) -> set[str]:
+        """The raw-tier inputs `name` is computed from."""
+        leafs = set()
+        for dep in _identifiers(processors[procs[name]]):
+            if dep not in procs:
+                leafs.add(dep)
+            elif procs[dep] != procs[name]:
+                leafs |= inputs(dep)
+        return leafs
+
+    def read_back_cheaper(name: str) -> bool:
+        obj, _ = store.read_object(f"{tb_name}/{name}", f_dsp, n_rows=1)
+        # the coordinate grid of times is not stored, they are recomputed
+        units = obj.attrs.get("units")
+        if isinstance(units, str) and units in ureg:
+            if ureg.is_compatible_with(units, "ns"):
+                return False
+        raw_nbytes = sum(_row_nbytes(raw_row[f]) for f in inputs(name) if f in raw_row)
+        return _row_nbytes(obj) < raw_nbytes
+
+    # walk up the dependencies of the dirty outputs, stopping at clean ones
+    needed, read_back = set(), set()
+
+    def visit(key: str) -> None:
+        if key in needed:
+            return
+        needed.add(key)
+        for dep in _identifiers(processors[key]):
+            if dep not in procs or procs[dep] == key:
+                continue
+            if dep in clean and read_back_cheaper(dep):
+                read_back.add(dep)
+            else:
+                visit(procs[dep])
+
+    for out in dirty:
+        if out in procs:
+            visit(procs[out])
+
+    # parameters computed anyway by a needed processor are not read
+    read_back = sorted(dep for dep in read_back if procs[dep] not in needed)
+    cut = {procs[dep] for dep in read_back}
+    tb_config = {
+        "outputs": dirty,
+        "processors": {k: v for k, v in processors.items() if k not in cut},
+    }
+    return tb_config, read_back
+
+
+def _table_fields(store: lh5.LH5Store, f_dsp: str, tb_name: str) -> list[str]:
+    """Names of the columns of table `tb_name` in `f_dsp`."""
+    datatype = store.gimme_file(f_dsp, "a")[tb_name].attrs["datatype"]
+    _, _, fields = parse_datatype(datatype)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [f for f in fields if f != ""]
+
+
+def _row_nbytes(obj: Any) -> float:
+    """Number of bytes per row of an LGDO."""
+    if isinstance(obj, lgdo.Struct):
+        return sum(_row_nbytes(v) for v in dict.values(obj))
+    elif isinstance(obj, lgdo.VectorOfVectors):
+        n_rows = max(len(obj.cumulative_length.nda), 1)
+        return (obj.flattened_data.nda.nbytes + obj.cumulative_length.nda.nbytes) / (
+            n_rows
+        )
+    elif isinstance(obj, lgdo.Array):
+        return obj.nda.nbytes / max(len(obj.nda), 1)
+    return 0
+
+
+def _iterate(lh5_it: lh5.LH5Iterator, entry: int = 0) -> tuple[lgdo.LGDO, int, int]:
+    """Loop through the entries of `lh5_it`, starting at `entry`."""
+    while entry < len(lh5_it):
+        buf, n_rows = lh5_it.read(entry)
+        yield buf, entry, n_rows
+        entry += n_rows
+
+
+def _has_checkpoint(f_dsp: str) -> bool:
+    """Whether `f_dsp` has a checkpoint written by :func:`build_dsp`."""
+    return os.path.isfile(f_dsp) and bool(
+        _read_json_info(lh5.LH5Store(), f_dsp, "checkpoint")
+    )
+
+
+def _write_checkpoint(store: lh5.LH5Store, f_dsp: str, checkpoint: dict) -> None:
+    """Write the progress of :func:`build_dsp` to ``dsp_info/checkpoint``."""
+    store.write_object(
+        lgdo.Scalar(json.dumps(checkpoint)),
+        "checkpoint",
+        f_dsp,
+        group="dsp_info",
+        wo_mode="o",
+    )
+
+
+def _truncate(obj: h5py.Group | h5py.Dataset, n_rows: int) -> None:
+    """Remove the rows after `n_rows` from an LGDO in an LH5 file."""
+    if isinstance(obj, h5py.Dataset):
+        if obj.shape != () and obj.shape[0] > n_rows:
+            obj.resize(n_rows, axis=0)
+    elif "cumulative_length" in obj:
+        # vector of vectors
+        cumulative_length = obj["cumulative_length"]
+        _truncate(cumulative_length, n_rows)
+        n_elements = cumulative_length[n_rows - 1] if n_rows > 0 else 0
+        _truncate(obj["flattened_data"], n_elements)
+    else:
+        for field in obj.values():
+            _truncate(field, n_rows)
+
+
+def _raw_tables(
+    lh5_file: h5py.File, f_raw: str, lh5_tables: list[str] | str
+) -> list[str]:
+    """Resolve the `lh5_tables` argument of :func:`build_dsp` into the list of
+    raw tables in `f_raw` to process.
+    """
+    # if no group is specified, assume we want to decode every table in the file
+    if lh5_tables is None:
+        lh5_tables = lh5.ls(f_raw)
+    elif isinstance(lh5_tables, str):
+        lh5_tables = [lh5_tables]
+    elif not (
+        hasattr(lh5_tables, "__iter__")
+        and all(isinstance(el, str) for el in lh5_tables)
+    ):
+        raise RuntimeError("lh5_tables must be None, a string, or a list of strings")
+
+    # check if group points to raw data; sometimes 'raw' is nested, e.g g024/raw
+    for i, tb in enumerate(lh5_tables):
+        if "raw" not in tb and lh5.ls(lh5_file, f"{tb}/raw"):
+            lh5_tables[i] = f"{tb}/raw"
+        elif not lh5.ls(lh5_file, tb):
+            del lh5_tables[i]
+
+    if len(lh5_tables) == 0:
+        raise RuntimeError(f"could not find any valid LH5 table in {f_raw}")
+    return lh5_tables
+
+
+def _dsp_info() -> lgdo.Struct:
+    """Processing metadata written to ``dsp_info`` in the output files."""
+    dsp_info = lgdo.Struct()
+    dsp_info.add_field("timestamp", lgdo.Scalar(np.uint64(time.time())))
+    dsp_info.add_field("python_version", lgdo.Scalar(sys.version))
+    dsp_info.add_field("numpy_version", lgdo.Scalar(np.version.version))
+    dsp_info.add_field("h5py_version", lgdo.Scalar(h5py.version.version))
+    dsp_info.add_field("hdf5_version", lgdo.Scalar(h5py.version.hdf5_version))
+    dsp_info.add_field("pygama_version", lgdo.Scalar(pygama.__version__))
+    return dsp_info
+
+
+def _read_json_info(store: lh5.LH5Store, f_dsp: str, name: str) -> dict:
+    """Read the JSON string ``dsp_info/<name>`` from `f_dsp`, if it exists."""
+    if not lh5.ls(f_dsp, f"dsp_info/{name}"):
+        return {}
+    info, _ = store.read_object(f"dsp_info/{name}", f_dsp)
+    info = info.value
+    if isinstance(info, bytes):
+        info = info.decode()
+    return json.loads(info)
+
+
+def _get_processing_chain(
+    lh5_in: lgdo.Table,
+    dsp_config: dict,
+    db_dict: dict,
+    outputs: list[str],
+    block_width: int,
+) -> tuple[ProcessingChain, list[str], lgdo.Table]:
+    """Same as :func:`.build_processing_chain`, but reuse a chain released
+    with :func:`_release_processing_chain` if the configuration, database
+    values, output list, block width and layout of `lh5_in` are the same.
+    The cached chain is relinked to the buffers in `lh5_in` and to new output
+    buffers, which skips parsing the configuration, deducing types and shapes,
+    and initializing the factory processors again.
+    """
+    key = (
+        json.dumps(dsp_config, sort_keys=True, default=str),
+        json.dumps(db_dict, sort_keys=True, default=str),
+        None if outputs is None else tuple(outputs),
+        block_width,
+        lh5_in.size,
+        _lgdo_layout(lh5_in),
+    )
+
+    proc_chain = _proc_chain_cache.pop(key, None)
+    if proc_chain is not None:
+        _, field_mask, fields, copied, attrs = _proc_chain_keys[proc_chain]
+        proc_chain.relink_input_buffers(lh5_in)
+        buffers = proc_chain.relink_output_buffers()
+        tb_out = lgdo.Table(
+            size=lh5_in.size,
+            col_dict={f: lh5_in[f] if f in copied else buffers[f] for f in fields},
+            attrs=dict(attrs),
+        )
+        log.debug("reusing cached processing chain")
+        return proc_chain, field_mask, tb_out
+
+    proc_chain, field_mask, tb_out = build_processing_chain(
+        lh5_in, dsp_config, db_dict, outputs, block_width
+    )
+    # fields copied straight from the input into the output
+    copied = [f for f, obj in tb_out.items() if f in lh5_in and obj is lh5_in[f]]
+    _proc_chain_keys[proc_chain] = (
+        key,
+        field_mask,
+        list(tb_out.keys()),
+        copied,
+        {k: v for k, v in tb_out.attrs.items() if k != "datatype"},
+    )
+    return proc_chain, field_mask, tb_out
+
+
+def _release_processing_chain(proc_chain: ProcessingChain) -> None:
+    """Drop the input and output buffers of a chain returned by
+    :func:`_get_processing_chain` and cache it, to be reused by a later call.
+    """
+    if proc_chain not in _proc_chain_keys or chain_cache_size <= 0:
+        return
+    key = _proc_chain_keys[proc_chain][0]
+    proc_chain.release_buffers()
+    _proc_chain_cache[key] = proc_chain
+    _proc_chain_cache.move_to_end(key)
+    while len(_proc_chain_cache) > chain_cache_size:
+        _proc_chain_cache.popitem(last=False)
+
+
+def clear_chain_cache() -> None:
+    """Drop the processing chains cached by :func:`build_dsp` (see
+    :data:`chain_cache_size`).
+    """
+    _proc_chain_cache.clear()
+
+
+def _lgdo_layout(obj: Any) -> tuple:
+    """Hashable description of everything a :class:`.ProcessingChain` deduces
+    from an input LGDO: types, data types, shapes of the elements and units
+    (and the sampling period of waveforms, and the length of the longest
+    vector of a :class:`~.lgdo.VectorOfVectors`, to which the chain pads
+    them).
+    """
+    attrs = str(sorted((k, str(v)) for k, v in getattr(obj, "attrs", {}).items()))
+    if isinstance(obj, lgdo.Struct):
+        layout = tuple((k, _lgdo_layout(v)) for k, v in sorted(obj.items()))
+        if isinstance(obj, lgdo.WaveformTable) and len(obj.dt.nda) > 0:
+            layout += (("dt", float(obj.dt.nda[0])),)
+    elif isinstance(obj, lgdo.VectorOfVectors):
+        layout = (obj.dtype.str, _max_vector_length(obj))
+    elif isinstance(obj, lgdo.Array):
+        layout = (obj.nda.dtype.str, obj.nda.shape[1:])
+    elif isinstance(obj, np.ndarray):
+        layout = (obj.dtype.str, obj.shape[1:])
+    else:
+        layout = ()
+    return (type(obj).__name__, attrs, layout)
+
+
+def _max_vector_lengths(obj: Any, name: str = "") -> dict[str, int]:
+    """Length of the longest vector of each :class:`~.lgdo.VectorOfVectors`
+    in `obj` (e.g. the values of waveforms of unequal length), by path.
+    """
+    if isinstance(obj, lgdo.VectorOfVectors):
+        return {name: _max_vector_length(obj)}
+    if isinstance(obj, lgdo.Struct):
+        return {
+            path: n
+            for k, v in obj.items()
+            for path, n in _max_vector_lengths(v, f"{name}/{k}").items()
+        }
+    return {}
+
+
+def _needs_longer_vectors(lh5_in: lgdo.Table, vec_lens: dict[str, int]) -> bool:
+    """Whether `lh5_in` has vectors longer than `vec_lens` (see
+    :func:`_max_vector_lengths`), i.e. than the padded variables of a chain
+    built for `vec_lens`.
+    """
+    return any(
+        n > vec_lens.get(path, n) for path, n in _max_vector_lengths(lh5_in).items()
+    )
+
+
+def _merge_profiles(reports: list[dict]) -> dict:
+    """Sum the :meth:`.ProcessingChain.profile_report` of chains built from the
+    same configuration (e.g. rebuilt for longer vectors) into one report.
+    """
+    merged = reports[-1]
+    for report in reports[:-1]:
+        for kind in ("inputs", "processors", "outputs"):
+            for entry, old in zip(merged[kind], report[kind]):
+                for stat in ("time", "calls", "bytes"):
+                    entry[stat] += old[stat]
+    return merged
+
+
+def _format_profile(tb: str, report: dict) -> str:
+    """Format a :meth:`.ProcessingChain.profile_report` into a table sorted
+    by wall time.
+    """
+    entries = [
+        (kind, entry)
+        for kind in ("inputs", "processors", "outputs")
+        for entry in report[kind]
+    ]
+    tot_time = sum(entry["time"] for _, entry in entries)
+    lines = [
+        f"profile for table {tb} (total: {tot_time:.3f} s)",
+        f"{'time [s]':>10} {'frac':>6} {'calls':>8} {'MB/s':>10}  name",
+    ]
+    for kind, entry in sorted(entries, key=lambda e: e[1]["time"], reverse=True):
+        frac = entry["time"] / tot_time if tot_time > 0 else 0
+        rate = entry["bytes"] / entry["time"] / 1e6 if entry["time"] > 0 else 0
+        lines.append(
+            f"{entry['time']:10.4f} {frac:6.1%} {entry['calls']:8d} "
+            f"{rate:10.1f}  [{kind[:-1]}] {entry['name']}"
+        )
+    return "\n".join(lines)
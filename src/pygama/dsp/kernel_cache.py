@@ -0,0 +1,170 @@
+"""
+This module provides a cache of the arrays (e.g. filter kernels) that factory
+processors compute from their ``init_args``. For given parameters, these
+arrays are the same for every file processed with a configuration, so they
+are computed once, kept in memory and, if :data:`cache_dir` is set, stored on
+disk to be shared between jobs.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Any, Callable
+
+import numpy as np
+
+import pygama
+
+log = logging.getLogger(__name__)
+
+#: Directory the arrays are stored in, to reuse them across jobs. Defaults to
+#: the ``PYGAMA_KERNEL_CACHE`` environment variable; if ``None``, arrays are
+#: only cached in memory.
+cache_dir = os.getenv("PYGAMA_KERNEL_CACHE")
+
+#: Maximum number of arrays kept in memory. The least recently used are
+#: dropped first.
+max_entries = 64
+
+# map from key -> array, in order of use
+_memory = OrderedDict()
+
+
+def cached_kernel(func: Callable) -> Callable:
+    """Cache the arrays returned by `func`.
+
+    The cache is content-addressed: the key is a hash of the name and source
+    code of `func`, of the pygama version and of the arguments of `func`, so
+    that arrays cached by another version of a kernel are not reused.
+    :class:`numpy.ndarray` arguments (e.g. a superpulse read from a file) are
+    hashed by their type, shape and data, and :class:`pint.Quantity`
+    arguments by their magnitude and unit. Arguments must otherwise have a
+    stable :func:`repr`. Returned arrays are read-only,
+    since they are shared between all the callers.
+
+    Examples
+    --------
+    >>> @cached_kernel
+    >>> def _my_kernel(length: int, sigma: float) -> np.ndarray: ...
+    >>> @register_processor(factory=True)
+    >>> def my_filter(length, sigma):
+    >>>     return GUFuncPartial(_my_filter, _my_kernel(length, sigma))
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> np.ndarray:
+        key = kernel_key(func, *args, **kwargs)
+        kernel = _memory.get(key)
+        if kernel is not None:
+            _memory.move_to_end(key)
+            return kernel
+
+        kernel = _load(key)
+        if kernel is None:
+            kernel = np.asarray(func(*args, **kwargs))
+            _store(key, kernel)
+        kernel.flags.writeable = False
+
+        _memory[key] = kernel
+        while len(_memory) > max_entries:
+            _memory.popitem(last=False)
+        return kernel
+
+    return wrapper
+
+
+def kernel_key(func: Callable, *args, **kwargs) -> str:
+    """Hash identifying the result of calling `func` with `args` and `kwargs`
+    (see :func:`cached_kernel`)."""
+    recipe = [
+        func.__module__,
+        func.__qualname__,
+        _source_hash(func),
+        pygama.__version__,
+        _normalize(args),
+        _normalize(kwargs),
+    ]
+    return f"{func.__name__.strip('_')}-{sha1(json.dumps(recipe).encode()).hexdigest()}"
+
+
+def clear(disk: bool = False) -> None:
+    """Empty the in-memory cache and, if `disk` is true, :data:`cache_dir`."""
+    _memory.clear()
+    if disk and cache_dir is not None and os.path.isdir(cache_dir):
+        for file_name in os.listdir(cache_dir):
+            if file_name.endswith(".npy"):
+                os.remove(os.path.join(cache_dir, file_name))
+
+
+@functools.lru_cache
+def _source_hash(func: Callable) -> str:
+    """Hash of the source code of `func`, or an empty string if it is not
+    available."""
+    try:
+        return sha1(inspect.getsource(func).encode()).hexdigest()
+    except (OSError, TypeError):
+        return ""
+
+
+def _normalize(obj: Any) -> Any:
+    """Convert `obj` to a JSON-serializable object identifying its value."""
+    if isinstance(obj, np.ndarray):
+        data = np.ascontiguousarray(obj)
+        return ["ndarray", data.dtype.str, data.shape, sha1(data).hexdigest()]
+    elif isinstance(obj, (list, tuple)):
+        return [_normalize(o) for o in obj]
+    elif isinstance(obj, dict):
+        return {str(k): _normalize(v) for k, v in obj.items()}
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif isinstance(obj, (bool, int, float, str)) or obj is None:
+        return obj
+    elif hasattr(obj, "magnitude") and hasattr(obj, "units"):
+        if obj.dimensionless:
+            return float(obj)
+        return [_normalize(obj.magnitude), str(obj.units)]
+    return repr(obj)
+
+
+def _load(key: str) -> np.ndarray | None:
+    """Read the array `key` from :data:`cache_dir`, if there."""
+    if cache_dir is None:
+        return None
+    file_name = os.path.join(cache_dir, key + ".npy")
+    if not os.path.exists(file_name):
+        return None
+    try:
+        kernel = np.load(file_name, allow_pickle=False)
+    except (OSError, ValueError) as e:
+        log.warning(f"could not read cached kernel {file_name}: {e}")
+        return None
+    log.debug(f"read cached kernel {file_name}")
+    return kernel
+
+
+def _store(key: str, kernel: np.ndarray) -> None:
+    """Write the array `key` to :data:`cache_dir`, if set."""
+    if cache_dir is None:
+        return
+    file_name = os.path.join(cache_dir, key + ".npy")
+    tmp_name = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first, so that concurrent jobs never read
+        # a partial array
+        fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, kernel, allow_pickle=False)
+        os.replace(tmp_name, file_name)
+    except (OSError, ValueError) as e:
+        log.warning(f"could not write cached kernel {file_name}: {e}")
+        if tmp_name is not None and os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        return
+    log.debug(f"wrote cached kernel {file_name}")
@@ -5,21 +5,25 @@ chains on waveform data.
 from __future__ import annotations
 
 import ast
-import importlib
 import itertools as it
 import json
 import logging
 import re
+import time
 from abc import ABCMeta, abstractmethod
 from copy import deepcopy
 from dataclasses import dataclass
+from hashlib import sha1
 from typing import Any, Union
 
 import numpy as np
-from numba import vectorize
+from numba import njit, vectorize
+from numba.np.ufunc.ufunc_base import UfuncBase
 
 import pygama.lgdo as lgdo
 from pygama.dsp.errors import DSPFatal, ProcessingChainError
+from pygama.dsp.registry import get_function, processor_info
+from pygama.dsp.utils import ParallelGUFunc, numba_defaults
 from pygama.math.units import Quantity, Unit
 from pygama.math.units import unit_registry as ureg
 
@@ -38,6 +42,15 @@ ast_ops_dict = {
     ast.Div: (np.divide, "{}/{}"),
     ast.FloorDiv: (np.floor_divide, "{}//{}"),
     ast.USub: (np.negative, "-{}"),
+    ast.Gt: (np.greater, "{}>{}"),
+    ast.GtE: (np.greater_equal, "{}>={}"),
+    ast.Lt: (np.less, "{}<{}"),
+    ast.LtE: (np.less_equal, "{}<={}"),
+    ast.Eq: (np.equal, "{}=={}"),
+    ast.NotEq: (np.not_equal, "{}!={}"),
+    ast.And: (np.logical_and, "{} and {}"),
+    ast.Or: (np.logical_or, "{} or {}"),
+    ast.Not: (np.logical_not, "not {}"),
 }
 
 
@@ -106,6 +119,25 @@ class CoordinateGrid:
         return f"({str(self.period)},{offset})"
 
 
+@dataclass
+class ProfileStats:
+    """Helper class accumulating the wall time (in seconds), number of calls
+    and number of bytes touched by a processor or I/O manager.
+    """
+
+    wall_time: float = 0.0
+    calls: int = 0
+    nbytes: int = 0
+
+    def add(self, elapsed: float, nbytes: int) -> None:
+        self.wall_time += elapsed
+        self.calls += 1
+        self.nbytes += nbytes
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"time": self.wall_time, "calls": self.calls, "bytes": self.nbytes}
+
+
 class ProcChainVar:
     """Helper data class with buffer and information for internal variables in
     :class:`ProcessingChain`.
@@ -171,8 +203,8 @@ class ProcChainVar:
                 value = tuple(value)
             else:
                 value = (int(value),)
-            value = tuple(value)
-            assert all(isinstance(d, int) for d in value)
+            assert all(isinstance(d, (int, np.integer)) for d in value)
+            value = tuple(int(d) for d in value)
 
         elif name == "dtype" and not isinstance(value, np.dtype):
             value = np.dtype(value)
@@ -335,7 +367,9 @@ class ProcessingChain:
     add_scalar.
     """
 
-    def __init__(self, block_width: int = 8, buffer_len: int = None) -> None:
+    def __init__(
+        self, block_width: int = 8, buffer_len: int = None, precision: str = None
+    ) -> None:
         """
         Parameters
         ----------
@@ -344,6 +378,14 @@ class ProcessingChain:
         buffer_len
             length of input and output buffers. Should be a multiple of
             `block_width`
+        precision
+            floating point type (e.g. ``"float32"``) to compute in. If set,
+            processors use the type signatures with floating point arguments of
+            this type whenever their inputs allow it, instead of the first
+            signature the inputs can be cast to, and unit conversions produce
+            this type. A warning is emitted for processors that can only run in
+            a wider type. If ``None``, keep the types of the first matching
+            signatures.
         """
         # Dictionary from name to scratch data buffers as ProcChainVar
         self._vars_dict = {}
@@ -352,10 +394,32 @@ class ProcessingChain:
         # lists of I/O managers that handle copying data to/from external memory buffers
         self._input_managers = []
         self._output_managers = []
+        # (I/O manager type, variable) of the inputs and outputs whose
+        # buffers were dropped by release_buffers; None if they are linked
+        self._released_inputs = None
+        self._released_outputs = None
 
         self._block_width = block_width
         self._buffer_len = buffer_len
 
+        self._precision = None if precision is None else np.dtype(precision)
+        if self._precision is not None and self._precision.kind != "f":
+            raise ProcessingChainError(
+                f"precision must be a floating point type, not {precision}"
+            )
+
+        # map from processor/IO manager -> ProfileStats; None if not profiling
+        self._profile = None
+
+        # processor arguments replaced by views of the I/O buffers, see
+        # _bind_io_views; None if not set up for the current processors
+        self._zero_copy = True
+        self._io_views = None
+        self._io_views_key = None
+
+        # map from condition expression -> variable, to evaluate it once
+        self._conditions = {}
+
     def add_variable(
         self,
         name: str,
@@ -465,6 +529,21 @@ class ProcessingChain:
             else:
                 buff = np.ndarray((self._buffer_len,) + var.shape, dtype)
 
+        # read floating point inputs in the precision of the chain
+        if self._precision is not None and var.dtype is auto:
+            if isinstance(buff, lgdo.WaveformTable):
+                buff_dtype = buff.values.dtype
+            elif isinstance(buff, (np.ndarray, lgdo.Array)):
+                buff_dtype = buff.dtype
+            else:
+                buff_dtype = None
+            if (
+                buff_dtype is not None
+                and buff_dtype.kind == "f"
+                and buff_dtype.itemsize > self._precision.itemsize
+            ):
+                var.update_auto(dtype=self._precision)
+
         # Add the buffer to the input buffers list
         if isinstance(buff, np.ndarray):
             out_man = NumpyIOManager(buff, var)
@@ -474,6 +553,8 @@ class ProcessingChain:
             out_man = LGDOArrayIOManager(buff, var)
         elif isinstance(buff, lgdo.WaveformTable):
             out_man = LGDOWaveformIOManager(buff, var)
+        elif isinstance(buff, lgdo.VectorOfVectors):
+            out_man = LGDOVectorOfVectorsIOManager(buff, var)
         else:
             raise ProcessingChainError(
                 "Could not link input buffer of unknown type", str(buff)
@@ -481,6 +562,7 @@ class ProcessingChain:
 
         log.debug(f"added input buffer: {out_man}")
         self._input_managers.append(out_man)
+        self._share_vector_lengths()
 
         return buff
 
@@ -516,24 +598,7 @@ class ProcessingChain:
 
         # Create output buffer that will be linked and returned if none exists
         if buff is None:
-            dtype = var.get_buffer().dtype
-
-            if var is None:
-                raise ProcessingChainError(
-                    varname + " does not exist and no buffer was provided"
-                )
-            elif isinstance(var.grid, CoordinateGrid) and len(var.shape) == 1:
-                buff = lgdo.WaveformTable(
-                    size=self._buffer_len, wf_len=var.shape[0], dtype=dtype
-                )
-            elif len(var.shape) == 0:
-                buff = lgdo.Array(shape=(self._buffer_len), dtype=dtype)
-            elif len(var.shape) > 0:
-                buff = lgdo.ArrayOfEqualSizedArrays(
-                    shape=(self._buffer_len, *var.shape), dtype=dtype
-                )
-            else:
-                buff = np.ndarray((self._buffer_len,) + var.shape, dtype)
+            buff = self._new_output_buffer(var)
 
         # Add the buffer to the output buffers list
         if isinstance(buff, np.ndarray):
@@ -544,6 +609,8 @@ class ProcessingChain:
             out_man = LGDOArrayIOManager(buff, var)
         elif isinstance(buff, lgdo.WaveformTable):
             out_man = LGDOWaveformIOManager(buff, var)
+        elif isinstance(buff, lgdo.VectorOfVectors):
+            out_man = LGDOVectorOfVectorsIOManager(buff, var)
         else:
             raise ProcessingChainError(
                 "could not link output buffer of unknown type", str(buff)
@@ -551,14 +618,203 @@ class ProcessingChain:
 
         log.debug(f"added output buffer: {out_man}")
         self._output_managers.append(out_man)
+        self._share_vector_lengths()
 
         return buff
 
+    def _share_vector_lengths(self) -> None:
+        """Make each ragged output (a :class:`~.lgdo.VectorOfVectors` or a
+        :class:`~.lgdo.WaveformTable` of unequal waveforms) write its rows with
+        the lengths of the rows read from the first ragged input of the same
+        type and padded length, if any. The other ragged outputs end each row
+        at its first NaN.
+        """
+        for out_man in self._output_managers:
+            if getattr(out_man, "lengths", None) is None:
+                continue
+            out_man.lengths_from = next(
+                (
+                    in_man
+                    for in_man in self._input_managers
+                    if type(in_man) is type(out_man)
+                    and getattr(in_man, "lengths", None) is not None
+                    and in_man.var.shape == out_man.var.shape
+                ),
+                None,
+            )
+
+    def _new_output_buffer(
+        self, var: ProcChainVar, io_type: type = None
+    ) -> np.ndarray | LGDO:
+        """Allocate an output buffer with `buffer_len` rows for `var`, of the
+        type handled by the I/O manager `io_type` (deduced from the variable
+        if ``None``).
+        """
+        dtype = var.get_buffer().dtype
+
+        if io_type is NumpyIOManager:
+            return np.ndarray((self._buffer_len,) + var.shape, dtype)
+        elif io_type is LGDOVectorOfVectorsIOManager:
+            return lgdo.VectorOfVectors(
+                shape_guess=(self._buffer_len, var.shape[0]), dtype=dtype
+            )
+        elif io_type is LGDOWaveformIOManager or (
+            io_type is None
+            and isinstance(var.grid, CoordinateGrid)
+            and len(var.shape) == 1
+        ):
+            # waveforms computed from ragged waveforms are ragged too
+            ragged = any(
+                isinstance(in_man, LGDOWaveformIOManager) and in_man.ragged
+                for in_man in self._input_managers
+            )
+            return lgdo.WaveformTable(
+                size=self._buffer_len,
+                wf_len=None if ragged else var.shape[0],
+                dtype=dtype,
+            )
+        elif len(var.shape) == 0:
+            return lgdo.Array(shape=(self._buffer_len), dtype=dtype)
+        else:
+            return lgdo.ArrayOfEqualSizedArrays(
+                shape=(self._buffer_len, *var.shape), dtype=dtype
+            )
+
+    def relink_input_buffers(self, buffers: dict[str, np.ndarray | LGDO]) -> None:
+        """Replace the external buffers linked to the input variables.
+
+        This is used to reuse a :class:`ProcessingChain` on new data (e.g. from
+        a different file or table) without building it again. Every new buffer
+        must be compatible with the one it replaces (same type, shape of the
+        elements, data type and units). Internal variables and processors are
+        left untouched.
+
+        Parameters
+        ----------
+        buffers
+            mapping from the names of the input variables to the new buffers
+            (e.g. an LGDO :class:`~.lgdo.table.Table`).
+        """
+        if self._released_inputs is not None:
+            linked = self._released_inputs
+        else:
+            linked = [(type(m), m.var) for m in self._input_managers]
+
+        new_managers = []
+        for io_type, var in linked:
+            buff = buffers.get(var.name)
+            if buff is None:
+                raise ProcessingChainError(f"no buffer was provided for {var.name}")
+            try:
+                new_managers.append(io_type(buff, var))
+            except (AssertionError, ProcessingChainError) as e:
+                raise ProcessingChainError(
+                    f"could not relink input buffer {var.name}"
+                ) from e
+            log.debug(f"relinked input buffer: {new_managers[-1]}")
+
+        # replace (and keep the profile statistics of) the old managers
+        if self._profile is not None:
+            for old_man, new_man in zip(self._input_managers, new_managers):
+                if id(old_man) in self._profile:
+                    self._profile[id(new_man)] = self._profile.pop(id(old_man))
+        self._input_managers = new_managers
+        self._released_inputs = None
+        self._share_vector_lengths()
+
+    def relink_output_buffers(
+        self, buffers: dict[str, np.ndarray | LGDO] = None
+    ) -> dict[str, np.ndarray | LGDO]:
+        """Replace the external buffers linked to the output variables.
+
+        This is the counterpart of :meth:`relink_input_buffers` for the
+        outputs. Every output variable missing from `buffers` gets a new
+        buffer of the same type as the one it replaces, with `buffer_len`
+        rows.
+
+        Parameters
+        ----------
+        buffers
+            mapping from the names of the output variables to the new
+            buffers.
+
+        Returns
+        -------
+        buffers
+            mapping from the names of the output variables to their (new)
+            buffers.
+        """
+        if buffers is None:
+            buffers = {}
+        if self._released_outputs is not None:
+            linked = self._released_outputs
+        else:
+            linked = [(type(m), m.var) for m in self._output_managers]
+
+        new_managers = []
+        new_buffers = {}
+        for io_type, var in linked:
+            buff = buffers.get(var.name)
+            if buff is None:
+                buff = self._new_output_buffer(var, io_type)
+            try:
+                new_managers.append(io_type(buff, var))
+            except (AssertionError, ProcessingChainError) as e:
+                raise ProcessingChainError(
+                    f"could not relink output buffer {var.name}"
+                ) from e
+            new_buffers[var.name] = buff
+            log.debug(f"relinked output buffer: {new_managers[-1]}")
+
+        if self._profile is not None:
+            for old_man, new_man in zip(self._output_managers, new_managers):
+                if id(old_man) in self._profile:
+                    self._profile[id(new_man)] = self._profile.pop(id(old_man))
+        self._output_managers = new_managers
+        self._released_outputs = None
+        self._share_vector_lengths()
+        return new_buffers
+
+    def release_buffers(self) -> None:
+        """Drop the references to the external input and output buffers.
+
+        The variables, processors and the types of the input and output
+        buffers are kept, so that the chain can be stored and reused later
+        without holding on to the buffers of the last data it processed.
+        :meth:`relink_input_buffers` and :meth:`relink_output_buffers` must
+        be called before executing the chain again.
+        """
+        if self._released_inputs is None:
+            self._released_inputs = [(type(m), m.var) for m in self._input_managers]
+        if self._released_outputs is None:
+            self._released_outputs = [(type(m), m.var) for m in self._output_managers]
+        self._input_managers = []
+        self._output_managers = []
+        self._io_views = None
+        self._io_views_key = None
+
     def add_processor(
-        self, func: np.ufunc, *args, signature: str = None, types: list[str] = None
+        self,
+        func: np.ufunc,
+        *args,
+        signature: str = None,
+        types: list[str] = None,
+        parallel: bool = None,
+        condition: str | ProcChainVar = None,
     ) -> None:
         """Make a list of parameters from `*args`. Replace any strings in the
         list with NumPy objects from `vars_dict`, where able.
+
+        If `parallel` is true (by default, if the ``parallel`` option of
+        :data:`~.utils.numba_defaults` is), a processor with a block kernel
+        (see :func:`~.registry.block_kernel`) is run with it, splitting the
+        waveforms of each block between threads.
+
+        If a `condition` (an expression parsed by :meth:`get_variable`, e.g.
+        ``"trapEmax > 100"``) is given, the processor only runs on the
+        waveforms for which it is true: in each block, these are gathered into
+        a dense sub-block, and the outputs of the other waveforms are filled
+        with ``NaN`` (``0`` for integer and boolean outputs).
         """
         params = []
         kw_params = {}
@@ -570,15 +826,247 @@ class ProcessingChain:
             else:
                 params.append(param)
 
-        proc_man = ProcessorManager(self, func, params, kw_params, signature, types)
+        if isinstance(condition, str):
+            if condition not in self._conditions:
+                self._conditions[condition] = self.get_variable(
+                    condition, expr_only=True
+                )
+            condition = self._conditions[condition]
+
+        proc_man = ProcessorManager(
+            self, func, params, kw_params, signature, types, parallel, condition
+        )
         self._proc_managers.append(proc_man)
 
     def execute(self, start: int = 0, stop: int = None) -> None:
         """Execute the dsp chain on the entire input/output buffers."""
+        if self._released_inputs is not None or self._released_outputs is not None:
+            raise ProcessingChainError(
+                "the input and output buffers were released, relink them first"
+            )
         if stop is None:
             stop = self._buffer_len
-        for i in range(start, stop, self._block_width):
-            self._execute_procs(i, min(i + self._block_width, self._buffer_len))
+        if self._profile is None:
+            execute_procs = self._execute_procs
+        else:
+            execute_procs = self._execute_procs_profiled
+
+        io_views = self._get_io_views() if self._zero_copy else []
+        if not io_views:
+            for i in range(start, stop, self._block_width):
+                execute_procs(i, min(i + self._block_width, self._buffer_len))
+            return
+
+        try:
+            for i in range(start, stop, self._block_width):
+                self._bind_io_views(io_views, i)
+                execute_procs(i, min(i + self._block_width, self._buffer_len))
+        finally:
+            # drop the views, or the I/O buffers could not be resized
+            self._bind_io_views(io_views, None)
+
+    def enable_zero_copy(self, enable: bool = True) -> None:
+        """Turn on (the default) or off reading and writing array variables
+        in place.
+
+        When an input or output buffer holds arrays (e.g. waveforms) of the
+        same data type and shape as the variable linked to it, copying blocks
+        between them can be avoided: the processors are called directly on
+        views of the rows of the buffer. This only happens if all the
+        processors using the variable are :class:`numpy.ufunc` or Numba
+        (g)ufuncs, and if no processor writes to an input variable.
+        """
+        self._zero_copy = enable
+        self._io_views = None
+
+    def _get_io_views(self) -> list[tuple[IOManager, int, list]]:
+        """Find the processor arguments that can be views of I/O buffers.
+
+        Returns a list of ``(io_manager, row_bytes, args)``, where
+        `args` is a list of ``(container, key, orig, offset)``: ``container[key]``
+        is the argument `orig` of a processor, found at `offset` bytes from the
+        start of the variable buffer.
+        """
+        key = (
+            len(self._proc_managers),
+            tuple(id(m) for m in self._input_managers + self._output_managers),
+        )
+        if self._io_views_key == key:
+            return self._io_views
+
+        io_managers = self._input_managers + self._output_managers
+        self._io_views = []
+        for io_man in io_managers:
+            buffers = io_man.view_buffers()
+            if buffers is None:
+                continue
+            io_buf, var_buf = buffers
+            if (
+                var_buf is not io_man.var._buffer
+                or var_buf.ndim < 2
+                or io_buf.dtype != var_buf.dtype
+                or io_buf.shape[1:] != var_buf.shape[1:]
+                or not io_buf.flags.c_contiguous
+                or not var_buf.flags.c_contiguous
+                or sum(m.var is io_man.var for m in io_managers) > 1
+            ):
+                continue
+
+            is_input = io_man in self._input_managers
+            var_start = var_buf.ctypes.data
+            var_end = var_start + var_buf.nbytes
+            args = []
+            for proc_man in self._proc_managers:
+                found = [
+                    (i, container, k, arg)
+                    for i, (container, k, arg) in enumerate(proc_man.arg_slots())
+                    if isinstance(arg, np.ndarray)
+                    and var_start <= arg.ctypes.data < var_end
+                ]
+                if not found:
+                    continue
+                # other callables may keep references to the buffer, and
+                # processors must not overwrite the input data
+                written = proc_man.written_slots()
+                if not isinstance(
+                    proc_man.processor, (np.ufunc, UfuncBase, ParallelGUFunc)
+                ) or (
+                    is_input
+                    and (written is None or any(i in written for i, *_ in found))
+                ):
+                    break
+                args += [
+                    (container, k, arg, arg.ctypes.data - var_start)
+                    for _, container, k, arg in found
+                ]
+            else:
+                if args:
+                    row_bytes = var_buf.strides[0]
+                    self._io_views.append((io_man, row_bytes, args))
+                    log.debug(f"processors use {io_man.var} in place")
+
+        self._io_views_key = key
+        return self._io_views
+
+    def _bind_io_views(self, io_views: list, start: int | None) -> None:
+        """Replace the processor arguments found by :meth:`_get_io_views` by
+        views of the rows of the I/O buffers starting at `start`. If `start`
+        is ``None``, or if the block does not fit in an I/O buffer, restore
+        the original arguments (the I/O manager then copies the block).
+        """
+        for io_man, row_bytes, args in io_views:
+            io_buf = io_man.view_buffers()[0]
+            end = None if start is None else start + self._block_width
+            io_man.zero_copy = end is not None and end <= len(io_buf)
+            if not io_man.zero_copy:
+                for container, k, orig, _ in args:
+                    container[k] = orig
+                continue
+            row_offset = start * row_bytes
+            for container, k, orig, offset in args:
+                container[k] = np.ndarray(
+                    orig.shape,
+                    orig.dtype,
+                    buffer=io_buf,
+                    offset=row_offset + offset,
+                    strides=orig.strides,
+                )
+
+    def enable_profiling(self, enable: bool = True) -> None:
+        """Turn on (or off) profiling of :meth:`execute`.
+
+        While profiling, the wall time, number of calls and number of bytes
+        touched are accumulated for every processor and for every input and
+        output buffer copy. When profiling is off (the default) no timing code
+        is run at all. Enabling profiling resets any accumulated statistics.
+        """
+        self._profile = {} if enable else None
+
+    def profile_report(self) -> dict[str, Any]:
+        """Return the statistics accumulated since :meth:`enable_profiling`.
+
+        Returns
+        -------
+        report
+            a :class:`dict` with keys ``block_width``, ``buffer_len``,
+            ``inputs``, ``processors`` and ``outputs``. The last three are
+            lists (in order of execution) of dictionaries with keys ``name``,
+            ``time`` (wall time in seconds), ``calls`` and ``bytes``.
+        """
+        if self._profile is None:
+            raise ProcessingChainError("profiling is not enabled")
+
+        def stats_list(managers: list, name_fn) -> list[dict[str, Any]]:
+            ret = []
+            for man in managers:
+                stats = self._profile.get(id(man), ProfileStats())
+                ret.append({"name": name_fn(man), **stats.as_dict()})
+            return ret
+
+        return {
+            "block_width": self._block_width,
+            "buffer_len": self._buffer_len,
+            "inputs": stats_list(self._input_managers, lambda m: str(m.var)),
+            "processors": stats_list(self._proc_managers, str),
+            "outputs": stats_list(self._output_managers, lambda m: str(m.var)),
+        }
+
+    def memory_report(self) -> dict[str, Any]:
+        """Return the number of bytes allocated for the chain's buffers.
+
+        The buffers of the internal variables hold `block_width` rows, the
+        input and output buffers hold `buffer_len` rows, so the memory needed
+        by a chain scales with both. Processors can also hold arrays of their
+        own (e.g. filter kernels, or the FFT buffers of a convolution), which
+        they report with an ``nbytes`` attribute. Some of them are only
+        allocated when the chain is first executed.
+
+        Returns
+        -------
+        report
+            a :class:`dict` with keys ``block_width``, ``buffer_len``,
+            ``variables``, ``processors``, ``inputs``, ``outputs`` and
+            ``total``. The ``variables``, ``processors``, ``inputs`` and
+            ``outputs`` are lists of dictionaries with keys ``name`` and
+            ``bytes``; ``total`` is the sum of all of them in bytes.
+        """
+
+        def var_nbytes(var: ProcChainVar) -> int:
+            if isinstance(var._buffer, np.ndarray):
+                return var._buffer.nbytes
+            elif isinstance(var._buffer, list):
+                return sum(buf.nbytes for buf, _ in var._buffer)
+            return 0
+
+        variables = [
+            {"name": name, "bytes": var_nbytes(var)}
+            for name, var in self._vars_dict.items()
+            if var_nbytes(var) > 0
+        ]
+        # the same processor can be called by several managers
+        procs = {}
+        for proc_man in self._proc_managers:
+            nbytes = getattr(proc_man.processor, "nbytes", 0)
+            if isinstance(nbytes, int) and nbytes > 0:
+                procs[id(proc_man.processor)] = {"name": str(proc_man), "bytes": nbytes}
+        processors = list(procs.values())
+        inputs = [
+            {"name": str(man.var), "bytes": man.buffer_nbytes()}
+            for man in self._input_managers
+        ]
+        outputs = [
+            {"name": str(man.var), "bytes": man.buffer_nbytes()}
+            for man in self._output_managers
+        ]
+        return {
+            "block_width": self._block_width,
+            "buffer_len": self._buffer_len,
+            "variables": variables,
+            "processors": processors,
+            "inputs": inputs,
+            "outputs": outputs,
+            "total": sum(v["bytes"] for v in variables + processors + inputs + outputs),
+        }
 
     def get_variable(
         self, expr: str, get_names_only: bool = False, expr_only: bool = False
@@ -607,6 +1095,9 @@ class ProcessingChain:
           expression, a processor will be added to the
           :class:`ProcessingChain` and a new buffer allocated to store the
           output
+        - Comparisons (:obj:`>`, :obj:`>=`, :obj:`<`, :obj:`<=`, :obj:`==`,
+          :obj:`!=`) and the logical operators ``and``, ``or`` and ``not``
+          are available in the same way, with boolean outputs
         - ``varname[slice]``: return the variable with a slice applied. Slice
           values can be ``float``\ s, and will have round applied to them
         - ``keyword = expr``: return a ``dict`` with a single element
@@ -654,7 +1145,7 @@ class ProcessingChain:
             return None
 
         elif isinstance(node, ast.List):
-            npparr = np.array(ast.literal_eval(expr))
+            npparr = np.array(ast.literal_eval(node))
             if len(npparr.shape) == 1:
                 return npparr
             else:
@@ -724,6 +1215,38 @@ class ProcessingChain:
             self._proc_managers.append(ProcessorManager(self, op, [lhs, rhs, out]))
             return out
 
+        # define comparisons (>, <, ==, ...) and logical operators (and, or, not)
+        elif isinstance(node, (ast.Compare, ast.BoolOp)) or (
+            isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)
+        ):
+            if isinstance(node, ast.Compare):
+                operands = [node.left] + node.comparators
+            elif isinstance(node, ast.BoolOp):
+                operands = node.values
+            else:
+                operands = [node.operand]
+            operands = [
+                self._parse_expr(operand, expr, dry_run, var_name_list)
+                for operand in operands
+            ]
+            if any(operand is None for operand in operands):
+                return None
+
+            if isinstance(node, ast.Compare):
+                # a < b < c is (a < b) and (b < c)
+                out = None
+                for op, lhs, rhs in zip(node.ops, operands[:-1], operands[1:]):
+                    cmp = self._add_bool_op(type(op), lhs, rhs)
+                    out = cmp if out is None else self._add_bool_op(ast.And, out, cmp)
+                return out
+            elif isinstance(node, ast.BoolOp):
+                out = operands[0]
+                for operand in operands[1:]:
+                    out = self._add_bool_op(type(node.op), out, operand)
+                return out
+            else:
+                return self._add_bool_op(ast.Not, operands[0])
+
         # define unary operators (-)
         elif isinstance(node, ast.UnaryOp):
             operand = self._parse_expr(node.operand, expr, dry_run, var_name_list)
@@ -868,7 +1391,10 @@ class ProcessingChain:
                     var.update_auto(*args, **kwargs)
                     return self._vars_dict[var_name]
                 elif not dry_run:
-                    return self.add_variable(var_name, *args, **kwargs)
+                    # arguments are in the order of update_auto: shape, dtype
+                    var = self.add_variable(var_name)
+                    var.update_auto(*args, **kwargs)
+                    return var
                 else:
                     return None
 
@@ -880,6 +1406,23 @@ class ProcessingChain:
 
         raise ProcessingChainError(f"cannot parse AST nodes of type {node.__dict__}")
 
+    def _add_bool_op(self, op_type: type, *operands: Any) -> Any:
+        """Add a processor applying the comparison or logical operator
+        `op_type` (e.g. :class:`ast.Gt`) to `operands`, and return its boolean
+        output variable. If no operand is a variable, return the value.
+        """
+        op, op_form = ast_ops_dict[op_type]
+        var = next((o for o in operands if isinstance(o, ProcChainVar)), None)
+        if var is None:
+            return op(*operands)
+
+        name = "(" + op_form.format(*(str(o) for o in operands)) + ")"
+        out = ProcChainVar(
+            self, name, var.shape, np.dtype(bool), None, None, is_coord=False
+        )
+        self._proc_managers.append(ProcessorManager(self, op, [*operands, out]))
+        return out
+
     def _validate_name(self, name: str, raise_exception: bool = False) -> bool:
         """Check that name is alphanumeric, and not an already used keyword"""
         isgood = (
@@ -913,6 +1456,41 @@ class ProcessingChain:
         for out_man in self._output_managers:
             out_man.write(begin, end)
 
+    def _execute_procs_profiled(self, begin: int, end: int) -> None:
+        """Same as :meth:`_execute_procs`, but also accumulate the wall time,
+        call count and bytes touched of each processor and I/O manager.
+        """
+        prof = self._profile
+
+        for in_man in self._input_managers:
+            t_start = time.perf_counter()
+            in_man.read(begin, end)
+            t_elapsed = time.perf_counter() - t_start
+            prof.setdefault(id(in_man), ProfileStats()).add(
+                t_elapsed, in_man.nbytes(begin, end)
+            )
+
+        for proc_man in self._proc_managers:
+            t_start = time.perf_counter()
+            try:
+                proc_man.execute()
+            except DSPFatal as e:
+                e.processor = str(proc_man)
+                e.wf_range = (begin, end)
+                raise e
+            t_elapsed = time.perf_counter() - t_start
+            prof.setdefault(id(proc_man), ProfileStats()).add(
+                t_elapsed, proc_man.nbytes()
+            )
+
+        for out_man in self._output_managers:
+            t_start = time.perf_counter()
+            out_man.write(begin, end)
+            t_elapsed = time.perf_counter() - t_start
+            prof.setdefault(id(out_man), ProfileStats()).add(
+                t_elapsed, out_man.nbytes(begin, end)
+            )
+
     def __str__(self) -> str:
         return (
             "Input variables:\n  "
@@ -966,6 +1544,8 @@ class ProcessorManager:
         kw_params: dict = None,
         signature: str = None,
         types: list[str] = None,
+        parallel: bool = None,
+        condition: ProcChainVar = None,
     ) -> None:
 
         assert (
@@ -989,6 +1569,8 @@ class ProcessorManager:
         self.args = []
         # dict of kws -> raw values and buffers from params; we will fill this soon
         self.kwargs = {}
+        # variable selecting the waveforms to process, if not all of them
+        self.condition = condition
 
         # Get the signature and list of valid types for the function
         self.signature = func.signature if signature is None else signature
@@ -1062,7 +1644,7 @@ class ProcessorManager:
                         if not ad or this_dim.length != ad:
                             raise ProcessingChainError(
                                 f"failed to broadcast array dimensions for "
-                                f"{func.__name}. Could not find consistent value "
+                                f"{func.__name__}. Could not find consistent value "
                                 f"for dimension {fd}"
                             )
                         if not this_dim.grid:
@@ -1118,6 +1700,28 @@ class ProcessorManager:
                 f"could not find a type signature matching the types of the "
                 f"variables given for {self} (types: {types})"
             )
+        # With a precision policy, use the first types that compute in it
+        # instead of in a wider floating point type
+        precision = proc_chain._precision
+        if precision is not None and _is_wider(found_types[0], precision):
+            preferred = [
+                type_sig
+                for type_sig in found_types
+                if _has_precision(type_sig, precision)
+            ]
+            if preferred:
+                found_types = preferred
+            elif any(
+                isinstance(param, ProcChainVar)
+                and param.shape is not auto
+                and len(param.shape) > 0
+                for param in it.chain(self.params, self.kw_params.values())
+            ):
+                log.warning(
+                    f"{self} has no {precision} type signature matching its "
+                    f"inputs and computes in {np.dtype(found_types[0][-1])}"
+                )
+
         # Use the first types in the list that all our types can be cast to
         self.types = [np.dtype(t) for t in found_types[0]]
 
@@ -1212,7 +1816,7 @@ class ProcessorManager:
                     else:
                         param = float(param / grid.period)
                 if np.issubdtype(dtype, np.integer):
-                    param = dtype.type(round(param))
+                    param = dtype.type(np.round(param))
                 else:
                     param = dtype.type(param)
 
@@ -1221,10 +1825,147 @@ class ProcessorManager:
             else:
                 self.kwargs[arg_name] = param
 
+        # run the block kernel of the processor instead, if it has one
+        if parallel is None:
+            parallel = numba_defaults.parallel
+        info = processor_info(func)
+        if parallel and info is not None and info.block_kernel is not None:
+            self.processor = ParallelGUFunc(func, info.block_kernel, self.types)
+
+        if condition is not None:
+            self._setup_condition()
+
         log.debug(f"added processor: {self}")
 
+    def _setup_condition(self) -> None:
+        """Find the arguments with one row per waveform, and allocate the
+        dense sub-blocks they are gathered into when running on the waveforms
+        selected by :attr:`condition`."""
+        if not isinstance(self.condition, ProcChainVar):
+            raise ProcessingChainError(
+                f"condition {self.condition} of {self} is not a variable"
+            )
+        self.condition.update_auto(shape=())
+        if self.condition.shape != ():
+            raise ProcessingChainError(
+                f"condition {self.condition} of {self} must have one value per "
+                f"waveform; found shape {self.condition.shape}"
+            )
+        self._mask = self.condition.get_buffer()
+        self._written = self.written_slots()
+        if self._written is None:
+            raise ProcessingChainError(
+                f"{self} writes its outputs in place without declaring them "
+                f"(see ProcessorInfo.in_place), so it cannot run with a condition"
+            )
+
+        block_width = self.proc_chain._block_width
+        params = list(it.chain(self.params, self.kw_params.values()))
+        # map from index in arg_slots -> sub-block buffer
+        self._sub_blocks = {}
+        for i, (_, _, arg) in enumerate(self.arg_slots()):
+            if (
+                isinstance(params[i], ProcChainVar)
+                and isinstance(arg, np.ndarray)
+                and arg.ndim > 0
+                and arg.shape[0] == block_width
+            ):
+                self._sub_blocks[i] = np.empty_like(arg)
+
     def execute(self) -> None:
-        self.processor(*self.args, **self.kwargs)
+        if self.condition is None:
+            self.processor(*self.args, **self.kwargs)
+        else:
+            self._execute_selected()
+
+    def _execute_selected(self) -> None:
+        """Run the processor on the waveforms selected by :attr:`condition`
+        only, and fill the outputs of the others.
+
+        Processors that compute each waveform independently (see
+        :func:`_is_row_wise`) are run on dense sub-blocks of the selected
+        waveforms. Others are run on the whole block and only their outputs
+        are filled.
+        """
+        rows = np.flatnonzero(self._mask)
+        if len(rows) == len(self._mask):
+            self.processor(*self.args, **self.kwargs)
+            return
+
+        if not _is_row_wise(self.processor):
+            self.processor(*self.args, **self.kwargs)
+            others = np.flatnonzero(np.logical_not(self._mask))
+            for i, (_, _, arg) in enumerate(self.arg_slots()):
+                if i in self._written and i in self._sub_blocks:
+                    arg[others] = np.nan if arg.dtype.kind in "fc" else 0
+            return
+
+        args = list(self.args)
+        kwargs = dict(self.kwargs)
+        outputs = []
+        for i, (container, key, arg) in enumerate(self.arg_slots()):
+            sub_block = self._sub_blocks.get(i)
+            if sub_block is None:
+                continue
+            sub_block = sub_block[: len(rows)]
+            # outputs written in place are gathered too, in case the
+            # processor only writes some of their values
+            np.take(arg, rows, axis=0, out=sub_block)
+            if i in self._written:
+                outputs.append((arg, sub_block))
+            if container is self.args:
+                args[key] = sub_block
+            else:
+                kwargs[key] = sub_block
+
+        if len(rows) > 0:
+            self.processor(*args, **kwargs)
+
+        for arg, sub_block in outputs:
+            arg[...] = np.nan if arg.dtype.kind in "fc" else 0
+            arg[rows] = sub_block
+
+    def arg_slots(self) -> list[tuple[list | dict, int | str, Any]]:
+        """List of ``(container, key, arg)`` for all the arguments, in the
+        order of the signature, such that ``container[key] is arg``."""
+        return [(self.args, i, arg) for i, arg in enumerate(self.args)] + [
+            (self.kwargs, k, arg) for k, arg in self.kwargs.items()
+        ]
+
+    def n_inputs(self) -> int:
+        """Number of input arguments of the processor, from its signature.
+
+        Processors whose signature has no ``->`` write their outputs in
+        place, and these are counted too (see :meth:`written_slots`).
+        """
+        signature = getattr(self, "signature", None)
+        if signature is None:
+            return self.processor.nin
+        return len(re.findall(r"\((.*?)\)", signature.split("->")[0]))
+
+    def written_slots(self) -> set[int] | None:
+        """Indices in :meth:`arg_slots` of the variables written by the
+        processor, or ``None`` if they are not known.
+
+        These are the arguments after ``->`` in its signature. Processors
+        whose signature has no ``->`` (e.g. :func:`~.processors.presum`, or
+        the factories of :mod:`~.processors.convolutions` and
+        :mod:`~.processors.fftw`) write their outputs in place, and must
+        declare them (see :func:`_in_place_args`).
+        """
+        params = list(it.chain(self.params, self.kw_params.values()))
+        if "->" in self.signature:
+            return set(range(self.n_inputs(), len(params)))
+        in_place = _in_place_args(self.processor)
+        return None if in_place is None else set(in_place)
+
+    def nbytes(self) -> int:
+        """Number of bytes in the array arguments touched by :meth:`execute`."""
+        return sum(
+            arg.nbytes
+            for arg in it.chain(self.args, self.kwargs.values())
+            if isinstance(arg, np.ndarray)
+        )
 
     def __str__(self) -> str:
         return (
@@ -1235,9 +1976,73 @@ class ProcessorManager:
                 + [f"{k}={str(v)}" for k, v in self.kw_params.items()]
             )
             + ")"
+            + ("" if self.condition is None else f" if {self.condition}")
         )
 
 
+def _is_row_wise(processor: Any) -> bool:
+    """Whether `processor` computes each waveform independently of the other
+    rows of its arguments, such that it can be called on any subset of them.
+
+    This is the case of (g)ufuncs. Other callables (e.g. the processors
+    returned by factories) declare it with a ``row_wise`` attribute.
+    """
+    if isinstance(processor, (np.ufunc, UfuncBase, ParallelGUFunc)):
+        return True
+    return getattr(processor, "row_wise", False)
+
+
+def _in_place_args(processor: Any) -> tuple[int, ...] | None:
+    """Indices of the arguments that `processor` writes in place, or ``None``
+    if it does not declare them.
+
+    Registered processors declare them in the registry (see
+    :attr:`.registry.ProcessorInfo.in_place`), and other callables (e.g. the
+    processors returned by factories) with an ``in_place`` attribute.
+    """
+    if isinstance(processor, ParallelGUFunc):
+        processor = processor.gufunc
+    info = processor_info(processor)
+    if info is not None:
+        return info.in_place
+    return getattr(processor, "in_place", None)
+
+
+def _is_wider(type_sig: str, precision: np.dtype) -> bool:
+    """Whether the type signature `type_sig` (e.g. ``"fif"``) has floating
+    point or complex types wider than `precision`."""
+    complex_type = np.result_type(precision, np.complex64)
+    for t in type_sig:
+        t = np.dtype(t)
+        if (t.kind == "f" and t.itemsize > precision.itemsize) or (
+            t.kind == "c" and t.itemsize > complex_type.itemsize
+        ):
+            return True
+    return False
+
+
+def _has_precision(type_sig: str, precision: np.dtype) -> bool:
+    """Whether the type signature `type_sig` has only numeric types, and its
+    floating point and complex types are of the given `precision`."""
+    complex_type = np.result_type(precision, np.complex64)
+    for t in type_sig:
+        t = np.dtype(t)
+        if (
+            t.kind not in "biufc"
+            or (t.kind == "f" and t != precision)
+            or (t.kind == "c" and t != complex_type)
+        ):
+            return False
+    return True
+
+
+def _read_in_precision(var: ProcChainVar, dtype: np.dtype) -> bool:
+    """Whether `var` reads an I/O buffer of floating point type `dtype` in the
+    precision of its processing chain."""
+    precision = var.proc_chain._precision
+    return precision is not None and dtype.kind == "f" and var.dtype == precision
+
+
 class UnitConversionManager(ProcessorManager):
     """A special processor manager for handling converting variables between unit systems."""
 
@@ -1256,7 +2061,11 @@ class UnitConversionManager(ProcessorManager):
 
         from_buffer, from_grid = var._buffer[0]
         period_ratio = from_grid.get_period(unit.period)
-        self.out_buffer = np.zeros_like(from_buffer, dtype="float64")
+        if self.proc_chain._precision is None:
+            out_dtype = np.dtype("float64")
+        else:
+            out_dtype = np.result_type(from_buffer.dtype, self.proc_chain._precision)
+        self.out_buffer = np.zeros_like(from_buffer, dtype=out_dtype)
         self.args = [
             from_buffer,
             from_grid.get_offset(),
@@ -1265,6 +2074,7 @@ class UnitConversionManager(ProcessorManager):
             self.out_buffer,
         ]
         self.kwargs = {}
+        self.condition = None
 
         log.debug(f"added conversion: {self}")
 
@@ -1285,6 +2095,24 @@ class IOManager(metaclass=ABCMeta):
     def write(self, start: int, end: int) -> None:
         pass
 
+    def nbytes(self, start: int, end: int) -> int:
+        """Number of bytes copied by a call to :meth:`read` or :meth:`write`."""
+        return 0
+
+    def buffer_nbytes(self) -> int:
+        """Number of bytes in the linked input/output buffer."""
+        return 0
+
+    #: if ``True``, the processors use the rows of the I/O buffer in place of
+    #: the variable buffer and :meth:`read` and :meth:`write` do not copy them.
+    #: Set by :class:`ProcessingChain` for every block
+    zero_copy = False
+
+    def view_buffers(self) -> tuple[np.ndarray, np.ndarray] | None:
+        """The I/O buffer and the variable buffer that could be replaced by
+        views of its rows, or ``None`` if the data must always be copied."""
+        return None
+
     @abstractmethod
     def __str__(self) -> str:
         pass
@@ -1299,7 +2127,9 @@ class NumpyIOManager(IOManager):
 
         var.update_auto(dtype=io_buf.dtype, shape=io_buf.shape[1:])
 
-        if var.shape != io_buf.shape[1:] or var.dtype != io_buf.dtype:
+        if var.shape != io_buf.shape[1:] or (
+            var.dtype != io_buf.dtype and not _read_in_precision(var, io_buf.dtype)
+        ):
             raise ProcessingChainError(
                 f"numpy.array<{self.io_buf.shape}>({{{self.io_buf.dtype}}}@{self.io_buf.data}) "
                 "is not compatible with variable {self.var}"
@@ -1310,15 +2140,28 @@ class NumpyIOManager(IOManager):
         self.raw_var = var.buffer
 
     def read(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.raw_var[0 : end - start, ...], self.io_buf[start:end, ...], "unsafe"
         )
 
     def write(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.io_buf[start:end, ...], self.raw_var[0 : end - start, ...], "unsafe"
         )
 
+    def nbytes(self, start: int, end: int) -> int:
+        return 0 if self.zero_copy else self.io_buf[start:end, ...].nbytes
+
+    def view_buffers(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.io_buf, self.raw_var
+
+    def buffer_nbytes(self) -> int:
+        return self.io_buf.nbytes
+
     def __str__(self) -> str:
         return (
             f"{self.var} linked to numpy.array(shape={self.io_buf.shape}, "
@@ -1354,9 +2197,9 @@ class LGDOArrayIOManager(IOManager):
         self.var = var
         self.raw_var = var.get_buffer(unit)
 
-        if (
-            self.var.shape != self.io_array.nda.shape[1:]
-            or self.raw_var.dtype != self.io_array.dtype
+        if self.var.shape != self.io_array.nda.shape[1:] or (
+            self.raw_var.dtype != self.io_array.dtype
+            and not _read_in_precision(var, self.io_array.dtype)
         ):
             raise ProcessingChainError(
                 f"LGDO object "
@@ -1365,15 +2208,28 @@ class LGDOArrayIOManager(IOManager):
             )
 
     def read(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.raw_var[0 : end - start, ...], self.raw_buf[start:end, ...], "unsafe"
         )
 
     def write(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.raw_buf[start:end, ...], self.raw_var[0 : end - start, ...], "unsafe"
         )
 
+    def nbytes(self, start: int, end: int) -> int:
+        return 0 if self.zero_copy else self.raw_buf[start:end, ...].nbytes
+
+    def view_buffers(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.raw_buf, self.raw_var
+
+    def buffer_nbytes(self) -> int:
+        return self.raw_buf.nbytes
+
     def __str__(self) -> str:
         return f"{self.var} linked to lgdo.Array(shape={self.io_array.nda.shape}, dtype={self.io_array.nda.dtype}, attrs={self.io_array.attrs})"
 
@@ -1408,9 +2264,9 @@ class LGDOArrayOfEqualSizedArraysIOManager(IOManager):
         self.var = var
         self.raw_var = var.get_buffer(unit)
 
-        if (
-            self.var.shape != self.io_array.nda.shape[1:]
-            or self.raw_var.dtype != self.io_array.dtype
+        if self.var.shape != self.io_array.nda.shape[1:] or (
+            self.raw_var.dtype != self.io_array.dtype
+            and not _read_in_precision(var, self.io_array.dtype)
         ):
             raise ProcessingChainError(
                 f"LGDO object "
@@ -1419,29 +2275,66 @@ class LGDOArrayOfEqualSizedArraysIOManager(IOManager):
             )
 
     def read(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.raw_var[0 : end - start, ...], self.raw_buf[start:end, ...], "unsafe"
         )
 
     def write(self, start: int, end: int) -> None:
+        if self.zero_copy:
+            return
         np.copyto(
             self.raw_buf[start:end, ...], self.raw_var[0 : end - start, ...], "unsafe"
         )
 
+    def nbytes(self, start: int, end: int) -> int:
+        return 0 if self.zero_copy else self.raw_buf[start:end, ...].nbytes
+
+    def view_buffers(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.raw_buf, self.raw_var
+
+    def buffer_nbytes(self) -> int:
+        return self.raw_buf.nbytes
+
     def __str__(self) -> str:
         return f"{self.var} linked to lgdo.ArrayOfEqualSizedArrays(shape={self.io_array.nda.shape}, dtype={self.io_array.nda.dtype}, attrs={self.io_array.attrs})"
 
 
 class LGDOWaveformIOManager(IOManager):
+    """IO Manager for buffers that are lgdo WaveformTables.
+
+    The waveform values may be an :class:`~.lgdo.ArrayOfEqualSizedArrays` or,
+    for waveforms of unequal length, a :class:`~.lgdo.VectorOfVectors`. In the
+    latter case, the variable holds each waveform padded to the length of the
+    longest waveform in the buffer, as for :class:`LGDOVectorOfVectorsIOManager`.
+    Integer samples are then read in floating point, so that the padding is
+    NaN and propagates through the processors. The lengths of the waveforms
+    read and written are handled as for :class:`LGDOVectorOfVectorsIOManager`.
+    """
+
     def __init__(self, wf_table: lgdo.WaveformTable, variable: ProcChainVar) -> None:
         assert isinstance(wf_table, lgdo.WaveformTable) and isinstance(
             variable, ProcChainVar
         )
 
         self.wf_table = wf_table
-        self.wf_buf = wf_table.values.nda
+        self.ragged = isinstance(wf_table.values, lgdo.VectorOfVectors)
         self.t0_buf = wf_table.t0.nda
         self.dt_buf = wf_table.dt.nda
+        self.lengths = None
+        self.lengths_from = None
+        if self.ragged:
+            self.wf_buf = None
+            self.lengths = np.zeros(len(wf_table.values), dtype=np.int64)
+            wf_shape = (_max_vector_length(wf_table.values),)
+            wf_dtype = wf_table.values.dtype
+            if not np.issubdtype(wf_dtype, np.floating):
+                wf_dtype = np.promote_types(wf_dtype, np.float32)
+        else:
+            self.wf_buf = wf_table.values.nda
+            wf_shape = self.wf_buf.shape[1:]
+            wf_dtype = self.wf_buf.dtype
 
         dt_units = wf_table.dt_units
         t0_units = wf_table.t0_units
@@ -1475,8 +2368,8 @@ class LGDOWaveformIOManager(IOManager):
 
         self.var = variable
         self.var.update_auto(
-            shape=self.wf_buf.shape[1:],
-            dtype=self.wf_buf.dtype,
+            shape=wf_shape,
+            dtype=wf_dtype,
             grid=grid,
             unit=wf_table.values_units,
             is_coord=False,
@@ -1487,6 +2380,16 @@ class LGDOWaveformIOManager(IOManager):
             t0_units = self.var.grid.unit_str()
 
         self.wf_var = self.var.buffer
+        if self.ragged:
+            if len(self.var.shape) != 1:
+                raise ProcessingChainError(
+                    f"LGDO object {wf_table.values.form_datatype()} is "
+                    f"incompatible with {str(self.var)}"
+                )
+            if np.issubdtype(self.wf_var.dtype, np.floating):
+                self.fill_val = np.nan
+            else:
+                self.fill_val = 0
 
         self.t0_var = self.var.grid.get_offset(t0_units)
         self.variable_t0 = isinstance(self.t0_var, np.ndarray)
@@ -1498,29 +2401,259 @@ class LGDOWaveformIOManager(IOManager):
         self.wf_table.dt_units = dt_units
 
     def read(self, start: int, end: int) -> None:
-        self.wf_var[0 : end - start, ...] = self.wf_buf[start:end, ...]
+        if self.ragged:
+            values = self.wf_table.values
+            n_rows = _vov_to_padded(
+                values.flattened_data.nda,
+                values.cumulative_length.nda,
+                start,
+                end,
+                self.wf_var,
+                self.lengths,
+                self.fill_val,
+            )
+            if n_rows < end - start:
+                raise ProcessingChainError(
+                    f"waveform {start + n_rows} is longer than {self.var} "
+                    f"({self.var.shape[0]})"
+                )
+        elif not self.zero_copy:
+            self.wf_var[0 : end - start, ...] = self.wf_buf[start:end, ...]
         self.t0_var[0 : end - start, ...] = self.t0_buf[start:end, ...]
 
     def write(self, start: int, end: int) -> None:
-        self.wf_buf[start:end, ...] = self.wf_var[0 : end - start, ...]
+        if self.ragged:
+            _write_padded_to_vov(self.wf_table.values, self.wf_var, self, start, end)
+        elif not self.zero_copy:
+            self.wf_buf[start:end, ...] = self.wf_var[0 : end - start, ...]
         if self.variable_t0:
             self.t0_buf[start:end, ...] = self.t0_var[0 : end - start, ...]
 
+    def nbytes(self, start: int, end: int) -> int:
+        if self.ragged:
+            wf_nbytes = self.wf_var[0 : end - start].nbytes
+        else:
+            wf_nbytes = 0 if self.zero_copy else self.wf_buf[start:end, ...].nbytes
+        return wf_nbytes + self.t0_buf[start:end].nbytes
+
+    def view_buffers(self) -> tuple[np.ndarray, np.ndarray] | None:
+        if self.ragged:
+            return None
+        return self.wf_buf, self.wf_var
+
+    def buffer_nbytes(self) -> int:
+        if self.ragged:
+            values = self.wf_table.values
+            wf_nbytes = (
+                values.flattened_data.nda.nbytes + values.cumulative_length.nda.nbytes
+            )
+        else:
+            wf_nbytes = self.wf_buf.nbytes
+        return wf_nbytes + self.t0_buf.nbytes + self.dt_buf.nbytes
+
     def __str__(self) -> str:
+        values = self.wf_table.values
+        if self.ragged:
+            values_str = (
+                f"values(flattened_data(shape={values.flattened_data.nda.shape}, "
+                f"dtype={values.dtype}), "
+                f"cumulative_length(shape={values.cumulative_length.nda.shape}), "
+                f"attrs={values.attrs}), "
+            )
+        else:
+            values_str = f"values(shape={values.nda.shape}, dtype={values.nda.dtype}, attrs={values.attrs}), "
         return (
             f"{self.var} linked to pygama.lgdo.WaveformTable("
-            f"values(shape={self.wf_table.values.nda.shape}, dtype={self.wf_table.values.nda.dtype}, attrs={self.wf_table.values.attrs}), "
-            f"dt(shape={self.wf_table.dt.nda.shape}, dtype={self.wf_table.dt.nda.dtype}, attrs={self.wf_table.dt.attrs}), "
+            + values_str
+            + f"dt(shape={self.wf_table.dt.nda.shape}, dtype={self.wf_table.dt.nda.dtype}, attrs={self.wf_table.dt.attrs}), "
             f"t0(shape={self.wf_table.t0.nda.shape}, dtype={self.wf_table.t0.nda.dtype}, attrs={self.wf_table.t0.attrs}))"
         )
 
 
+class LGDOVectorOfVectorsIOManager(IOManager):
+    """IO Manager for buffers that are lgdo VectorOfVectors.
+
+    The variable holds each vector padded to a fixed length. When reading,
+    the vectors are padded with NaN (or zero for integer types); the length
+    of the variable is deduced from the longest vector in the buffer, and the
+    length of each vector read is kept in :attr:`lengths`. When writing, each
+    row keeps the length of the same row of the input it shares its lengths
+    with (see :meth:`ProcessingChain._share_vector_lengths`), or else ends at
+    its first NaN (or is the whole row for integer types).
+    """
+
+    def __init__(self, io_vov: lgdo.VectorOfVectors, var: ProcChainVar) -> None:
+        assert isinstance(io_vov, lgdo.VectorOfVectors) and isinstance(
+            var, ProcChainVar
+        )
+
+        unit = io_vov.attrs.get("units", None)
+        max_len = _max_vector_length(io_vov)
+        var.update_auto(dtype=io_vov.dtype, shape=(max_len,), unit=unit)
+        if unit is None and var.unit is not None:
+            io_vov.attrs["units"] = str(var.unit)
+
+        self.io_vov = io_vov
+        self.var = var
+        self.raw_var = var.get_buffer(unit)
+        self.lengths = np.zeros(len(io_vov), dtype=np.int64)
+        self.lengths_from = None
+
+        if len(self.var.shape) != 1 or self.raw_var.dtype != io_vov.dtype:
+            raise ProcessingChainError(
+                f"LGDO object {io_vov.form_datatype()} is incompatible with "
+                f"{str(self.var)}"
+            )
+        if np.issubdtype(io_vov.dtype, np.floating):
+            self.fill_val = np.nan
+        else:
+            self.fill_val = 0
+
+    def read(self, start: int, end: int) -> None:
+        n_rows = _vov_to_padded(
+            self.io_vov.flattened_data.nda,
+            self.io_vov.cumulative_length.nda,
+            start,
+            end,
+            self.raw_var,
+            self.lengths,
+            self.fill_val,
+        )
+        if n_rows < end - start:
+            raise ProcessingChainError(
+                f"vector {start + n_rows} is longer than {self.var} "
+                f"({self.var.shape[0]})"
+            )
+
+    def write(self, start: int, end: int) -> None:
+        _write_padded_to_vov(self.io_vov, self.raw_var, self, start, end)
+
+    def nbytes(self, start: int, end: int) -> int:
+        return self.raw_var[0 : end - start].nbytes
+
+    def buffer_nbytes(self) -> int:
+        return (
+            self.io_vov.flattened_data.nda.nbytes
+            + self.io_vov.cumulative_length.nda.nbytes
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.var} linked to lgdo.VectorOfVectors("
+            f"flattened_data(shape={self.io_vov.flattened_data.nda.shape}, "
+            f"dtype={self.io_vov.dtype}), "
+            f"cumulative_length(shape={self.io_vov.cumulative_length.nda.shape}), "
+            f"attrs={self.io_vov.attrs})"
+        )
+
+
+def _max_vector_length(vov: lgdo.VectorOfVectors) -> int:
+    """Length of the longest vector in `vov` (at least 1)."""
+    cl_buf = vov.cumulative_length.nda
+    return int(np.max(np.diff(cl_buf, prepend=0), initial=1))
+
+
+@njit(cache=True)
+def _vov_to_padded(
+    flattened_data: np.ndarray,
+    cumulative_length: np.ndarray,
+    start: int,
+    end: int,
+    padded: np.ndarray,
+    lengths: np.ndarray,
+    fill_val: float,
+) -> int:
+    """Copy the vectors `start` to `end` into the rows of `padded`, filling the
+    rest of the rows with `fill_val`, and their lengths into `lengths`. Return
+    the number of rows copied, which is less than ``end - start`` if a vector
+    does not fit in a row.
+    """
+    for i in range(start, end):
+        vec_start = 0 if i == 0 else cumulative_length[i - 1]
+        vec_len = cumulative_length[i] - vec_start
+        if vec_len > padded.shape[1]:
+            return i - start
+        for j in range(vec_len):
+            padded[i - start, j] = flattened_data[vec_start + j]
+        for j in range(vec_len, padded.shape[1]):
+            padded[i - start, j] = fill_val
+        lengths[i - start] = vec_len
+    return end - start
+
+
+@njit(cache=True)
+def _first_nan(padded: np.ndarray, lengths: np.ndarray) -> None:
+    """Set `lengths` to the index of the first NaN of each row of `padded`,
+    or to the length of the row if it has none.
+    """
+    for i in range(padded.shape[0]):
+        lengths[i] = padded.shape[1]
+        for j in range(padded.shape[1]):
+            if padded[i, j] != padded[i, j]:
+                lengths[i] = j
+                break
+
+
+def _write_padded_to_vov(
+    vov: lgdo.VectorOfVectors,
+    padded: np.ndarray,
+    io_man: IOManager,
+    start: int,
+    end: int,
+) -> None:
+    """Write the first ``end - start`` rows of `padded` to the vectors `start`
+    to `end` of `vov`, growing its flattened data as needed. The length of
+    each vector is taken from the ``lengths_from`` input of `io_man` if it
+    has one (see :meth:`ProcessingChain._share_vector_lengths`), or else is
+    the position of the first NaN of the row.
+    """
+    padded = padded[0 : end - start]
+    if io_man.lengths_from is not None:
+        lengths = io_man.lengths_from.lengths[0 : end - start]
+    else:
+        lengths = io_man.lengths[0 : end - start]
+        _first_nan(padded, lengths)
+
+    flattened_data = vov.flattened_data
+    cl_buf = vov.cumulative_length.nda
+    offset = 0 if start == 0 else int(cl_buf[start - 1])
+    # the buffer only grows
+    needed = offset + int(np.sum(lengths))
+    if needed > len(flattened_data.nda):
+        new_len = max(needed, 2 * len(flattened_data.nda))
+        new_data = np.empty(new_len, dtype=flattened_data.nda.dtype)
+        new_data[:offset] = flattened_data.nda[:offset]
+        flattened_data.nda = new_data
+    _padded_to_vov(padded, lengths, flattened_data.nda, cl_buf, start, offset)
+
+
+@njit(cache=True)
+def _padded_to_vov(
+    padded: np.ndarray,
+    lengths: np.ndarray,
+    flattened_data: np.ndarray,
+    cumulative_length: np.ndarray,
+    start: int,
+    offset: int,
+) -> None:
+    """Append the first `lengths` values of each row of `padded` to
+    `flattened_data` at `offset`, and set the corresponding
+    `cumulative_length` from `start`.
+    """
+    for i in range(padded.shape[0]):
+        for j in range(lengths[i]):
+            flattened_data[offset] = padded[i, j]
+            offset += 1
+        cumulative_length[start + i] = offset
+
+
 def build_processing_chain(
     lh5_in: lgdo.Table,
     dsp_config: dict | str,
     db_dict: dict = None,
     outputs: list[str] = None,
     block_width: int = 16,
+    precision: str = None,
 ) -> tuple[ProcessingChain, list[str], lgdo.Table]:
     """Produces a :class:`ProcessingChain` object and an LH5
     :class:`~.lgdo.table.Table` for output parameters from an input LH5
@@ -1540,6 +2673,7 @@ def build_processing_chain(
 
             {
                "outputs" : [ "par1", "par2" ]
+               "precision" : "float32"
                "processors" : {
                   "name1, name2" : {
                     "function" : "func1"
@@ -1555,6 +2689,8 @@ def build_processing_chain(
 
         - ``outputs`` -- list of output parameters (strings) to compute by
           default. See `outputs` argument
+        - ``precision`` -- optional floating point type to compute in. See
+          `precision` argument
         - ``processors`` -- configuration dictionary
 
           - ``name1, name2`` -- dictionary. key contains comma-separated
@@ -1579,6 +2715,21 @@ def build_processing_chain(
             - ``unit`` -- list of strings. Units for parameters
             - ``defaults`` -- dictionary. Default value to be used for
               arguments read from the database
+            - ``lgdo_type`` -- string or list of strings. Set to
+              ``"VectorOfVectors"`` to write array parameters as a
+              :class:`~.lgdo.vectorofvectors.VectorOfVectors` holding the
+              values of each row up to the first NaN, instead of fixed-length
+              arrays
+            - ``parallel`` -- boolean. Whether to run the block kernel of the
+              processor, if it has one, splitting the waveforms of each block
+              between threads. Defaults to the ``parallel`` option of
+              :data:`~.utils.numba_defaults`
+            - ``condition`` -- string. Expression (e.g. ``"trapEmax > 100"``)
+              selecting the waveforms to run the processor on; the outputs
+              of the other waveforms are filled with ``NaN``. Processors using
+              the outputs of a conditioned processor inherit its condition
+              (combined with ``and`` if they use several), unless they set
+              their own, or ``null`` to run on all waveforms
 
     db_dict
         A nested :class:`dict` pointing to values for database arguments. As
@@ -1595,6 +2746,11 @@ def build_processing_chain(
         a multiple of 16 is preferred, but if performance is not an issue
         any value can be used.
 
+    precision
+        floating point type to compute in, see :class:`ProcessingChain`. If
+        ``None``, use the ``"precision"`` of `dsp_config`, if any. The
+        precision is stored in the ``precision`` attribute of `lh5_out`.
+
     Returns
     -------
     (proc_chain, field_mask, lh5_out)
@@ -1603,8 +2759,6 @@ def build_processing_chain(
         - `lh5_out` -- output :class:`~.lgdo.table.Table` containing processed
           values
     """
-    proc_chain = ProcessingChain(block_width, lh5_in.size)
-
     if isinstance(dsp_config, str):
         with open(dsp_config) as f:
             dsp_config = json.load(f)
@@ -1614,6 +2768,10 @@ def build_processing_chain(
         # We don't want to modify the input!
         dsp_config = deepcopy(dsp_config)
 
+    if precision is None:
+        precision = dsp_config.get("precision")
+    proc_chain = ProcessingChain(block_width, lh5_in.size, precision)
+
     if outputs is None:
         outputs = dsp_config["outputs"]
 
@@ -1621,7 +2779,6 @@ def build_processing_chain(
 
     # prepare the processor list
     multi_out_procs = {}
-    db_parser = re.compile(r"db.[\w_.]+")
     for key, node in processors.items():
         # if we have multiple outputs, add each to the processesors list
         keys = [k for k in re.split(",| ", key) if k != ""]
@@ -1632,35 +2789,18 @@ def build_processing_chain(
         # find DB lookups in args and replace the values
         args = node["args"]
         for i, arg in enumerate(args):
-            if not isinstance(arg, str):
-                continue
-            for db_var in db_parser.findall(arg):
-                try:
-                    db_node = db_dict
-                    for key in db_var[3:].split("."):
-                        db_node = db_node[key]
-                    log.debug(f"database lookup: found {db_node} for {db_var}")
-                except (KeyError, TypeError):
-                    try:
-                        db_node = node["defaults"][db_var]
-                        log.debug(
-                            f"Database lookup: using default value of {db_node} for {db_var}"
-                        )
-                    except (KeyError, TypeError):
-                        raise ProcessingChainError(
-                            f"""did not find {db_var} in database, and could
-                                not find default value."""
-                        )
-                if arg == db_var:
-                    arg = db_node
-                else:
-                    arg = arg.replace(db_var, str(db_node))
-            args[i] = arg
+            if isinstance(arg, str):
+                args[i] = _db_lookup(arg, db_dict, node.get("defaults"))
+
+        if isinstance(node.get("condition"), str):
+            node["condition"] = _db_lookup(
+                node["condition"], db_dict, node.get("defaults")
+            )
 
         # parse the arguments list for prereqs, if not included explicitly
         if "prereqs" not in node:
             prereqs = []
-            for arg in node["args"]:
+            for arg in node["args"] + [node.get("condition")]:
                 if not isinstance(arg, str):
                     continue
                 for prereq in proc_chain.get_variable(arg, True):
@@ -1744,11 +2884,29 @@ def build_processing_chain(
             ) from e
 
     # now add the processors
+    conditions = {}  # map from parameter -> condition of its processor
     for proc_par in proc_par_list:
         recipe = processors[proc_par]
+
+        # inherit the conditions of the processors computing the inputs
+        if "condition" in recipe:
+            condition = recipe["condition"]
+        else:
+            inherited = []
+            for prereq in recipe["prereqs"]:
+                cond = conditions.get(prereq)
+                if cond is not None and cond not in inherited:
+                    inherited.append(cond)
+            if len(inherited) > 1:
+                condition = " and ".join(f"({cond})" for cond in inherited)
+            else:
+                condition = inherited[0] if inherited else None
+        for name in re.split(",| ", proc_par):
+            if name != "":
+                conditions[name] = condition
+
         try:
-            module = importlib.import_module(recipe["module"])
-            func = getattr(module, recipe["function"])
+            func = get_function(recipe["function"], recipe["module"])
             args = recipe["args"]
 
             # Initialize the new variables, if needed
@@ -1771,32 +2929,15 @@ def build_processing_chain(
                 init_args = []
                 init_kwargs = {}
                 for _, arg in enumerate(init_args_in):
-                    for db_var in db_parser.findall(arg):
-                        try:
-                            db_node = db_dict
-                            for key in db_var[3:].split("."):
-                                db_node = db_node[key]
-                            log.debug(f"database lookup: found {db_node} for {db_var}")
-                        except (KeyError, TypeError):
-                            try:
-                                db_node = recipe["defaults"][db_var]
-                                log.debug(
-                                    "database lookup: using default value of {db_node} for {db_var}"
-                                )
-                            except (KeyError, TypeError):
-                                raise ProcessingChainError(
-                                    f"did not find {db_var} in database, and "
-                                    f"could not find default value."
-                                )
-
-                        if arg == db_var:
-                            arg = db_node
-                        else:
-                            arg = arg.replace(db_var, str(db_node))
+                    if isinstance(arg, str):
+                        arg = _db_lookup(arg, db_dict, recipe.get("defaults"))
 
                     # see if string can be parsed by proc_chain
                     if isinstance(arg, str):
                         arg = proc_chain.get_variable(arg)
+                    # factories get the buffers of variables (e.g. for FFTW)
+                    if isinstance(arg, ProcChainVar):
+                        arg = arg.get_buffer()
                     if isinstance(arg, dict):
                         init_kwargs.update(arg)
                     else:
@@ -1811,7 +2952,13 @@ def build_processing_chain(
             except KeyError:
                 pass
 
-            proc_chain.add_processor(func, *args, **kwargs)
+            proc_chain.add_processor(
+                func,
+                *args,
+                parallel=recipe.get("parallel"),
+                condition=condition,
+                **kwargs,
+            )
         except Exception as e:
             raise ProcessingChainError(
                 "Exception raised while attempting to add processor:\n"
@@ -1820,6 +2967,8 @@ def build_processing_chain(
 
     # build the output buffers
     lh5_out = lgdo.Table(size=proc_chain._buffer_len)
+    if proc_chain._precision is not None:
+        lh5_out.attrs["precision"] = str(proc_chain._precision)
 
     # add inputs that are directly copied
     for copy_par in copy_par_list:
@@ -1834,7 +2983,14 @@ def build_processing_chain(
     # finally, add the output buffers to lh5_out and the proc chain
     for out_par in out_par_list:
         try:
-            buf_out = proc_chain.link_output_buffer(out_par)
+            buf_out = None
+            if _lgdo_type(processors, out_par) == "VectorOfVectors":
+                var = proc_chain.get_variable(out_par)
+                buf_out = lgdo.VectorOfVectors(
+                    shape_guess=(proc_chain._buffer_len, var.shape[0]),
+                    dtype=var.dtype,
+                )
+            buf_out = proc_chain.link_output_buffer(out_par, buf_out)
             lh5_out.add_field(out_par, buf_out)
         except Exception as e:
             raise ProcessingChainError(
@@ -1843,3 +2999,282 @@ def build_processing_chain(
 
     field_mask = input_par_list + copy_par_list
     return (proc_chain, field_mask, lh5_out)
+
+
+def _lgdo_type(processors: dict, par: str) -> str | None:
+    """The ``lgdo_type`` of the output parameter `par` of a processor."""
+    key = processors[par] if isinstance(processors[par], str) else par
+    lgdo_type = processors[key].get("lgdo_type")
+    if isinstance(lgdo_type, list):
+        names = [k for k in re.split(",| ", key) if k != ""]
+        lgdo_type = lgdo_type[names.index(par)]
+    return lgdo_type
+
+
+def merge_dsp_configs(
+    dsp_configs: list[dict | str],
+    db_dicts: list[dict] = None,
+    outputs: list[list[str]] = None,
+) -> tuple[dict, list[dict[str, str]]]:
+    """Merge several :func:`build_processing_chain` configurations into one,
+    so that they can be run by a single :class:`ProcessingChain`.
+
+    Processors that are identical in several configurations (same function,
+    arguments, database values and units, computed from the same inputs) are
+    only kept once, so e.g. a baseline subtraction shared by all the
+    configurations runs once. Parameters of different processors with the
+    same name are renamed.
+
+    Parameters
+    ----------
+    dsp_configs
+        list of configuration dictionaries or JSON filenames. See
+        :func:`build_processing_chain`.
+    db_dicts
+        the database of every configuration. The values are looked up while
+        merging, so the merged configuration is built without a database.
+    outputs
+        the output parameters of every configuration. If ``None``, use the
+        ``"outputs"`` lists of the configurations.
+
+    Returns
+    -------
+    (dsp_config, names)
+        - `dsp_config` -- the merged configuration
+        - `names` -- for every configuration, a :class:`dict` mapping its
+          output parameters to their names in `dsp_config`
+    """
+    n_configs = len(dsp_configs)
+    if db_dicts is None:
+        db_dicts = [None] * n_configs
+    if outputs is None:
+        outputs = [None] * n_configs
+
+    configs = []
+    for dsp_config in dsp_configs:
+        if isinstance(dsp_config, str):
+            with open(dsp_config) as f:
+                dsp_config = json.load(f)
+        configs.append(deepcopy(dsp_config))
+
+    # names computed by each configuration, and the processor computing them
+    produced = [_produced_names(config["processors"]) for config in configs]
+
+    # input parameters (and units, etc.) must never be shadowed
+    used_names = set()
+    for config, procs in zip(configs, produced):
+        for node in config["processors"].values():
+            used_names |= _identifiers(node) - procs.keys()
+
+    merged = {}
+    merged_outputs = []
+    merged_keys = {}  # processor recipe -> names of its outputs in merged
+    all_names = []
+    for i_config, (config, procs, db_dict) in enumerate(
+        zip(configs, produced, db_dicts)
+    ):
+        processors = config["processors"]
+        names = {}
+
+        for key in _processor_order(processors, procs):
+            keys = [k for k in re.split(",| ", key) if k != ""]
+            node = _resolve_db(processors[key], db_dict)
+
+            # compare the recipe with the outputs left out
+            placeholders = {k: f"__out{j}__" for j, k in enumerate(keys)}
+            node = _rename(node, names | placeholders)
+            recipe = json.dumps(node, sort_keys=True, default=str)
+            if recipe not in merged_keys:
+                new_keys = []
+                for k in keys:
+                    new_key, n = k, i_config
+                    while new_key in used_names:
+                        new_key = f"{k}_{n}"
+                        n += 1
+                    used_names.add(new_key)
+                    new_keys.append(new_key)
+                merged[", ".join(new_keys)] = _rename(
+                    node, dict(zip(placeholders.values(), new_keys))
+                )
+                merged_keys[recipe] = new_keys
+            names.update(zip(keys, merged_keys[recipe]))
+
+        config_outputs = outputs[i_config]
+        if config_outputs is None:
+            config_outputs = config["outputs"]
+        names = {out: names.get(out, out) for out in config_outputs}
+        for out in names.values():
+            if out not in merged_outputs:
+                merged_outputs.append(out)
+        all_names.append(names)
+
+    merged_config = {"outputs": merged_outputs, "processors": merged}
+    precisions = {config.get("precision") for config in configs}
+    if len(precisions) > 1:
+        raise ProcessingChainError(
+            f"cannot merge configurations with different precisions {precisions}"
+        )
+    if precisions != {None}:
+        merged_config["precision"] = precisions.pop()
+
+    return merged_config, all_names
+
+
+def recipe_hashes(dsp_config: dict | str, db_dict: dict = None) -> dict[str, str]:
+    """Hash the recipe of every parameter computed by a
+    :func:`build_processing_chain` configuration.
+
+    The hash of a parameter covers its processor (function, arguments with
+    the database values looked up, units, etc.) and, recursively, the
+    processors of its inputs. It therefore changes if and only if something
+    the parameter depends on changes.
+
+    Parameters
+    ----------
+    dsp_config
+        configuration dictionary or JSON filename.
+    db_dict
+        the database of the configuration.
+
+    Returns
+    -------
+    hashes
+        a :class:`dict` mapping the names of the computed parameters to
+        hexadecimal hashes.
+    """
+    if isinstance(dsp_config, str):
+        with open(dsp_config) as f:
+            dsp_config = json.load(f)
+
+    processors = dsp_config["processors"]
+    procs = _produced_names(processors)
+    hashes = {}
+    for key in _processor_order(processors, procs):
+        node = _resolve_db(processors[key], db_dict)
+        # running a processor in parallel does not change its outputs
+        node = {k: v for k, v in node.items() if k != "parallel"}
+        deps = {
+            dep: hashes[dep]
+            for dep in _identifiers(node)
+            if dep in procs and procs[dep] != key
+        }
+        recipe = [node, deps]
+        if dsp_config.get("precision") is not None:
+            recipe.append(dsp_config["precision"])
+        recipe = json.dumps(recipe, sort_keys=True, default=str)
+        node_hash = sha1(recipe.encode()).hexdigest()
+        for name in re.split(",| ", key):
+            if name != "":
+                hashes[name] = node_hash
+    return hashes
+
+
+def _produced_names(processors: dict) -> dict[str, str]:
+    """Map the names computed by `processors` to the key of their processor."""
+    return {
+        name: key for key in processors for name in re.split(",| ", key) if name != ""
+    }
+
+
+def _processor_order(processors: dict, procs: dict[str, str]) -> list[str]:
+    """Order the keys of `processors` such that processors come after the
+    processors computing their inputs. `procs` maps every computed name to
+    the key of its processor.
+    """
+    order = []
+
+    def resolve(key: str, unresolved: list[str]) -> None:
+        if key in order:
+            return
+        elif key in unresolved:
+            raise ProcessingChainError(
+                f"Circular references detected for parameter '{key}'"
+            )
+        for dep in sorted(_identifiers(processors[key])):
+            if dep in procs and procs[dep] != key:
+                resolve(procs[dep], unresolved + [key])
+        order.append(key)
+
+    for key in processors:
+        resolve(key, [])
+    return order
+
+
+def _resolve_db(node: dict, db_dict: dict) -> dict:
+    """Copy of a processor configuration with the database lookups in its
+    arguments replaced by their values.
+    """
+    node = deepcopy(node)
+    defaults = node.pop("defaults", None)
+    for field in ("args", "init_args"):
+        if field in node:
+            node[field] = [
+                _db_lookup(arg, db_dict, defaults) if isinstance(arg, str) else arg
+                for arg in node[field]
+            ]
+    if isinstance(node.get("condition"), str):
+        node["condition"] = _db_lookup(node["condition"], db_dict, defaults)
+    return node
+
+
+def _db_lookup(arg: str, db_dict: dict, defaults: dict = None) -> Any:
+    """Replace the ``db.`` lookups in `arg` with the values in `db_dict`, or in
+    `defaults` if they are not found. If `arg` is a single lookup, the value is
+    returned as is, otherwise it is formatted into `arg`.
+    """
+    for db_var in re.findall(r"db.[\w_.]+", arg):
+        try:
+            db_node = db_dict
+            for key in db_var[3:].split("."):
+                db_node = db_node[key]
+            log.debug(f"database lookup: found {db_node} for {db_var}")
+        except (KeyError, TypeError):
+            try:
+                db_node = defaults[db_var]
+                log.debug(
+                    f"database lookup: using default value of {db_node} for {db_var}"
+                )
+            except (KeyError, TypeError):
+                raise ProcessingChainError(
+                    f"did not find {db_var} in database, and could not find "
+                    "default value."
+                )
+
+        if arg == db_var:
+            return db_node
+        arg = arg.replace(db_var, str(db_node))
+    return arg
+
+
+# variable names in a processor argument (but not attributes, e.g. db.a.b)
+_identifier = re.compile(r"(?<![\w.])[A-Za-z_]\w*")
+
+
+def _identifiers(node: dict) -> set[str]:
+    """Names used in the arguments of a processor configuration."""
+    names = set()
+    for field in ("args", "init_args", "prereqs"):
+        for arg in node.get(field, []):
+            if isinstance(arg, str):
+                names.update(_identifier.findall(arg))
+    if isinstance(node.get("condition"), str):
+        names.update(_identifier.findall(node["condition"]))
+    return names
+
+
+def _rename(node: dict, names: dict[str, str]) -> dict:
+    """Rename the variables in the arguments of a processor configuration."""
+    node = dict(node)
+    for field in ("args", "init_args", "prereqs"):
+        if field in node:
+            node[field] = [
+                _identifier.sub(lambda m: names.get(m[0], m[0]), arg)
+                if isinstance(arg, str)
+                else arg
+                for arg in node[field]
+            ]
+    if isinstance(node.get("condition"), str):
+        node["condition"] = _identifier.sub(
+            lambda m: names.get(m[0], m[0]), node["condition"]
+        )
+    return node
@@ -59,90 +59,67 @@ several advantages:
    to use functions that operate in place as much as possible!
 """
 
-from .bl_subtract import bl_subtract
-from .convolutions import cusp_filter, t0_filter, zac_filter
-from .dwt import discrete_wavelet_transform
-from .fftw import dft, inv_dft, psd
-from .fixed_time_pickoff import fixed_time_pickoff
-from .gaussian_filter1d import gaussian_filter1d
-from .get_multi_local_extrema import get_multi_local_extrema
-from .histogram import histogram, histogram_stats
-from .linear_slope_fit import linear_slope_fit
-from .log_check import log_check
-from .min_max import min_max
-from .moving_window_max import moving_window_max
-from .moving_windows import (
-    avg_current,
-    moving_window_left,
-    moving_window_multi,
-    moving_window_right,
-)
-from .multi_a_filter import multi_a_filter
-from .multi_t_filter import multi_t_filter, remove_duplicates
-from .optimize import optimize_1pz, optimize_2pz
-from .param_lookup import param_lookup
-from .peak_snr_threshold import peak_snr_threshold
-from .pole_zero import double_pole_zero, pole_zero
-from .presum import presum
-from .pulse_injector import inject_exp_pulse, inject_sig_pulse
-from .saturation import saturation
-from .soft_pileup_corr import soft_pileup_corr, soft_pileup_corr_bl
-from .subtract_line import subline
-from .time_over_threshold import time_over_threshold
-from .time_point_thresh import time_point_thresh
-from .trap_filters import asym_trap_filter, trap_filter, trap_norm, trap_pickoff
-from .upsampler import interpolating_upsampler, upsampler
-from .waveletDenoise import denoise_wave
-from .wiener_filter import wiener_filter
-from .windower import windower
+import sys
 
-__all__ = [
-    "bl_subtract",
-    "cusp_filter",
-    "t0_filter",
-    "zac_filter",
-    "discrete_wavelet_transform",
-    "dft",
-    "inv_dft",
-    "psd",
-    "fixed_time_pickoff",
-    "gaussian_filter1d",
-    "get_multi_local_extrema",
-    "histogram",
-    "histogram_stats",
-    "linear_slope_fit",
-    "log_check",
-    "min_max",
-    "avg_current",
-    "moving_window_left",
-    "moving_window_multi",
-    "moving_window_right",
-    "multi_a_filter",
-    "multi_t_filter",
-    "remove_duplicates",
-    "optimize_1pz",
-    "optimize_2pz",
-    "param_lookup",
-    "double_pole_zero",
-    "pole_zero",
-    "presum",
-    "inject_exp_pulse",
-    "inject_sig_pulse",
-    "saturation",
-    "peak_snr_threshold",
-    "soft_pileup_corr",
-    "soft_pileup_corr_bl",
-    "time_point_thresh",
-    "asym_trap_filter",
-    "trap_filter",
-    "trap_norm",
-    "trap_pickoff",
-    "upsampler",
-    "interpolating_upsampler",
-    "wiener_filter",
-    "windower",
-    "time_over_threshold",
-    "subline",
-    "denoise_wave",
-    "moving_window_max",
-]
+from pygama.dsp.utils import LazyPackage
+
+# processors are imported from their module on first access
+__lazy__ = {
+    "bl_subtract": "bl_subtract",
+    "cusp_filter": "convolutions",
+    "cusp_filter_bank": "convolutions",
+    "t0_filter": "convolutions",
+    "zac_filter": "convolutions",
+    "zac_filter_bank": "convolutions",
+    "discrete_wavelet_transform": "dwt",
+    "dft": "fftw",
+    "inv_dft": "fftw",
+    "psd": "fftw",
+    "fixed_time_pickoff": "fixed_time_pickoff",
+    "gaussian_filter1d": "gaussian_filter1d",
+    "get_multi_local_extrema": "get_multi_local_extrema",
+    "histogram": "histogram",
+    "histogram_stats": "histogram",
+    "linear_slope_fit": "linear_slope_fit",
+    "log_check": "log_check",
+    "min_max": "min_max",
+    "avg_current": "moving_windows",
+    "moving_window_left": "moving_windows",
+    "moving_window_multi": "moving_windows",
+    "moving_window_right": "moving_windows",
+    "multi_a_filter": "multi_a_filter",
+    "multi_t_filter": "multi_t_filter",
+    "remove_duplicates": "multi_t_filter",
+    "optimize_1pz": "optimize",
+    "optimize_2pz": "optimize",
+    "param_lookup": "param_lookup",
+    "double_pole_zero": "pole_zero",
+    "pole_zero": "pole_zero",
+    "presum": "presum",
+    "inject_exp_pulse": "pulse_injector",
+    "inject_sig_pulse": "pulse_injector",
+    "saturation": "saturation",
+    "peak_snr_threshold": "peak_snr_threshold",
+    "soft_pileup_corr": "soft_pileup_corr",
+    "soft_pileup_corr_bl": "soft_pileup_corr",
+    "time_point_thresh": "time_point_thresh",
+    "interpolated_time_point_thresh": "time_point_thresh",
+    "asym_trap_filter": "trap_filters",
+    "trap_filter": "trap_filters",
+    "trap_filter_bank": "trap_filters",
+    "trap_norm": "trap_filters",
+    "trap_pickoff": "trap_filters",
+    "trap_pickoff_bank": "trap_filters",
+    "upsampler": "upsampler",
+    "interpolating_upsampler": "upsampler",
+    "wiener_filter": "wiener_filter",
+    "windower": "windower",
+    "time_over_threshold": "time_over_threshold",
+    "subline": "subtract_line",
+    "denoise_wave": "waveletDenoise",
+    "moving_window_max": "moving_window_max",
+}
+
+__all__ = list(__lazy__)
+
+sys.modules[__name__].__class__ = LazyPackage
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, jit, prange
 
+from pygama.dsp.registry import block_kernel, register_processor
+from pygama.dsp.utils import numba_defaults as nb_defaults
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@jit(nopython=True, **nb_kwargs)
+def _bl_subtract(w_in: np.ndarray, a_baseline: float, w_out: np.ndarray) -> None:
+    w_out[:] = np.nan
+
+    if np.isnan(w_in).any() or np.isnan(a_baseline):
+        return
+
+    w_out[:] = w_in[:] - a_baseline
+
+
+@register_processor(fusible=True)
 @guvectorize(
     ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
     "(n),()->(n)",
@@ -35,9 +48,13 @@ def bl_subtract(w_in: np.ndarray, a_baseline: float, w_out: np.ndarray) -> None:
             "unit": "ADC"
         }
     """
-    w_out[:] = np.nan
+    _bl_subtract(w_in, a_baseline, w_out)
 
-    if np.isnan(w_in).any() or np.isnan(a_baseline):
-        return
 
-    w_out[:] = w_in[:] - a_baseline
+@block_kernel(bl_subtract)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _bl_subtract_block(
+    w_in: np.ndarray, a_baseline: np.ndarray, w_out: np.ndarray
+) -> None:
+    for i in prange(len(w_in)):
+        _bl_subtract(w_in[i], a_baseline[i], w_out[i])
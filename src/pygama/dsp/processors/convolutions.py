@@ -3,12 +3,248 @@ from __future__ import annotations
 from typing import Callable
 
 import numpy as np
-from numba import guvectorize
+from scipy.fft import next_fast_len
 
 from pygama.dsp.errors import DSPFatal
-from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
+from pygama.dsp.kernel_cache import cached_kernel
+from pygama.dsp.registry import register_processor
 
+from .fftw import fftw_plan
 
+
+class FFTConvolution:
+    """Convolve blocks of waveforms with fixed kernels using FFTs.
+
+    The kernel spectra are computed once for each block shape and reused for
+    every following block, and the FFTW plans are shared through
+    :func:`.fftw.fftw_plan`. Each call transforms all the waveforms of the
+    block at once and writes the result in the output array in place. With a
+    bank of kernels, the transform of each waveform is shared between all the
+    kernels. Waveforms containing NaNs give an output of NaNs.
+
+    The object exposes the ``signature`` and ``types`` of a
+    :class:`numpy.ufunc`, so that it can be added to a
+    :class:`~.dsp.processing_chain.ProcessingChain` like any other processor.
+    It is returned by the factory processors in this module.
+    """
+
+    types = ["ff->", "dd->"]
+    nin = 2
+    nout = 0
+    #: waveforms are independent, so any subset of a block can be convolved
+    #: (e.g. the waveforms selected by a processor ``condition``)
+    row_wise = True
+    #: the filtered waveforms are written in place in the second argument
+    in_place = (1,)
+
+    def __init__(self, kernel: np.ndarray, mode: str, name: str) -> None:
+        """
+        Parameters
+        ----------
+        kernel
+            the kernel to convolve the waveforms with, or a 2D array with one
+            kernel per row to apply a bank of filters. In the latter case, the
+            output has one filtered waveform per kernel.
+        mode
+            ``valid`` to keep only the samples where the kernel and the
+            waveform overlap completely, as with :func:`numpy.convolve`;
+            the output length must be the input length minus the kernel
+            length plus one. ``head`` to keep the first samples of the full
+            convolution; the output can not be longer than the input.
+        name
+            name of the processor.
+        """
+        if mode not in ("valid", "head"):
+            raise ValueError(f"unknown convolution mode {mode}")
+
+        self.kernel = np.asarray(kernel, dtype=np.float64)
+        if self.kernel.ndim not in (1, 2):
+            raise ValueError("the kernel must be a 1D or 2D array")
+
+        self.signature = "(n),(m)" if self.kernel.ndim == 1 else "(n),(p,m)"
+        self.mode = mode
+        self.__name__ = name
+        self._plans = {}
+
+    def _get_plan(self, n_rows: int, n_fft: int) -> tuple:
+        """Return the buffers and the forward and backward FFTW plans used to
+        convolve `n_rows` waveforms using FFTs of length `n_fft`. The buffers
+        can have more than `n_rows` rows.
+        """
+        plan = self._plans.get((n_rows, n_fft))
+        if plan is None:
+            # blocks smaller than one already planned (e.g. the waveforms
+            # selected by a condition) share the plans of the next power of
+            # two rows, so that only a few plans are made
+            largest = max((rows for rows, n in self._plans if n == n_fft), default=0)
+            if 0 < n_rows < largest:
+                n_plan = min(1 << (n_rows - 1).bit_length(), largest)
+                if n_plan != n_rows:
+                    plan = self._get_plan(n_plan, n_fft)
+                    self._plans[(n_rows, n_fft)] = plan
+                    return plan
+
+        if plan is None:
+            from pyfftw import empty_aligned
+
+            kernels = self.kernel.reshape(-1, self.kernel.shape[-1])
+            n_kern = len(kernels)
+            n_freq = n_fft // 2 + 1
+
+            buf_in = empty_aligned((n_rows, n_fft), dtype="float64")
+            buf_fft = empty_aligned((n_rows, n_freq), dtype="complex128")
+            buf_prod = empty_aligned((n_rows, n_kern, n_freq), dtype="complex128")
+            buf_out = empty_aligned((n_rows, n_kern, n_fft), dtype="float64")
+            fft = fftw_plan(buf_in, buf_fft, "FFTW_FORWARD")
+            ifft = fftw_plan(buf_prod, buf_out, "FFTW_BACKWARD")
+            # planning can overwrite the buffers, zero the padding afterwards
+            buf_in[:] = 0
+            kernel_fft = np.fft.rfft(kernels, n_fft, axis=-1)
+            plan = (buf_in, buf_fft, buf_prod, buf_out, fft, ifft, kernel_fft)
+            self._plans[(n_rows, n_fft)] = plan
+        return plan
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the buffers and kernel spectra allocated for the
+        block shapes convolved so far."""
+        arrays = {
+            id(arr): arr
+            for plan in self._plans.values()
+            for arr in plan
+            if isinstance(arr, np.ndarray)
+        }
+        return self.kernel.nbytes + sum(arr.nbytes for arr in arrays.values())
+
+    def __call__(self, w_in: np.ndarray, w_out: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        w_in
+            the input waveforms.
+        w_out
+            the filtered waveforms.
+        """
+        len_in = w_in.shape[-1]
+        len_out = w_out.shape[-1]
+        len_kern = self.kernel.shape[-1]
+
+        if len_kern > len_in:
+            raise DSPFatal("The filter is longer than the input waveform")
+
+        if self.mode == "valid":
+            if len_out != len_in - len_kern + 1:
+                raise DSPFatal(
+                    "The output length must be the input length minus the filter length plus one"
+                )
+            # samples before the end of the waveform do not wrap around
+            len_used = len_in
+            n_fft = next_fast_len(len_in, real=True)
+            first = len_kern - 1
+        else:
+            if len_out > len_in:
+                raise DSPFatal("The output waveform is longer than the input waveform")
+            # the first len_out samples only depend on the first len_out inputs
+            len_used = len_out
+            n_fft = next_fast_len(len_out + len_kern - 1, real=True)
+            first = 0
+
+        outer_shape = w_out.shape[: w_out.ndim - self.kernel.ndim]
+        w_in = np.broadcast_to(w_in, outer_shape + (len_in,)).reshape(-1, len_in)
+        w_out_3d = w_out.reshape(len(w_in), -1, len_out)
+        buf_in, buf_fft, buf_prod, buf_out, fft, ifft, kernel_fft = self._get_plan(
+            len(w_in), n_fft
+        )
+
+        buf_in[: len(w_in), :len_used] = w_in[:, :len_used]
+        fft(buf_in, buf_fft)
+        np.multiply(buf_fft[:, np.newaxis, :], kernel_fft, out=buf_prod)
+        ifft(buf_prod, buf_out)
+        w_out_3d[:] = buf_out[: len(w_in), :, first : first + len_out]
+
+        w_out_3d[np.isnan(w_in).any(axis=-1)] = np.nan
+        if not np.shares_memory(w_out_3d, w_out):
+            w_out[:] = w_out_3d.reshape(w_out.shape)
+
+    def __repr__(self) -> str:
+        return f"FFTConvolution({self.__name__}, mode={self.mode})"
+
+
+@cached_kernel
+def _cusp_kernel(length: int, sigma: float, flat: int, decay: int) -> np.ndarray:
+    """Return the kernel of :func:`cusp_filter`."""
+    if length <= 0:
+        raise DSPFatal("The length of the filter must be positive")
+
+    if sigma < 0:
+        raise DSPFatal("The curvature parameter must be positive")
+
+    if flat < 0:
+        raise DSPFatal("The length of the flat section must be positive")
+
+    if decay < 0:
+        raise DSPFatal("The decay constant must be positive")
+
+    cusp, _ = _cusp_parts(length, sigma, flat)
+
+    den = [1, -np.exp(-1 / decay)]
+    cuspd = np.convolve(cusp, den, "same")
+
+    return cuspd
+
+
+@cached_kernel
+def _zac_kernel(length: int, sigma: float, flat: int, decay: int) -> np.ndarray:
+    """Return the kernel of :func:`zac_filter`."""
+    if length <= 0:
+        raise DSPFatal("The length of the filter must be positive")
+
+    if sigma < 0:
+        raise DSPFatal("The curvature parameter must be positive")
+
+    if flat < 0:
+        raise DSPFatal("The length of the flat section must be positive")
+
+    if decay < 0:
+        raise DSPFatal("The decay constant must be positive")
+
+    # calculate cusp filter and negative parables
+    cusp, par = _cusp_parts(length, sigma, flat)
+
+    # normalize parables area
+    par = -par / par.sum() * cusp.sum()
+
+    # create zac filter
+    zac = cusp + par
+
+    # deconvolve zac filter
+    den = [1, -np.exp(-1 / decay)]
+    zacd = np.convolve(zac, den, "same")
+
+    return zacd
+
+
+def _cusp_parts(length: int, sigma: float, flat: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return the cusp of :func:`cusp_filter` and the negative parables of
+    :func:`zac_filter`, which are zero in the flat section."""
+    # sigma and flat can be dimensionless quantities, e.g. 20*us/wf.period
+    length = int(length)
+    sigma = float(sigma)
+    lt = int((length - flat) / 2)
+    flat_int = int(flat)
+
+    cusp = np.ones(length)
+    par = np.zeros(length)
+    rise = np.arange(0, lt)
+    fall = np.arange(min(lt + flat_int + 1, length), length)
+    cusp[rise] = np.sinh(rise / sigma) / np.sinh(lt / sigma)
+    cusp[fall] = np.sinh((length - fall) / sigma) / np.sinh(lt / sigma)
+    par[rise] = np.power(rise - lt / 2, 2) - np.power(lt / 2, 2)
+    par[fall] = np.power(length - fall - lt / 2, 2) - np.power(lt / 2, 2)
+    return cusp, par
+
+
+@register_processor(factory=True, cost="n log n")
 def cusp_filter(length: int, sigma: float, flat: int, decay: int) -> Callable:
     """Apply a CUSP filter to the waveform.
 
@@ -42,61 +278,10 @@ def cusp_filter(length: int, sigma: float, flat: int, decay: int) -> Callable:
             "init_args": ["len(wf_bl)-100", "40*us", "3*us", "45*us"]
         }
     """
-    if length <= 0:
-        raise DSPFatal("The length of the filter must be positive")
-
-    if sigma < 0:
-        raise DSPFatal("The curvature parameter must be positive")
-
-    if flat < 0:
-        raise DSPFatal("The length of the flat section must be positive")
-
-    if decay < 0:
-        raise DSPFatal("The decay constant must be positive")
-
-    lt = int((length - flat) / 2)
-    flat_int = int(flat)
-    cusp = np.zeros(length)
-    for ind in range(0, lt, 1):
-        cusp[ind] = float(np.sinh(ind / sigma) / np.sinh(lt / sigma))
-    for ind in range(lt, lt + flat_int + 1, 1):
-        cusp[ind] = 1
-    for ind in range(lt + flat_int + 1, length, 1):
-        cusp[ind] = float(np.sinh((length - ind) / sigma) / np.sinh(lt / sigma))
-
-    den = [1, -np.exp(-1 / decay)]
-    cuspd = np.convolve(cusp, den, "same")
-
-    @guvectorize(
-        ["void(float32[:], float32[:])", "void(float64[:], float64[:])"],
-        "(n),(m)",
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
-    def cusp_out(w_in: np.ndarray, w_out: np.ndarray) -> None:
-        """
-        Parameters
-        ----------
-        w_in
-            the input waveform.
-        w_out
-            the filtered waveform.
-        """
-        w_out[:] = np.nan
-
-        if np.isnan(w_in).any():
-            return
-
-        if len(cuspd) > len(w_in):
-            raise DSPFatal("The filter is longer than the input waveform")
-
-        w_out[:] = np.convolve(w_in, cuspd, "valid")
-
-    return cusp_out
+    return FFTConvolution(_cusp_kernel(length, sigma, flat, decay), "valid", "cusp_out")
 
 
+@register_processor(factory=True, cost="n log n")
 def zac_filter(length: int, sigma: float, flat: int, decay: int) -> Callable:
     """Apply a ZAC (Zero Area CUSP) filter to the waveform.
 
@@ -130,79 +315,10 @@ def zac_filter(length: int, sigma: float, flat: int, decay: int) -> Callable:
             "init_args": ["len(wf_bl)-100", "40*us", "3*us", "45*us"],
         }
     """
-    if length <= 0:
-        raise DSPFatal("The length of the filter must be positive")
-
-    if sigma < 0:
-        raise DSPFatal("The curvature parameter must be positive")
-
-    if flat < 0:
-        raise DSPFatal("The length of the flat section must be positive")
-
-    if decay < 0:
-        raise DSPFatal("The decay constant must be positive")
-
-    lt = int((length - flat) / 2)
-    flat_int = int(flat)
-
-    # calculate cusp filter and negative parables
-    cusp = np.zeros(length)
-    par = np.zeros(length)
-    for ind in range(0, lt, 1):
-        cusp[ind] = float(np.sinh(ind / sigma) / np.sinh(lt / sigma))
-        par[ind] = np.power(ind - lt / 2, 2) - np.power(lt / 2, 2)
-    for ind in range(lt, lt + flat_int + 1, 1):
-        cusp[ind] = 1
-    for ind in range(lt + flat_int + 1, length, 1):
-        cusp[ind] = float(np.sinh((length - ind) / sigma) / np.sinh(lt / sigma))
-        par[ind] = np.power(length - ind - lt / 2, 2) - np.power(lt / 2, 2)
-
-    # calculate area of cusp and parables
-    areapar, areacusp = 0, 0
-    for i in range(0, length, 1):
-        areapar += par[i]
-        areacusp += cusp[i]
-
-    # normalize parables area
-    par = -par / areapar * areacusp
-
-    # create zac filter
-    zac = cusp + par
-
-    # deconvolve zac filter
-    den = [1, -np.exp(-1 / decay)]
-    zacd = np.convolve(zac, den, "same")
-
-    @guvectorize(
-        ["void(float32[:], float32[:])", "void(float64[:], float64[:])"],
-        "(n),(m)",
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
-    def zac_out(w_in: np.ndarray, w_out: np.ndarray) -> None:
-        """
-        Parameters
-        ----------
-        w_in
-            the input waveform.
-        w_out
-            the filtered waveform.
-        """
-        w_out[:] = np.nan
-
-        if np.isnan(w_in).any():
-            return
-
-        if len(zacd) > len(w_in):
-            raise DSPFatal("The filter is longer than the input waveform")
-
-        w_out[:] = np.convolve(w_in, zacd, "valid")
-
-    return zac_out
+    return FFTConvolution(_zac_kernel(length, sigma, flat, decay), "valid", "zac_out")
 
 
+@register_processor(factory=True, cost="n log n")
 def t0_filter(rise: int, fall: int) -> Callable:
     """Apply a modified, asymmetric trapezoidal filter to the waveform.
 
@@ -234,43 +350,132 @@ def t0_filter(rise: int, fall: int) -> Callable:
             "init_args": ["128*ns", "2*us"]
         }
     """
+    return FFTConvolution(_t0_kernel(rise, fall), "head", "t0_filter_out")
+
+
+@cached_kernel
+def _t0_kernel(rise: int, fall: int) -> np.ndarray:
+    """Return the kernel of :func:`t0_filter`."""
     if rise < 0:
         raise DSPFatal("The length of the rise section must be positive")
 
     if fall < 0:
         raise DSPFatal("The length of the fall section must be positive")
 
-    t0_kern = np.zeros(int(rise) + int(fall))
-    for i in range(int(rise)):
-        t0_kern[i] = 2 * (int(rise) - i) / (rise**2)
-    for i in range(int(rise), len(t0_kern), 1):
-        t0_kern[i] = -1 / fall
-
-    @guvectorize(
-        ["void(float32[:], float32[:])", "void(float64[:], float64[:])"],
-        "(n),(m)",
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
-    def t0_filter_out(w_in: np.ndarray, w_out: np.ndarray) -> None:
-        """
-        Parameters
-        ----------
-        w_in
-            The input waveform
-        w_out
-            The filtered waveform
-        """
-        w_out[:] = np.nan
+    rise, fall = float(rise), float(fall)
+    t0_kern = np.full(int(rise) + int(fall), -1 / fall)
+    t0_kern[: int(rise)] = 2 * (int(rise) - np.arange(int(rise))) / (rise**2)
+    return t0_kern
+
+
+def _kernel_bank(
+    kernel: Callable,
+    length: int,
+    sigma: float | np.ndarray,
+    flat: int | np.ndarray,
+    decay: int,
+) -> np.ndarray:
+    """Return one kernel per pair of `sigma` and `flat` values."""
+    sigma, flat = np.broadcast_arrays(np.atleast_1d(sigma), np.atleast_1d(flat))
+    if sigma.ndim != 1:
+        raise DSPFatal("The filter parameters must be scalars or 1D arrays")
+    return np.array([kernel(length, s, f, decay) for s, f in zip(sigma, flat)])
+
+
+@register_processor(factory=True, cost="k n log n")
+def cusp_filter_bank(
+    length: int, sigma: float | np.ndarray, flat: int | np.ndarray, decay: int
+) -> Callable:
+    """Apply a bank of CUSP filters to the waveform.
+
+    Equivalent to applying :func:`cusp_filter` once for each pair of `sigma`
+    and `flat` values, but the Fourier transform of the waveform is shared
+    between all the filters. This is meant for scanning the filter parameters
+    (e.g. in energy resolution optimizations) in a single pass. The output has
+    one filtered waveform per pair of parameters.
 
-        if np.isnan(w_in).any():
-            return
+    Note
+    ----
+    This processor is composed of a factory function that is called using the
+    `init_args` argument. The input and output waveforms are passed using
+    `args`.
+
+    Parameters
+    ----------
+    length
+        the length of the filters to be convolved.
+    sigma
+        the curvatures of the rising and falling part of the kernels, in
+        samples. A single value is used for all the filters.
+    flat
+        the lengths of the flat sections, in samples. A single value is used
+        for all the filters.
+    decay
+        the decay constant of the exponential to be convolved.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "wf_cusp_bank": {
+            "function": "cusp_filter_bank",
+            "module": "pygama.dsp.processors",
+            "args": ["wf_bl", "wf_cusp_bank([3, 101], 'f')"],
+            "unit": "ADC",
+            "init_args": [
+                "len(wf_bl)-100", "[1250, 2500, 3750]", "187", "db.pz.tau"
+            ]
+        }
+    """
+    kernels = _kernel_bank(_cusp_kernel, length, sigma, flat, decay)
+    return FFTConvolution(kernels, "valid", "cusp_bank_out")
 
-        if len(t0_kern) > len(w_in):
-            raise DSPFatal("The filter is longer than the input waveform")
 
-        w_out[:] = np.convolve(w_in, t0_kern)[: len(w_in)]
+@register_processor(factory=True, cost="k n log n")
+def zac_filter_bank(
+    length: int, sigma: float | np.ndarray, flat: int | np.ndarray, decay: int
+) -> Callable:
+    """Apply a bank of ZAC (Zero Area CUSP) filters to the waveform.
 
-    return t0_filter_out
+    Equivalent to applying :func:`zac_filter` once for each pair of `sigma`
+    and `flat` values, but the Fourier transform of the waveform is shared
+    between all the filters. The output has one filtered waveform per pair of
+    parameters.
+
+    Note
+    ----
+    This processor is composed of a factory function that is called using the
+    `init_args` argument. The input and output waveforms are passed using
+    `args`.
+
+    Parameters
+    ----------
+    length
+        the length of the filters to be convolved.
+    sigma
+        the curvatures of the rising and falling part of the kernels, in
+        samples. A single value is used for all the filters.
+    flat
+        the lengths of the flat sections, in samples. A single value is used
+        for all the filters.
+    decay
+        the decay constant of the exponential to be convolved.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "wf_zac_bank": {
+            "function": "zac_filter_bank",
+            "module": "pygama.dsp.processors",
+            "args": ["wf_bl", "wf_zac_bank([3, 101], 'f')"],
+            "unit": "ADC",
+            "init_args": [
+                "len(wf_bl)-100", "[1250, 2500, 3750]", "187", "db.pz.tau"
+            ]
+        }
+    """
+    kernels = _kernel_bank(_zac_kernel, length, sigma, flat, decay)
+    return FFTConvolution(kernels, "valid", "zac_bank_out")
@@ -3,13 +3,53 @@ from __future__ import annotations
 from typing import Callable
 
 import numpy as np
-from numba import guvectorize
-from pywt import downcoef
+from numba import guvectorize, jit
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
+from pygama.dsp.utils import GUFuncPartial
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@jit(nopython=True, fastmath={"reassoc", "contract"}, **nb_kwargs)
+def _dwt_approx(w_in: np.ndarray, dec_lo: np.ndarray, a_out: np.ndarray) -> None:
+    """One level of the discrete wavelet transform with the low pass
+    decomposition filter `dec_lo`. The input is extended symmetrically, as in
+    the ``symmetric`` mode of :func:`pywt.dwt`, so `a_out` must have length
+    ``(len(w_in) + len(dec_lo) - 1) // 2``. The filter taps may be summed in
+    any order.
+    """
+    n = len(w_in)
+    n_filt = len(dec_lo)
+
+    # coefficients that only need samples inside the waveform. The indices
+    # are kept non-negative, so that Numba does not check for wraparound and
+    # the sums are vectorized
+    i_beg = min(n_filt // 2, len(a_out))
+    i_end = max((n - 1) // 2, i_beg)
+    filt = dec_lo[::-1].copy()
+    w_seg = w_in[2 * i_beg + 2 - n_filt :]
+    a_seg = a_out[i_beg:i_end]
+    for i_out in range(len(a_seg)):
+        a = 0.0
+        for j in range(n_filt):
+            a += filt[j] * w_seg[2 * i_out + j]
+        a_seg[i_out] = a
+
+    # coefficients at the edges
+    for i_out in range(len(a_out)):
+        if i_beg <= i_out < i_end:
+            continue
+        a_out[i_out] = 0
+        for j in range(n_filt):
+            # reflect about the edges until the index is inside the waveform
+            i_in = (2 * i_out + 1 - j) % (2 * n)
+            if i_in >= n:
+                i_in = 2 * n - 1 - i_in
+            a_out[i_out] += dec_lo[j] * w_in[i_in]
+
+
+@register_processor(factory=True)
 def discrete_wavelet_transform(wave_type: str, level: int) -> Callable:
     """
     Apply a discrete wavelet transform to the waveform and return only
@@ -47,28 +87,52 @@ def discrete_wavelet_transform(wave_type: str, level: int) -> Callable:
     if level <= 0:
         raise DSPFatal("The level must be a positive integer")
 
-    @guvectorize(
-        ["void(float32[:], float32[:])", "void(float64[:], float64[:])"],
-        "(n),(m)",
-        **nb_kwargs,
-        forceobj=True,
-    )
-    def dwt_out(w_in: np.ndarray, w_out: np.ndarray) -> None:
-        """
-        Parameters
-        ----------
-        w_in
-           The input waveform
-        w_out
-           The approximate coefficients. The dimension of this array can be calculated
-           by ``out_dim = wf_length/(filter_length^level)``, where ``filter_length``
-           can be obtained via ``pywt.Wavelet(wave_type).dec_len``.
-        """
-        w_out[:] = np.nan
-
-        if np.isnan(w_in).any():
-            return
-
-        w_out[:] = downcoef("a", w_in, wave_type, level=level)
-
-    return dwt_out
+    from pywt import Wavelet
+
+    dec_lo = np.array(Wavelet(wave_type).dec_lo)
+    return GUFuncPartial(_dwt, dec_lo, level, name="dwt_out", in_place=(1,))
+
+
+@guvectorize(
+    [
+        "void(float64[:], int64, float32[:], float32[:])",
+        "void(float64[:], int64, float64[:], float64[:])",
+    ],
+    "(f),(),(n),(m)",
+    **nb_kwargs(nopython=True),
+)
+def _dwt(dec_lo: np.ndarray, level: int, w_in: np.ndarray, w_out: np.ndarray) -> None:
+    """
+    Parameters
+    ----------
+    dec_lo
+       The low pass decomposition filter of the wavelet.
+    level
+       The level of decompositions to be performed.
+    w_in
+       The input waveform
+    w_out
+       The approximate coefficients. The dimension of this array can be calculated
+       by ``out_dim = wf_length/(filter_length^level)``, where ``filter_length``
+       can be obtained via ``pywt.Wavelet(wave_type).dec_len``.
+    """
+    w_out[:] = np.nan
+
+    if np.isnan(w_in).any():
+        return
+
+    # the cascade is computed in double precision, like pywt.downcoef does
+    filt = np.ascontiguousarray(dec_lo)
+    a_in = np.empty(len(w_in))
+    a_in[:] = w_in
+    for _ in range(level):
+        a_out = np.empty((len(a_in) + len(filt) - 1) // 2)
+        _dwt_approx(a_in, filt, a_out)
+        a_in = a_out
+
+    if len(a_in) != len(w_out):
+        raise DSPFatal(
+            "The length of the output does not match the number of "
+            "approximate coefficients"
+        )
+    w_out[:] = a_in
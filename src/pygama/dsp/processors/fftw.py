@@ -1,14 +1,179 @@
 from __future__ import annotations
 
-from typing import Callable
+import logging
+import os
+import tempfile
+from typing import Any, Callable
 
 import numpy as np
-from numba import guvectorize
-from pyfftw import FFTW
 
-from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
+from pygama.dsp.registry import register_processor
 
+log = logging.getLogger(__name__)
 
+# FFTW plans shared by all the processors in this process, see fftw_plan()
+_plan_cache = {}
+
+#: Location of the FFTW wisdom file. It is loaded before the first plan is
+#: made, and written by :func:`save_fftw_wisdom`. Defaults to the
+#: ``PYGAMA_FFTW_WISDOM`` environment variable.
+wisdom_file = os.getenv("PYGAMA_FFTW_WISDOM")
+_wisdom_loaded = False
+
+#: FFTW planner used for plans that are not found in the wisdom. Setting it
+#: to ``FFTW_PATIENT`` before running a DSP config once and then calling
+#: :func:`save_fftw_wisdom` gives the best plans to all later jobs.
+planner_effort = "FFTW_MEASURE"
+
+
+def load_fftw_wisdom(file_name: str = None) -> bool:
+    """Import FFTW wisdom from `file_name`, or :data:`wisdom_file` if ``None``.
+
+    Returns ``True`` if any wisdom was imported. Wisdom lets FFTW make plans
+    of the best quality (``FFTW_PATIENT``) without measuring them again.
+    """
+    import pyfftw
+
+    global _wisdom_loaded
+    _wisdom_loaded = True
+
+    file_name = wisdom_file if file_name is None else file_name
+    if file_name is None or not os.path.isfile(file_name):
+        return False
+
+    with open(file_name, "rb") as f:
+        wisdom = tuple(f.read().split(b"\0"))
+    success = pyfftw.import_wisdom(wisdom)
+    log.debug(f"imported FFTW wisdom from {file_name}")
+    return any(success)
+
+
+def save_fftw_wisdom(file_name: str = None) -> None:
+    """Export the FFTW wisdom gathered so far to `file_name`, or
+    :data:`wisdom_file` if ``None``, together with the wisdom already stored
+    in that file.
+    """
+    import pyfftw
+
+    file_name = wisdom_file if file_name is None else file_name
+    if file_name is None:
+        raise ValueError("no FFTW wisdom file was given")
+
+    # keep what other processes stored since we loaded the file
+    load_fftw_wisdom(file_name)
+
+    # write to a temporary file first, so that concurrent jobs never read a
+    # partially written file
+    dir_name = os.path.dirname(os.path.abspath(file_name))
+    os.makedirs(dir_name, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=dir_name, delete=False) as f:
+        f.write(b"\0".join(pyfftw.export_wisdom()))
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, file_name)
+    log.debug(f"exported FFTW wisdom to {file_name}")
+
+
+def fftw_plan(buf_in: np.ndarray, buf_out: np.ndarray, direction: str) -> Any:
+    """Return a :class:`pyfftw.FFTW` plan transforming the last axis of
+    `buf_in` into `buf_out`.
+
+    Plans are cached for the process and reused for any arrays with the same
+    shapes, types, strides and memory alignment, so each one is made only
+    once. The plan is made with the ``FFTW_PATIENT`` planner if there is FFTW
+    wisdom for it (see :func:`load_fftw_wisdom`), and with
+    :data:`planner_effort` otherwise. Call the plan with the arrays to
+    transform as arguments.
+    """
+    from pyfftw import FFTW, simd_alignment
+
+    key = tuple(
+        (buf.shape, buf.dtype.str, buf.strides, buf.ctypes.data % simd_alignment == 0)
+        for buf in (buf_in, buf_out)
+    ) + (direction,)
+
+    plan = _plan_cache.get(key)
+    if plan is None:
+        if not _wisdom_loaded:
+            load_fftw_wisdom()
+
+        try:
+            plan = FFTW(
+                buf_in,
+                buf_out,
+                axes=(-1,),
+                direction=direction,
+                flags=("FFTW_PATIENT", "FFTW_WISDOM_ONLY"),
+            )
+        except RuntimeError:
+            plan = FFTW(
+                buf_in,
+                buf_out,
+                axes=(-1,),
+                direction=direction,
+                flags=(planner_effort,),
+            )
+        _plan_cache[key] = plan
+    return plan
+
+
+class _SubBlockFFT:
+    """FFTs of the rows of blocks smaller than the buffers a processor was
+    planned for (e.g. the waveforms selected by a processor ``condition``).
+
+    The rows are copied into aligned buffers with the next power of two rows,
+    so that only a few plans are made, and transformed there.
+    """
+
+    def __init__(self, buf_in: np.ndarray, buf_out: np.ndarray, direction: str):
+        self.buf_in = buf_in
+        self.buf_out = buf_out
+        self.direction = direction
+        self._plans = {}
+
+    def __call__(self, wf_in: np.ndarray) -> np.ndarray:
+        """Transform the rows of `wf_in` and return the result, as a view of an
+        internal buffer."""
+        n_rows = len(wf_in)
+        n_plan = min(1 << max(n_rows - 1, 0).bit_length(), len(self.buf_in))
+        plan = self._plans.get(n_plan)
+        if plan is None:
+            from pyfftw import empty_aligned
+
+            buf_in = empty_aligned(
+                (n_plan,) + self.buf_in.shape[1:], dtype=self.buf_in.dtype
+            )
+            buf_out = empty_aligned(
+                (n_plan,) + self.buf_out.shape[1:], dtype=self.buf_out.dtype
+            )
+            fft = fftw_plan(buf_in, buf_out, self.direction)
+            # planning can overwrite the buffers, clear the padding rows
+            buf_in[:] = 0
+            plan = (buf_in, buf_out, fft)
+            self._plans[n_plan] = plan
+
+        buf_in, buf_out, fft = plan
+        buf_in[:n_rows] = wf_in
+        fft(buf_in, buf_out)
+        return buf_out[:n_rows]
+
+
+def _as_processor(func: Callable, buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
+    """Give `func` the attributes that
+    :class:`~.dsp.processing_chain.ProcessingChain` reads from gufuncs. The
+    first axis of the buffers is the block of waveforms, so it is not part of
+    the signature. `func` writes its second argument in place, and must
+    accept blocks of any number of rows (see :class:`_SubBlockFFT`).
+    """
+    func.signature = "(n),(n)" if buf_in.shape == buf_out.shape else "(n),(l)"
+    func.types = [f"{buf_in.dtype.char}{buf_out.dtype.char}->"]
+    func.nin = 2
+    func.nout = 0
+    func.row_wise = True
+    func.in_place = (1,)
+    return func
+
+
+@register_processor(factory=True, cost="n log n")
 def dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     """Perform discrete Fourier transforms using the FFTW library.
 
@@ -22,7 +187,9 @@ def dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     ----
     FFTW optimizes the FFT algorithm based on the size of the arrays, with SIMD
     parallelized commands.  This optimization requires initialization, so this
-    is a factory function that returns a Numba gufunc that performs the FFT.
+    is a factory function that returns a function that performs the FFT.
+    The plans are cached and can be stored as FFTW wisdom, see
+    :func:`fftw_plan`.
     FFTW works on fixed memory buffers, so you must tell it what memory to use
     ahead of time.  When using this with
     :class:`~.dsp.processing_chain.ProcessingChain`, to ensure the correct
@@ -44,29 +211,24 @@ def dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     =============================== ========= =============================== =============
     """
     try:
-        dft_fun = FFTW(buf_in, buf_out, axes=(-1,), direction="FFTW_FORWARD")
+        dft_fun = fftw_plan(buf_in, buf_out, "FFTW_FORWARD")
     except ValueError:
         raise ValueError(
             "incompatible array types/shapes. See function documentation for allowed values"
         )
 
-    typesig = "void(" + str(buf_in.dtype) + "[:, :], " + str(buf_out.dtype) + "[:, :])"
-    sizesig = "(m, n)->(m, n)" if buf_in.shape == buf_out.shape else "(m, n),(m, l)"
+    sub_block_fft = _SubBlockFFT(buf_in, buf_out, "FFTW_FORWARD")
 
-    @guvectorize(
-        [typesig],
-        sizesig,
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
     def dft(wf_in: np.ndarray, dft_out: np.ndarray) -> None:
-        dft_fun(wf_in, dft_out)
+        if wf_in.shape == buf_in.shape:
+            dft_fun(wf_in, dft_out)
+        else:
+            dft_out[:] = sub_block_fft(wf_in)
 
-    return dft
+    return _as_processor(dft, buf_in, buf_out)
 
 
+@register_processor(factory=True, cost="n log n")
 def inv_dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     """Perform inverse discrete Fourier transforms using the FFTW library.
 
@@ -80,7 +242,9 @@ def inv_dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     ----
     FFTW optimizes the FFT algorithm based on the size of the arrays, with SIMD
     parallelized commands.  This optimization requires initialization, so this
-    is a factory function that returns a Numba gufunc that performs the FFT.
+    is a factory function that returns a function that performs the FFT.
+    The plans are cached and can be stored as FFTW wisdom, see
+    :func:`fftw_plan`.
     FFTW works on fixed memory buffers, so you must tell it what memory to use
     ahead of time.  When using this with
     :class:`~.dsp.processing_chain.ProcessingChain`, to ensure the correct
@@ -102,29 +266,24 @@ def inv_dft(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     =============================== ============= =============================== =========
     """
     try:
-        idft_fun = FFTW(buf_in, buf_out, axes=(-1,), direction="FFTW_BACKWARD")
+        idft_fun = fftw_plan(buf_in, buf_out, "FFTW_BACKWARD")
     except ValueError:
         raise ValueError(
             "incompatible array types/shapes. See function documentation for allowed values"
         )
 
-    typesig = "void(" + str(buf_in.dtype) + "[:, :], " + str(buf_out.dtype) + "[:, :])"
-    sizesig = "(m, n)->(m, n)" if buf_in.shape == buf_out.shape else "(m, n),(m, l)"
+    sub_block_fft = _SubBlockFFT(buf_in, buf_out, "FFTW_BACKWARD")
 
-    @guvectorize(
-        [typesig],
-        sizesig,
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
     def inv_dft(wf_in: np.ndarray, dft_out: np.ndarray) -> None:
-        idft_fun(wf_in, dft_out)
+        if wf_in.shape == buf_in.shape:
+            idft_fun(wf_in, dft_out)
+        else:
+            dft_out[:] = sub_block_fft(wf_in)
 
-    return inv_dft
+    return _as_processor(inv_dft, buf_in, buf_out)
 
 
+@register_processor(factory=True, cost="n log n")
 def psd(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     """Perform discrete Fourier transforms using the FFTW library, and use it to get
     the power spectral density.
@@ -139,7 +298,9 @@ def psd(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     ----
     FFTW optimizes the FFT algorithm based on the size of the arrays, with SIMD
     parallelized commands.  This optimization requires initialization, so this
-    is a factory function that returns a Numba gufunc that performs the FFT.
+    is a factory function that returns a function that performs the FFT.
+    The plans are cached and can be stored as FFTW wisdom, see
+    :func:`fftw_plan`.
     FFTW works on fixed memory buffers, so you must tell it what memory to use
     ahead of time.  When using this with
     :class:`~.dsp.processing_chain.ProcessingChain`, to ensure the correct
@@ -160,31 +321,24 @@ def psd(buf_in: np.ndarray, buf_out: np.ndarray) -> Callable:
     ``float128``/``longdouble``     :math:`n` ``float128``/``longdouble``  :math:`n/2+1`
     =============================== ========= ============================ =============
     """
-
     # build intermediate array for the dft, which will be abs'd to get the PSD
     buf_dft = np.ndarray(
         buf_out.shape, np.dtype("complex" + str(buf_out.dtype.itemsize * 16))
     )
     try:
-        dft_fun = FFTW(buf_in, buf_dft, axes=(-1,), direction="FFTW_FORWARD")
+        dft_fun = fftw_plan(buf_in, buf_dft, "FFTW_FORWARD")
     except ValueError:
         raise ValueError(
             "incompatible array types/shapes. See function documentation for allowed values"
         )
 
-    typesig = "void(" + str(buf_in.dtype) + "[:, :], " + str(buf_out.dtype) + "[:, :])"
-    sizesig = "(m, n)->(m, n)" if buf_in.shape == buf_out.shape else "(m, n),(m, l)"
+    sub_block_fft = _SubBlockFFT(buf_in, buf_dft, "FFTW_FORWARD")
 
-    @guvectorize(
-        [typesig],
-        sizesig,
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
     def psd(wf_in: np.ndarray, psd_out: np.ndarray) -> None:
-        dft_fun(wf_in, buf_dft)
-        np.abs(buf_dft, psd_out)
+        if wf_in.shape == buf_in.shape:
+            dft_fun(wf_in, buf_dft)
+            np.abs(buf_dft, psd_out)
+        else:
+            np.abs(sub_block_fft(wf_in), psd_out)
 
-    return psd
+    return _as_processor(psd, buf_in, buf_out)
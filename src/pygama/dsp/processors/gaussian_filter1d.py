@@ -30,18 +30,23 @@
 
 # All this code belongs to the team that coded Scipy, found at this link:
 #     https://github.com/scipy/scipy/blob/v1.6.0/scipy/ndimage/filters.py#L210-L260
-# The only thing changed was the calculation of the convulution, which
-# originally called a function from a C library.  In this code, the convolution is
-# performed with NumPy's built in convolution function.
+# The only thing changed was the calculation of the convolution, which
+# originally called a function from a C library.  In this code, the correlation
+# with the kernel is computed directly by a Numba gufunc.
 from __future__ import annotations
 
+from typing import Callable
+
 import numpy
 from numba import guvectorize
 
+from pygama.dsp.registry import register_processor
+from pygama.dsp.utils import GUFuncPartial
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
-def gaussian_filter1d(sigma: int, truncate: float = 4.0) -> numpy.ndarray:
+@register_processor(factory=True)
+def gaussian_filter1d(sigma: int, truncate: float = 4.0) -> Callable:
     """1-D Gaussian filter.
 
     Note
@@ -77,58 +82,66 @@ def gaussian_filter1d(sigma: int, truncate: float = 4.0) -> numpy.ndarray:
     # Since we are calling correlate, not convolve, revert the kernel
 
     weights = _gaussian_kernel1d(sigma, lw)[::-1]
-    weights = numpy.asarray(weights, dtype=numpy.float64)
-
-    # Find the length of the kernel so we can reflect the signal an appropriate amount
+    weights = numpy.ascontiguousarray(weights, dtype=numpy.float64)
 
-    extension_length = int(len(weights) / 2) + 1
-
-    @guvectorize(
-        [
-            "void(float32[:], float32[:])",
-            "void(float64[:], float64[:])",
-            "void(int32[:], int32[:])",
-            "void(int64[:], int64[:])",
-        ],
-        "(n),(m)",
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
+    return GUFuncPartial(
+        _gaussian_filter1d, weights, name="gaussian_filter1d_out", in_place=(1,)
     )
-    def gaussian_filter1d_out(wf_in, wf_out):
-
-        # Have to create an array to enable the reflect mode
-        # Extend the signal on the left and right by at least half of the length of the kernel
 
-        wf_in = numpy.asarray(wf_in)
 
-        # Short warning message if kernel is larger than signal, in which case signal can't be convolved
+@guvectorize(
+    [
+        "void(float64[:], float32[:], float32[:])",
+        "void(float64[:], float64[:], float64[:])",
+        "void(float64[:], int32[:], int32[:])",
+        "void(float64[:], int64[:], int64[:])",
+    ],
+    "(k),(n),(n)",
+    **nb_kwargs(nopython=True, fastmath={"reassoc", "contract"}),
+)
+def _gaussian_filter1d(weights, wf_in, wf_out):
 
-        if len(wf_in) < extension_length:
-            raise ValueError(
-                "Kernel calculated was larger than signal, try again with smaller parameters"
-            )
-
-        # This mode extends as a reflection
-        # ‘reflect’ (d c b a | a b c d | d c b a)
-        # The input is extended by reflecting about the edge of the last pixel. This mode is also
-        # sometimes referred to as half-sample symmetric.
+    # Find the length of the kernel so we can reflect the signal an appropriate amount
 
-        reflected_front = numpy.flip(wf_in[0:extension_length])
-        reflected_end = numpy.flip(wf_in[-extension_length:])
+    lw = len(weights) // 2
+    extension_length = lw + 1
 
-        # Extend the signal
+    # Short warning message if kernel is larger than signal, in which case signal can't be convolved
 
-        extended_signal = wf_in
-        extended_signal = numpy.concatenate((extended_signal, reflected_end), axis=None)
-        extended_signal = numpy.concatenate(
-            (reflected_front, extended_signal), axis=None
+    if len(wf_in) < extension_length:
+        raise ValueError(
+            "Kernel calculated was larger than signal, try again with smaller parameters"
         )
-        output = numpy.correlate(extended_signal, weights, mode="same")
-
-        # Now extract the original signal length
-
-        wf_out[:] = output[extension_length:-extension_length]
 
-    return gaussian_filter1d_out
+    # Away from the edges, no reflection is needed. The indices are kept
+    # non-negative, so that Numba does not check for wraparound, and the sums
+    # may be done in any order, so that they are vectorized
+    n = len(wf_in)
+    wf_c = numpy.empty(n)
+    wf_c[:] = wf_in
+    kernel = numpy.ascontiguousarray(weights)
+    out = numpy.empty(n)
+    out_mid = out[lw : n - lw]
+    for i in range(len(out_mid)):
+        out_i = 0.0
+        for k in range(len(kernel)):
+            out_i += kernel[k] * wf_c[i + k]
+        out_mid[i] = out_i
+
+    # At the edges, the input is extended in 'reflect' mode
+    # (d c b a | a b c d | d c b a), i.e. by reflecting about the edge of
+    # the last pixel. This mode is also sometimes referred to as
+    # half-sample symmetric.
+    for i in range(n):
+        if lw <= i < n - lw:
+            continue
+        out[i] = 0
+        for k in range(len(kernel)):
+            j = i + k - lw
+            if j < 0:
+                j = -j - 1
+            elif j >= n:
+                j = 2 * n - 1 - j
+            out[i] += wf_c[j] * kernel[k]
+
+    wf_out[:] = out
@@ -4,9 +4,11 @@ import numpy as np
 from numba import guvectorize
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor(cost="n", in_place=(4, 5, 6, 7, 8))
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32[:], float32[:], float32[:], float32[:], float32[:])",
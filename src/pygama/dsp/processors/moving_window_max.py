@@ -11,6 +11,7 @@ from __future__ import annotations
 import numpy as np
 from numba import guvectorize, jit
 
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
@@ -59,6 +60,7 @@ def find_idx(arr, val, idx_begin):
     return idx
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float64, float64, float32[:], float32[:])",
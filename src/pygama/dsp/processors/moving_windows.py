@@ -1,46 +1,16 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, jit, prange
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import block_kernel, register_processor
+from pygama.dsp.utils import numba_defaults as nb_defaults
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
-@guvectorize(
-    ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
-    "(n),()->(n)",
-    **nb_kwargs,
-)
-def moving_window_left(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
-    """Applies a moving average window to the waveform.
-
-    Note
-    ----
-    Starts from the left and assumes that the baseline is at zero.
-
-    Parameters
-    ----------
-    w_in
-        the input waveform.
-    length
-        length of the moving window to be applied.
-    w_out
-        output waveform after moving window applied.
-
-    JSON Configuration Example
-    --------------------------
-
-    .. code-block :: json
-
-        "wf_mw": {
-            "function": "moving_window_left",
-            "module": "pygama.dsp.processors",
-            "args": ["wf_pz", "96*ns", "wf_mw"],
-            "unit": "ADC"
-        }
-    """
-
+@jit(nopython=True, **nb_kwargs)
+def _moving_window_left(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
     w_out[:] = np.nan
 
     if np.isnan(w_in).any():
@@ -58,13 +28,18 @@ def moving_window_left(w_in: np.ndarray, length: float, w_out: np.ndarray) -> No
         w_out[i] = w_out[i - 1] + (w_in[i] - w_in[i - int(length)]) / length
 
 
+@register_processor(fusible=True)
 @guvectorize(
     ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
     "(n),()->(n)",
     **nb_kwargs,
 )
-def moving_window_right(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
-    """Applies a moving average window to the waveform from the right.
+def moving_window_left(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
+    """Applies a moving average window to the waveform.
+
+    Note
+    ----
+    Starts from the left and assumes that the baseline is at zero.
 
     Parameters
     ----------
@@ -81,13 +56,26 @@ def moving_window_right(w_in: np.ndarray, length: float, w_out: np.ndarray) -> N
     .. code-block :: json
 
         "wf_mw": {
-            "function": "moving_window_right",
+            "function": "moving_window_left",
             "module": "pygama.dsp.processors",
             "args": ["wf_pz", "96*ns", "wf_mw"],
             "unit": "ADC"
         }
     """
+    _moving_window_left(w_in, length, w_out)
+
+
+@block_kernel(moving_window_left)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _moving_window_left_block(
+    w_in: np.ndarray, length: np.ndarray, w_out: np.ndarray
+) -> None:
+    for i in prange(len(w_in)):
+        _moving_window_left(w_in[i], length[i], w_out[i])
+
 
+@jit(nopython=True, **nb_kwargs)
+def _moving_window_right(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
     w_out[:] = np.nan
 
     if np.isnan(w_in).any():
@@ -110,19 +98,14 @@ def moving_window_right(w_in: np.ndarray, length: float, w_out: np.ndarray) -> N
         )
 
 
+@register_processor
 @guvectorize(
-    [
-        "void(float32[:], float32, float32, int32, float32[:])",
-        "void(float64[:], float64, float64, int32, float64[:])",
-    ],
-    "(n),(),(),()->(n)",
+    ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
+    "(n),()->(n)",
     **nb_kwargs,
 )
-def moving_window_multi(
-    w_in: np.ndarray, length: float, num_mw: int, mw_type: int, w_out: np.ndarray
-) -> None:
-    """Apply a series of moving-average windows to the waveform, alternating
-    its application between the left and the right.
+def moving_window_right(w_in: np.ndarray, length: float, w_out: np.ndarray) -> None:
+    """Applies a moving average window to the waveform from the right.
 
     Parameters
     ----------
@@ -130,27 +113,37 @@ def moving_window_multi(
         the input waveform.
     length
         length of the moving window to be applied.
-    num_mw
-        the number of moving windows.
-    mw_type
-        - ``0`` -- alternate moving windows right and left
-        - ``1`` -- only left
-        - ``2`` -- only right
     w_out
-        the windowed waveform.
+        output waveform after moving window applied.
 
     JSON Configuration Example
     --------------------------
 
     .. code-block :: json
 
-        "curr_av": {
-            "function": "moving_window_multi",
+        "wf_mw": {
+            "function": "moving_window_right",
             "module": "pygama.dsp.processors",
-            "args": ["curr", "96*ns", "3", "0", "curr_av"],
-            "unit": "ADC/sample"
+            "args": ["wf_pz", "96*ns", "wf_mw"],
+            "unit": "ADC"
         }
     """
+    _moving_window_right(w_in, length, w_out)
+
+
+@block_kernel(moving_window_right)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _moving_window_right_block(
+    w_in: np.ndarray, length: np.ndarray, w_out: np.ndarray
+) -> None:
+    for i in prange(len(w_in)):
+        _moving_window_right(w_in[i], length[i], w_out[i])
+
+
+@jit(nopython=True, **nb_kwargs)
+def _moving_window_multi(
+    w_in: np.ndarray, length: float, num_mw: int, mw_type: int, w_out: np.ndarray
+) -> None:
     w_out[:] = np.nan
 
     if np.isnan(w_in).any():
@@ -195,6 +188,65 @@ def moving_window_multi(
         w_buf = w_out.copy()
 
 
+@register_processor(cost="k n")
+@guvectorize(
+    [
+        "void(float32[:], float32, float32, int32, float32[:])",
+        "void(float64[:], float64, float64, int32, float64[:])",
+    ],
+    "(n),(),(),()->(n)",
+    **nb_kwargs,
+)
+def moving_window_multi(
+    w_in: np.ndarray, length: float, num_mw: int, mw_type: int, w_out: np.ndarray
+) -> None:
+    """Apply a series of moving-average windows to the waveform, alternating
+    its application between the left and the right.
+
+    Parameters
+    ----------
+    w_in
+        the input waveform.
+    length
+        length of the moving window to be applied.
+    num_mw
+        the number of moving windows.
+    mw_type
+        - ``0`` -- alternate moving windows right and left
+        - ``1`` -- only left
+        - ``2`` -- only right
+    w_out
+        the windowed waveform.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "curr_av": {
+            "function": "moving_window_multi",
+            "module": "pygama.dsp.processors",
+            "args": ["curr", "96*ns", "3", "0", "curr_av"],
+            "unit": "ADC/sample"
+        }
+    """
+    _moving_window_multi(w_in, length, num_mw, mw_type, w_out)
+
+
+@block_kernel(moving_window_multi)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _moving_window_multi_block(
+    w_in: np.ndarray,
+    length: np.ndarray,
+    num_mw: np.ndarray,
+    mw_type: np.ndarray,
+    w_out: np.ndarray,
+) -> None:
+    for i in prange(len(w_in)):
+        _moving_window_multi(w_in[i], length[i], num_mw[i], mw_type[i], w_out[i])
+
+
+@register_processor(fusible=True, in_place=(2,))
 @guvectorize(
     ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
     "(n),(),(m)",
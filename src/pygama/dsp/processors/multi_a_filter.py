@@ -2,11 +2,13 @@ import numpy as np
 from numba import guvectorize
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 from .fixed_time_pickoff import fixed_time_pickoff
 
 
+@register_processor(in_place=(2,))
 @guvectorize(
     [
         "void(float32[:], float32[:], float32[:])",
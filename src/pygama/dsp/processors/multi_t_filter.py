@@ -4,11 +4,13 @@ import numpy as np
 from numba import guvectorize
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 from .time_point_thresh import time_point_thresh
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:],float32[:],float32[:])",
@@ -75,6 +77,7 @@ def remove_duplicates(
             t_out[:] = np.append(t_out[1:], np.nan)
 
 
+@register_processor(in_place=(4,))
 @guvectorize(
     [
         "void(float32[:], float32[:], float32[:], float32[:], float32[:])",
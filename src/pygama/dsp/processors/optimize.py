@@ -1,40 +1,66 @@
 from __future__ import annotations
 
-from typing import Callable
-
 import numpy as np
-from iminuit import Minuit
-from numba import guvectorize
+from numba import guvectorize, jit
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
-from .pole_zero import double_pole_zero, pole_zero
-
 
-class Model:
-    """A class representing the function to minimize."""
+# The objective minimized by both processors is the numerator of the slope of
+# the least-squares line through the pole-zero corrected waveform, y, in the
+# range [beg, end): sum(x)*sum(y) - n*sum(x*y), with x the sample index.
+@jit(nopython=True, **nb_kwargs)
+def _slope_numerator(y: np.ndarray, beg: int, end: int) -> tuple[float, float]:
+    """Return the slope numerator of `y` in [`beg`, `end`) and the magnitude of
+    its terms, used as the scale of the convergence tolerance.
+    """
+    sum_x = 0.0
+    sum_y = 0.0
+    sum_xy = 0.0
+    for i in range(beg, end):
+        sum_x += i
+        sum_y += y[i]
+        sum_xy += i * y[i]
+    n = end - beg
+    return sum_x * sum_y - n * sum_xy, abs(sum_x * sum_y) + abs(n * sum_xy)
 
-    errordef = Minuit.LEAST_SQUARES
 
-    # the constructor
-    def __init__(
-        self, func: Callable, w_in: np.ndarray, baseline: float, beg: int, end: int
-    ) -> None:
-        self.func = func
-        self.x = np.arange(beg, end)
-        self.y = np.asarray(w_in, dtype=np.float64) - baseline
-        self.beg = beg
-        self.end = end
+@jit(nopython=True, **nb_kwargs)
+def _double_pole_zero_slope(
+    w_in: np.ndarray,
+    beg: int,
+    end: int,
+    tau1: float,
+    tau2: float,
+    frac: float,
+    w_pz: np.ndarray,
+) -> tuple[float, float]:
+    """Apply :func:`.double_pole_zero` to the first `end` samples of `w_in`
+    and return the slope numerator of the result in [`beg`, `end`).
+    """
+    a = np.exp(-1 / tau1)
+    b = np.exp(-1 / tau2)
+    transfer_denom_1 = frac * b - frac * a - b - 1
+    transfer_denom_2 = -1 * (frac * b - frac * a - b)
+    transfer_num_1 = -1 * (a + b)
+    transfer_num_2 = a * b
 
-    # the function to minimize
-    def __call__(self, args) -> np.ndarray:
-        y_pz = self.func(self.y, *args)[self.beg : self.end]
-        return np.abs(
-            np.sum(self.x) * np.sum(y_pz) - len(self.x) * np.sum(self.x * y_pz)
+    for i in range(min(end, 2)):
+        w_pz[i] = w_in[i]
+    for i in range(2, end):
+        w_pz[i] = (
+            w_in[i]
+            + transfer_num_1 * w_in[i - 1]
+            + transfer_num_2 * w_in[i - 2]
+            - transfer_denom_1 * w_pz[i - 1]
+            - transfer_denom_2 * w_pz[i - 2]
         )
+    return _slope_numerator(w_pz, beg, end)
 
 
+@register_processor(cost="k n")
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32, float32[:])",
@@ -42,7 +68,6 @@ class Model:
     ],
     "(n),(),(),(),()->()",
     **nb_kwargs,
-    forceobj=True,
 )
 def optimize_1pz(
     w_in: np.ndarray,
@@ -52,9 +77,13 @@ def optimize_1pz(
     p0_in: float,
     val0_out: float,
 ) -> None:
-    """Find the optimal, single pole-zero cancellation's parameter
+    r"""Find the optimal, single pole-zero cancellation's parameter
     by minimizing the slope in the waveform's specified time range.
 
+    The pole-zero corrected waveform is linear in :math:`\exp(-1/\tau)`, so
+    the time constant that cancels the slope is computed in closed form. The
+    output is NaN if there is no such time constant.
+
     Parameters
     ----------
     w_in
@@ -110,16 +139,56 @@ def optimize_1pz(
     ):
         raise DSPFatal("The waveform index is out of range")
 
-    m = Minuit(
-        Model(pole_zero, w_in, a_baseline_in, int(t_beg_in), int(t_end_in)), [p0_in]
-    )
-    m.print_level = -1
-    m.strategy = 1
-    m.errordef = Minuit.LEAST_SQUARES
-    m.migrad()
-    val0_out[0] = m.values[0]
+    beg = int(t_beg_in)
+    end = int(t_end_in)
+
+    # the pole-zero corrected waveform is linear in const = exp(-1/tau):
+    # w_pz[i] = cumsum[i] - const * cumsum[i-1], so the slope vanishes for
+    # const = slope(cumsum[i]) / slope(cumsum[i-1])
+    sum_x = 0.0
+    sum_p = 0.0
+    sum_q = 0.0
+    sum_xp = 0.0
+    sum_xq = 0.0
+    cumsum = 0.0
+    for i in range(end):
+        prev = cumsum
+        cumsum += w_in[i] - a_baseline_in
+        if i >= beg:
+            sum_x += i
+            sum_p += cumsum
+            sum_q += prev
+            sum_xp += i * cumsum
+            sum_xq += i * prev
+    n = end - beg
+    num = sum_x * sum_p - n * sum_xp
+    den = sum_x * sum_q - n * sum_xq
+
+    if den == 0:
+        # the slope does not depend on the time constant
+        val0_out[0] = p0_in
+        return
+
+    const = num / den
+    if const > 0 and const != 1:
+        val0_out[0] = -1 / np.log(const)
+
+
+@jit(nopython=True, **nb_kwargs)
+def _double_pole_zero_stable(tau1: float, tau2: float, frac: float) -> bool:
+    """Whether the recursion of :func:`_double_pole_zero_slope` is stable.
+    Its transfer function has a pole at 1 (the waveform is integrated) and
+    one at ``b + frac * (a - b)``; if the latter is outside the unit circle,
+    the corrected waveform diverges and its slope is meaningless.
+    """
+    if not (tau1 > 0 and tau2 > 0):
+        return False
+    a = np.exp(-1 / tau1)
+    b = np.exp(-1 / tau2)
+    return abs(b + frac * (a - b)) <= 1
 
 
+@register_processor(cost="k n")
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32, float32, float32, float32[:], float32[:], float32[:])",
@@ -127,7 +196,6 @@ def optimize_1pz(
     ],
     "(n),(),(),(),(),(),()->(),(),()",
     **nb_kwargs,
-    forceobj=True,
 )
 def optimize_2pz(
     w_in: np.ndarray,
@@ -144,6 +212,16 @@ def optimize_2pz(
     """Find the optimal, double pole-zero cancellation's parameters by
     minimizing the slope in the waveform's specified time range.
 
+    The slope is brought to zero with Newton iterations starting from the
+    initial guesses. Since many combinations of parameters cancel the slope,
+    the one closest to the initial guesses is returned. The iterations stop
+    when the slope is zero to a relative precision of :math:`10^{-10}`, and
+    the parameters are kept where the pole-zero correction is stable (positive
+    time constants, poles of the filter inside the unit circle). The outputs
+    are NaN if the slope does not converge within 100 iterations, if the
+    initial guesses give an unstable correction, or if the time range holds
+    fewer than two samples or ends before the third one.
+
     Parameters
     ----------
     w_in
@@ -210,14 +288,80 @@ def optimize_2pz(
     ):
         raise DSPFatal("The waveform index is out of range")
 
-    m = Minuit(
-        Model(double_pole_zero, w_in, a_baseline_in, int(t_beg_in), int(t_end_in)),
-        [p0_in, p1_in, p2_in],
+    if len(w_in) <= 3:
+        raise DSPFatal(
+            "The length of the waveform must be larger than 3 for the filter to work safely"
+        )
+
+    beg = int(t_beg_in)
+    end = int(t_end_in)
+    # the filter needs two samples before the first one it corrects
+    if end < 3 or end - beg < 2:
+        return
+
+    w_bl = np.empty(end, dtype=np.float64)
+    for i in range(end):
+        w_bl[i] = w_in[i] - a_baseline_in
+    w_pz = np.empty(end, dtype=np.float64)
+
+    # Newton iterations for the root of the slope closest to the initial
+    # guess, with the parameters scaled by the initial guess and a
+    # backtracking line search
+    pars = np.array([p0_in, p1_in, p2_in], dtype=np.float64)
+    if not _double_pole_zero_stable(pars[0], pars[1], pars[2]):
+        return
+    scale = np.abs(pars)
+    for j in range(3):
+        if scale[j] == 0:
+            scale[j] = 1
+    grad = np.zeros(3)
+    trial = np.zeros(3)
+
+    slope, mag = _double_pole_zero_slope(
+        w_bl, beg, end, pars[0], pars[1], pars[2], w_pz
     )
-    m.print_level = -1
-    m.strategy = 1
-    m.errordef = Minuit.LEAST_SQUARES
-    m.migrad()
-    val0_out[0] = m.values[0]
-    val1_out[0] = m.values[1]
-    val2_out[0] = m.values[2]
+    converged = False
+    for _ in range(100):
+        if abs(slope) <= 1e-10 * mag:
+            converged = True
+            break
+
+        for j in range(3):
+            trial[:] = pars
+            trial[j] += 1e-6 * scale[j]
+            slope_j, _ = _double_pole_zero_slope(
+                w_bl, beg, end, trial[0], trial[1], trial[2], w_pz
+            )
+            grad[j] = (slope_j - slope) / 1e-6
+        norm = np.sum(grad**2)
+        if norm == 0:
+            break
+
+        step = 1.0
+        improved = False
+        while step > 1e-6:
+            for j in range(3):
+                trial[j] = pars[j] - step * slope * grad[j] / norm * scale[j]
+            if not _double_pole_zero_stable(trial[0], trial[1], trial[2]):
+                step /= 2
+                continue
+            slope_new, mag_new = _double_pole_zero_slope(
+                w_bl, beg, end, trial[0], trial[1], trial[2], w_pz
+            )
+            if abs(slope_new) < abs(slope):
+                improved = True
+                break
+            step /= 2
+        if not improved:
+            break
+        pars[:] = trial
+        slope = slope_new
+        mag = mag_new
+
+    # no root was found near the initial guess
+    if not converged:
+        return
+
+    val0_out[0] = pars[0]
+    val1_out[0] = pars[1]
+    val2_out[0] = pars[2]
@@ -3,9 +3,11 @@ from __future__ import annotations
 import numpy as np
 from numba import from_dtype, guvectorize, types
 
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor(factory=True, cost="1")
 def param_lookup(
     param_dict: dict[int, float], default_val: float, dtype: str | np.dtype
 ) -> np.ufunc:
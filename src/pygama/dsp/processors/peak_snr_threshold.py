@@ -3,9 +3,11 @@ from __future__ import annotations
 import numpy as np
 from numba import guvectorize
 
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor(in_place=(4, 5))
 @guvectorize(
     [
         "void(float32[:], float32[:], float32, float32, float32[:], float32[:])",
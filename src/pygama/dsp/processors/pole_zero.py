@@ -1,12 +1,28 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, jit, prange
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import block_kernel, register_processor
+from pygama.dsp.utils import numba_defaults as nb_defaults
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@jit(nopython=True, **nb_kwargs)
+def _pole_zero(w_in: np.ndarray, t_tau: float, w_out: np.ndarray) -> None:
+    w_out[:] = np.nan
+
+    if np.isnan(w_in).any() or np.isnan(t_tau):
+        return
+
+    const = np.exp(-1 / t_tau)
+    w_out[0] = w_in[0]
+    for i in range(1, len(w_in), 1):
+        w_out[i] = w_out[i - 1] + w_in[i] - w_in[i - 1] * const
+
+
+@register_processor(fusible=True)
 @guvectorize(
     ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
     "(n),()->(n)",
@@ -37,17 +53,52 @@ def pole_zero(w_in: np.ndarray, t_tau: float, w_out: np.ndarray) -> None:
             "unit": "ADC"
         }
     """
+    _pole_zero(w_in, t_tau, w_out)
+
+
+@block_kernel(pole_zero)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _pole_zero_block(w_in: np.ndarray, t_tau: np.ndarray, w_out: np.ndarray) -> None:
+    for i in prange(len(w_in)):
+        _pole_zero(w_in[i], t_tau[i], w_out[i])
+
+
+@jit(nopython=True, **nb_kwargs)
+def _double_pole_zero(
+    w_in: np.ndarray, t_tau1: float, t_tau2: float, frac: float, w_out: np.ndarray
+) -> np.ndarray:
     w_out[:] = np.nan
 
-    if np.isnan(w_in).any() or np.isnan(t_tau):
+    if np.isnan(w_in).any() or np.isnan(t_tau1) or np.isnan(t_tau2) or np.isnan(frac):
         return
+    if len(w_in) <= 3:
+        raise DSPFatal(
+            "The length of the waveform must be larger than 3 for the filter to work safely"
+        )
+
+    a = np.exp(-1 / t_tau1)
+    b = np.exp(-1 / t_tau2)
+
+    transfer_denom_1 = frac * b - frac * a - b - 1
+    transfer_denom_2 = -1 * (frac * b - frac * a - b)
+    transfer_num_1 = -1 * (a + b)
+    transfer_num_2 = a * b
 
-    const = np.exp(-1 / t_tau)
     w_out[0] = w_in[0]
-    for i in range(1, len(w_in), 1):
-        w_out[i] = w_out[i - 1] + w_in[i] - w_in[i - 1] * const
+    w_out[1] = w_in[1]
+    w_out[2] = w_in[2]
+
+    for i in range(2, len(w_in), 1):
+        w_out[i] = (
+            w_in[i]
+            + transfer_num_1 * w_in[i - 1]
+            + transfer_num_2 * w_in[i - 2]
+            - transfer_denom_1 * w_out[i - 1]
+            - transfer_denom_2 * w_out[i - 2]
+        )
 
 
+@register_processor(fusible=True)
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32[:])",
@@ -117,32 +168,17 @@ def double_pole_zero(
                          & -(fb - fa - b - 1)w_\text{out}[n-1]
                            + (fb - fa - b)w_\text{out}[n-2]
     """
-    w_out[:] = np.nan
-
-    if np.isnan(w_in).any() or np.isnan(t_tau1) or np.isnan(t_tau2) or np.isnan(frac):
-        return
-    if len(w_in) <= 3:
-        raise DSPFatal(
-            "The length of the waveform must be larger than 3 for the filter to work safely"
-        )
-
-    a = np.exp(-1 / t_tau1)
-    b = np.exp(-1 / t_tau2)
-
-    transfer_denom_1 = frac * b - frac * a - b - 1
-    transfer_denom_2 = -1 * (frac * b - frac * a - b)
-    transfer_num_1 = -1 * (a + b)
-    transfer_num_2 = a * b
-
-    w_out[0] = w_in[0]
-    w_out[1] = w_in[1]
-    w_out[2] = w_in[2]
-
-    for i in range(2, len(w_in), 1):
-        w_out[i] = (
-            w_in[i]
-            + transfer_num_1 * w_in[i - 1]
-            + transfer_num_2 * w_in[i - 2]
-            - transfer_denom_1 * w_out[i - 1]
-            - transfer_denom_2 * w_out[i - 2]
-        )
+    _double_pole_zero(w_in, t_tau1, t_tau2, frac, w_out)
+
+
+@block_kernel(double_pole_zero)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _double_pole_zero_block(
+    w_in: np.ndarray,
+    t_tau1: np.ndarray,
+    t_tau2: np.ndarray,
+    frac: np.ndarray,
+    w_out: np.ndarray,
+) -> None:
+    for i in prange(len(w_in)):
+        _double_pole_zero(w_in[i], t_tau1[i], t_tau2[i], frac[i], w_out[i])
@@ -5,9 +5,11 @@ from math import exp, log
 import numpy as np
 from numba import guvectorize
 
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32, float32[:])",
@@ -61,6 +63,7 @@ def inject_sig_pulse(
         )
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32, float32[:])",
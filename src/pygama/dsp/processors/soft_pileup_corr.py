@@ -4,9 +4,11 @@ import numpy as np
 from numba import guvectorize
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32[:])",
@@ -76,6 +78,7 @@ def soft_pileup_corr(
         w_out[i] = w_in[i] - (a * np.exp(-1.0 * i / tau_in) + b)
 
 
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32[:])",
@@ -1,12 +1,50 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, jit, prange
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import block_kernel, register_processor
+from pygama.dsp.utils import numba_defaults as nb_defaults
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@jit(nopython=True, **nb_kwargs)
+def _time_point_thresh(
+    w_in: np.ndarray, a_threshold: float, t_start: int, walk_forward: int, t_out: float
+) -> None:
+    t_out[0] = np.nan
+
+    if (
+        np.isnan(w_in).any()
+        or np.isnan(a_threshold)
+        or np.isnan(t_start)
+        or np.isnan(walk_forward)
+    ):
+        return
+
+    if np.floor(t_start) != t_start:
+        raise DSPFatal("The starting index must be an integer")
+
+    if np.floor(walk_forward) != walk_forward:
+        raise DSPFatal("The search direction must be an integer")
+
+    if int(t_start) < 0 or int(t_start) >= len(w_in):
+        raise DSPFatal("The starting index is out of range")
+
+    if int(walk_forward) == 1:
+        for i in range(int(t_start), len(w_in) - 1, 1):
+            if w_in[i] <= a_threshold < w_in[i + 1]:
+                t_out[0] = i
+                return
+    else:
+        for i in range(int(t_start), 1, -1):
+            if w_in[i - 1] < a_threshold <= w_in[i]:
+                t_out[0] = i
+                return
+
+
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, float32, float32[:])",
@@ -46,6 +84,40 @@ def time_point_thresh(
             "unit": "ns"
         }
     """
+    _time_point_thresh(w_in, a_threshold, t_start, walk_forward, t_out)
+
+
+@block_kernel(time_point_thresh)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _time_point_thresh_block(
+    w_in: np.ndarray,
+    a_threshold: np.ndarray,
+    t_start: np.ndarray,
+    walk_forward: np.ndarray,
+    t_out: np.ndarray,
+) -> None:
+    for i in prange(len(w_in)):
+        _time_point_thresh(
+            w_in[i], a_threshold[i], t_start[i], walk_forward[i], t_out[i : i + 1]
+        )
+
+
+#: Number of samples on each side of a threshold crossing used to compute the
+#: natural cubic spline of :func:`interpolated_time_point_thresh`. The effect
+#: of farther samples decays by a factor of about 3.7 per sample, so the
+#: spline agrees with the one of the whole waveform to double precision.
+spline_window = 32
+
+
+@jit(nopython=True, **nb_kwargs)
+def _interpolated_time_point_thresh(
+    w_in: np.ndarray,
+    a_threshold: float,
+    t_start: int,
+    walk_forward: int,
+    mode_in: np.int8,
+    t_out: float,
+) -> None:
     t_out[0] = np.nan
 
     if (
@@ -56,27 +128,111 @@ def time_point_thresh(
     ):
         return
 
-    if np.floor(t_start) != t_start:
-        raise DSPFatal("The starting index must be an integer")
-
-    if np.floor(walk_forward) != walk_forward:
-        raise DSPFatal("The search direction must be an integer")
-
-    if int(t_start) < 0 or int(t_start) >= len(w_in):
-        raise DSPFatal("The starting index is out of range")
+    if t_start < 0 or t_start >= len(w_in):
+        return
 
-    if int(walk_forward) == 1:
+    # find the crossing on the samples first, and only interpolate there
+    i_cross = -1
+    if walk_forward > 0:
         for i in range(int(t_start), len(w_in) - 1, 1):
             if w_in[i] <= a_threshold < w_in[i + 1]:
-                t_out[0] = i
-                return
+                i_cross = i
+                break
     else:
         for i in range(int(t_start), 1, -1):
             if w_in[i - 1] < a_threshold <= w_in[i]:
-                t_out[0] = i
-                return
+                i_cross = i - 1
+                break
 
+    if i_cross == -1:
+        return
+
+    if mode_in == ord("i"):  # return index before crossing
+        t_out[0] = i_cross
+    elif mode_in == ord("f"):  # return index before crossing
+        t_out[0] = i_cross + 1
+    elif mode_in == ord("c"):  # return index before crossing
+        t_out[0] = i_cross
+    elif mode_in == ord("n"):  # nearest-neighbor; return half-way between samps
+        t_out[0] = i_cross + 0.5
+    elif mode_in == ord("l"):  # linear
+        t_out[0] = i_cross + (a_threshold - w_in[i_cross]) / (
+            w_in[i_cross + 1] - w_in[i_cross]
+        )
+    elif mode_in == ord("h") or mode_in == ord("s"):
+        if mode_in == ord("h"):  # Cubic hermite
+            c0 = (
+                w_in[1] - w_in[0]
+                if i_cross == 0
+                else (w_in[i_cross + 1] - w_in[i_cross - 1]) / 2
+            )
+            c1 = (
+                w_in[-1] - w_in[-2]
+                if i_cross == len(w_in) - 2
+                else (w_in[i_cross + 2] - w_in[i_cross]) / 2
+            )
+        else:  # Cubic spline
+            c0, c1 = _spline_curvatures(w_in, i_cross)
+
+        # the interpolation crosses the threshold between the samples;
+        # bisect down to double precision
+        t_lo, t_hi = 0.0, 1.0
+        for _ in range(53):
+            t_mid = 0.5 * (t_lo + t_hi)
+            if t_mid == t_lo or t_mid == t_hi:
+                break
+            w_mid = _cubic(w_in[i_cross], w_in[i_cross + 1], c0, c1, t_mid, mode_in)
+            if w_mid <= a_threshold:
+                t_lo = t_mid
+            else:
+                t_hi = t_mid
+        t_out[0] = i_cross + 0.5 * (t_lo + t_hi)
+    else:
+        raise DSPFatal("Unrecognized interpolation mode")
+
+
+@jit(nopython=True, **nb_kwargs)
+def _cubic(
+    w0: float, w1: float, c0: float, c1: float, t0: float, mode_in: np.int8
+) -> float:
+    """Value at `t0` between samples `w0` and `w1` of the interpolation of
+    :func:`.interpolating_upsampler`, given the slopes (Hermite) or second
+    derivatives (spline) `c0` and `c1` at the samples."""
+    t1 = 1 - t0
+    if mode_in == ord("h"):
+        return (
+            (-2 * t1**3 + 3 * t1**2) * w0
+            + (-2 * t0**3 + 3 * t0**2) * w1
+            - (t1**3 - t1**2) * c0
+            + (t0**3 - t0**2) * c1
+        )
+    return t1 * w0 + t0 * w1 + ((t1**3 - t1) * c0 + (t0**3 - t0) * c1) / 6.0
+
+
+@jit(nopython=True, **nb_kwargs)
+def _spline_curvatures(w_in: np.ndarray, i_in: int) -> tuple[float, float]:
+    """Second derivatives at samples `i_in` and ``i_in+1`` of the natural cubic
+    spline of :func:`.interpolating_upsampler`, computed on the
+    :data:`spline_window` samples around them only."""
+    i_lo = max(0, i_in - spline_window)
+    i_hi = min(len(w_in), i_in + 2 + spline_window)
+    w = w_in[i_lo:i_hi]
+    u = np.zeros(len(w))
+    w2 = np.zeros(len(w))
+
+    for i in range(1, len(w) - 1):
+        p = 0.5 * w2[i - 1] + 2
+        w2[i] = -0.5 / p
+        u[i] = w[i + 1] - 2 * w[i] + w[i - 1]
+        u[i] = (3 * u[i] - 0.5 * u[i - 1]) / p
+
+    for i in range(len(w) - 2, i_in - i_lo - 1, -1):
+        w2[i] = w2[i] * w2[i + 1] + u[i]
+
+    return w2[i_in - i_lo], w2[i_in - i_lo + 1]
 
+
+@register_processor
 @guvectorize(
     [
         "void(float32[:], float32, float32, int64, char, float32[:])",
@@ -99,6 +255,12 @@ def interpolated_time_point_thresh(
     index. Use interpolation to estimate a time between samples. Interpolation
     mode selected with `mode_in`.
 
+    The crossing is first found between two samples, and the interpolation is
+    only evaluated there. This gives the time of the crossing of the waveform
+    upsampled by :func:`.interpolating_upsampler` with the same mode, without
+    computing the upsampled waveform and to double precision rather than to
+    the upsampled sampling period.
+
     Parameters
     ----------
     w_in
@@ -122,8 +284,9 @@ def interpolated_time_point_thresh(
         * ``n`` -- nearest-neighbor interpolation; threshold crossing is
           half-way between samples
         * ``l`` -- linear interpolation
-        * ``h`` -- Hermite cubic spline interpolation (*not implemented*)
-        * ``s`` -- natural cubic spline interpolation (*not implemented*)
+        * ``h`` -- Hermite cubic spline interpolation
+        * ``s`` -- natural cubic spline interpolation, computed on
+          :data:`spline_window` samples around the crossing
     t_out
         the index where the waveform value crosses the threshold.
 
@@ -133,49 +296,33 @@ def interpolated_time_point_thresh(
     .. code-block :: json
 
         "tp_0": {
-            "function": "time_point_thresh",
+            "function": "interpolated_time_point_thresh",
             "module": "pygama.dsp.processors",
             "args": ["wf_atrap", "bl_std", "tp_start", 0, "'l'", "tp_0"],
             "unit": "ns"
         }
     """
-    t_out[0] = np.nan
-
-    if (
-        np.isnan(w_in).any()
-        or np.isnan(a_threshold)
-        or np.isnan(t_start)
-        or np.isnan(walk_forward)
-    ):
-        return
-
-    if t_start < 0 or t_start >= len(w_in):
-        return
-
-    i_cross = -1
-    if walk_forward > 0:
-        for i in range(int(t_start), len(w_in) - 1, 1):
-            if w_in[i] <= a_threshold < w_in[i + 1]:
-                i_cross = i
-    else:
-        for i in range(int(t_start), 1, -1):
-            if w_in[i - 1] < a_threshold <= w_in[i]:
-                i_cross = i - 1
+    _interpolated_time_point_thresh(
+        w_in, a_threshold, t_start, walk_forward, mode_in, t_out
+    )
 
-    if i_cross == -1:
-        return
 
-    if mode_in == ord("i"):  # return index before crossing
-        t_out[0] = i_cross
-    elif mode_in == ord("f"):  # return index before crossing
-        t_out[0] = i_cross + 1
-    elif mode_in == ord("c"):  # return index before crossing
-        t_out[0] = i_cross
-    elif mode_in == ord("n"):  # nearest-neighbor; return half-way between samps
-        t_out[0] = i_cross + 0.5
-    elif mode_in == ord("l"):  # linear
-        t_out[0] = i_cross + (a_threshold - w_in[i_cross]) / (
-            w_in[i_cross + 1] - w_in[i_cross]
+@block_kernel(interpolated_time_point_thresh)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _interpolated_time_point_thresh_block(
+    w_in: np.ndarray,
+    a_threshold: np.ndarray,
+    t_start: np.ndarray,
+    walk_forward: np.ndarray,
+    mode_in: np.ndarray,
+    t_out: np.ndarray,
+) -> None:
+    for i in prange(len(w_in)):
+        _interpolated_time_point_thresh(
+            w_in[i],
+            a_threshold[i],
+            t_start[i],
+            walk_forward[i],
+            mode_in[i],
+            t_out[i : i + 1],
         )
-    else:
-        raise DSPFatal("Unrecognized interpolation mode")
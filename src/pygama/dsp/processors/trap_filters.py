@@ -1,46 +1,16 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import guvectorize
+from numba import guvectorize, jit, prange
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import block_kernel, register_processor
+from pygama.dsp.utils import numba_defaults as nb_defaults
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
-@guvectorize(
-    [
-        "void(float32[:], int32, int32, float32[:])",
-        "void(float64[:], int32, int32, float64[:])",
-    ],
-    "(n),(),()->(n)",
-    **nb_kwargs,
-)
-def trap_filter(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
-    """Apply a symmetric trapezoidal filter to the waveform.
-
-    Parameters
-    ----------
-    w_in
-        the input waveform.
-    rise
-        the number of samples averaged in the rise and fall sections.
-    flat
-        the delay between the rise and fall sections.
-    w_out
-        the filtered waveform.
-
-    JSON Configuration Example
-    --------------------------
-
-    .. code-block :: json
-
-        "wf_tf": {
-            "function": "trap_filter",
-            "module": "pygama.dsp.processors",
-            "args": ["wf_pz", "10*us", "3*us", "wf_tf"],
-            "unit": "ADC"
-        }
-    """
+@jit(nopython=True, **nb_kwargs)
+def _trap_filter(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
     w_out[:] = np.nan
 
     if np.isnan(w_in).any() or np.isnan(rise) or np.isnan(flat):
@@ -72,6 +42,7 @@ def trap_filter(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> No
         )
 
 
+@register_processor(fusible=True)
 @guvectorize(
     [
         "void(float32[:], int32, int32, float32[:])",
@@ -80,9 +51,8 @@ def trap_filter(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> No
     "(n),(),()->(n)",
     **nb_kwargs,
 )
-def trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
-    """Apply a symmetric trapezoidal filter to the waveform, normalized by the
-    number of samples averaged in the rise and fall sections.
+def trap_filter(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
+    """Apply a symmetric trapezoidal filter to the waveform.
 
     Parameters
     ----------
@@ -93,7 +63,7 @@ def trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None
     flat
         the delay between the rise and fall sections.
     w_out
-        the normalized, filtered waveform.
+        the filtered waveform.
 
     JSON Configuration Example
     --------------------------
@@ -101,12 +71,26 @@ def trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None
     .. code-block :: json
 
         "wf_tf": {
-            "function": "trap_norm",
+            "function": "trap_filter",
             "module": "pygama.dsp.processors",
             "args": ["wf_pz", "10*us", "3*us", "wf_tf"],
             "unit": "ADC"
         }
     """
+    _trap_filter(w_in, rise, flat, w_out)
+
+
+@block_kernel(trap_filter)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _trap_filter_block(
+    w_in: np.ndarray, rise: np.ndarray, flat: np.ndarray, w_out: np.ndarray
+) -> None:
+    for i in prange(len(w_in)):
+        _trap_filter(w_in[i], rise[i], flat[i], w_out[i])
+
+
+@jit(nopython=True, **nb_kwargs)
+def _trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
     w_out[:] = np.nan
 
     if np.isnan(w_in).any() or np.isnan(rise) or np.isnan(flat):
@@ -143,6 +127,55 @@ def trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None
         )
 
 
+@register_processor(fusible=True)
+@guvectorize(
+    [
+        "void(float32[:], int32, int32, float32[:])",
+        "void(float64[:], int32, int32, float64[:])",
+    ],
+    "(n),(),()->(n)",
+    **nb_kwargs,
+)
+def trap_norm(w_in: np.ndarray, rise: int, flat: int, w_out: np.ndarray) -> None:
+    """Apply a symmetric trapezoidal filter to the waveform, normalized by the
+    number of samples averaged in the rise and fall sections.
+
+    Parameters
+    ----------
+    w_in
+        the input waveform.
+    rise
+        the number of samples averaged in the rise and fall sections.
+    flat
+        the delay between the rise and fall sections.
+    w_out
+        the normalized, filtered waveform.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "wf_tf": {
+            "function": "trap_norm",
+            "module": "pygama.dsp.processors",
+            "args": ["wf_pz", "10*us", "3*us", "wf_tf"],
+            "unit": "ADC"
+        }
+    """
+    _trap_norm(w_in, rise, flat, w_out)
+
+
+@block_kernel(trap_norm)
+@jit(nopython=True, **nb_defaults(parallel=True))
+def _trap_norm_block(
+    w_in: np.ndarray, rise: np.ndarray, flat: np.ndarray, w_out: np.ndarray
+) -> None:
+    for i in prange(len(w_in)):
+        _trap_norm(w_in[i], rise[i], flat[i], w_out[i])
+
+
+@register_processor(fusible=True)
 @guvectorize(
     [
         "void(float32[:], int32, int32, int32, float32[:])",
@@ -218,6 +251,7 @@ def asym_trap_filter(
         )
 
 
+@register_processor(cost="1")
 @guvectorize(
     [
         "void(float32[:], int32, int32, float32, float32[:])",
@@ -287,3 +321,163 @@ def trap_pickoff(
     for i in range(start_time - 2 * rise - flat, start_time - rise - flat, 1):
         i_2 += w_in[i]
     a_out[0] = (i_1 - i_2) / rise
+
+
+@register_processor(cost="k n")
+@guvectorize(
+    [
+        "void(float32[:], int32[:], int32[:], float32[:,:])",
+        "void(float64[:], int32[:], int32[:], float64[:,:])",
+    ],
+    "(n),(p),(p)->(p,n)",
+    **nb_kwargs,
+)
+def trap_filter_bank(
+    w_in: np.ndarray, rise: np.ndarray, flat: np.ndarray, w_out: np.ndarray
+) -> None:
+    """Apply a bank of symmetric trapezoidal filters to the waveform.
+
+    Equivalent to calling :func:`trap_filter` once for each pair of `rise` and
+    `flat` values, but the running sum of the waveform is computed only once
+    and shared between all the filters. This is meant for scanning the filter
+    parameters (e.g. in energy resolution optimizations) in a single pass.
+
+    Parameters
+    ----------
+    w_in
+        the input waveform.
+    rise
+        the numbers of samples averaged in the rise and fall sections.
+    flat
+        the delays between the rise and fall sections.
+    w_out
+        the filtered waveforms, one for each pair of `rise` and `flat`.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "wf_tf_bank": {
+            "function": "trap_filter_bank",
+            "module": "pygama.dsp.processors",
+            "args": ["wf_pz", "[250, 500, 750]", "[125, 125, 125]", "wf_tf_bank"],
+            "unit": "ADC"
+        }
+    """
+    w_out[:] = np.nan
+
+    if np.isnan(w_in).any():
+        return
+
+    # running sum of the waveform, cumsum[i] is the sum of w_in[:i]
+    cumsum = np.zeros(len(w_in) + 1)
+    for i in range(len(w_in)):
+        cumsum[i + 1] = cumsum[i] + w_in[i]
+
+    for j in range(len(rise)):
+        if rise[j] < 0:
+            raise DSPFatal("The number of samples in the rise section must be positive")
+
+        if flat[j] < 0:
+            raise DSPFatal("The number of samples in the flat section must be positive")
+
+        if 2 * rise[j] + flat[j] > len(w_in):
+            raise DSPFatal("The trapezoid width is wider than the waveform")
+
+        for i in range(len(w_in)):
+            w_out[j, i] = (
+                cumsum[i + 1]
+                - cumsum[max(i + 1 - rise[j], 0)]
+                - cumsum[max(i + 1 - rise[j] - flat[j], 0)]
+                + cumsum[max(i + 1 - 2 * rise[j] - flat[j], 0)]
+            )
+
+
+@register_processor(cost="k")
+@guvectorize(
+    [
+        "void(float32[:], int32[:], int32[:], float32, float32[:])",
+        "void(float64[:], int32[:], int32[:], float64, float64[:])",
+    ],
+    "(n),(p),(p),()->(p)",
+    **nb_kwargs,
+)
+def trap_pickoff_bank(
+    w_in: np.ndarray,
+    rise: np.ndarray,
+    flat: np.ndarray,
+    t_pickoff: float,
+    a_out: np.ndarray,
+) -> None:
+    """Pick off the value at the provided index of a bank of symmetric
+    trapezoidal filters, normalized by the number of samples averaged in the
+    rise and fall sections.
+
+    Equivalent to calling :func:`trap_pickoff` once for each pair of `rise`
+    and `flat` values, but the running sum of the waveform is computed only
+    once and shared between all the filters.
+
+    Parameters
+    ----------
+    w_in
+        the input waveform.
+    rise
+        the numbers of samples averaged in the rise and fall sections.
+    flat
+        the delays between the rise and fall sections.
+    t_pickoff
+        the waveform index to pick off.
+    a_out
+        the output pick-off values, one for each pair of `rise` and `flat`.
+
+    JSON Configuration Example
+    --------------------------
+
+    .. code-block :: json
+
+        "trap_energies": {
+            "function": "trap_pickoff_bank",
+            "module": "pygama.dsp.processors",
+            "args": [
+                "wf_pz", "[250, 500, 750]", "[125, 125, 125]", "tp_0",
+                "trap_energies"
+            ],
+            "unit": "ADC"
+        }
+    """
+    a_out[:] = np.nan
+
+    if np.isnan(w_in).any() or np.isnan(t_pickoff):
+        return
+
+    if np.floor(t_pickoff) != t_pickoff:
+        raise DSPFatal("The pick-off index must be an integer")
+
+    start_time = int(t_pickoff + 1)
+    if not 0 <= start_time <= len(w_in):
+        return
+
+    cumsum = np.zeros(start_time + 1)
+    for i in range(start_time):
+        cumsum[i + 1] = cumsum[i] + w_in[i]
+
+    for j in range(len(rise)):
+        if rise[j] < 0:
+            raise DSPFatal("The number of samples in the rise section must be positive")
+
+        if flat[j] < 0:
+            raise DSPFatal("The number of samples in the flat section must be positive")
+
+        if 2 * rise[j] + flat[j] > len(w_in):
+            raise DSPFatal("The trapezoid width is wider than the waveform")
+
+        if start_time < 2 * rise[j] + flat[j]:
+            continue
+
+        a_out[j] = (
+            cumsum[start_time]
+            - cumsum[start_time - rise[j]]
+            - cumsum[start_time - rise[j] - flat[j]]
+            + cumsum[start_time - 2 * rise[j] - flat[j]]
+        ) / rise[j]
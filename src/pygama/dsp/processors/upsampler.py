@@ -6,9 +6,11 @@ import numpy as np
 from numba import guvectorize
 
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
+@register_processor(in_place=(2,))
 @guvectorize(
     ["void(float32[:], float32, float32[:])", "void(float64[:], float64, float64[:])"],
     "(n),(),(m)",
@@ -47,6 +49,7 @@ def upsampler(w_in: np.ndarray, upsample: float, w_out: np.ndarray) -> None:
             t_out += 1
 
 
+@register_processor(in_place=(2,))
 @guvectorize(
     ["void(float32[:], char, float32[:])", "void(float64[:], char, float64[:])"],
     "(n),(),(m)",
@@ -7,6 +7,7 @@ from __future__ import annotations
 import numpy as np
 from numba import guvectorize, jit
 
+from pygama.dsp.registry import register_processor
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
@@ -35,8 +36,8 @@ def concat(a, b):
 @jit(nopython=True)
 def kron(a, b):
     mat = np.zeros((len(a[0]), len(a) * len(b)))
-    idx = 0
     for i in range(0, len(a)):
+        idx = 0
         for j in range(0, len(a[0])):
             for k in range(0, len(b)):
                 mat[i][idx] = a[i][j] * b[k]
@@ -115,6 +116,7 @@ def cut_wave(cds: np.ndarray, level: np.int64) -> np.ndarray:
 
 
 # the actual function that is called in dsp
+@register_processor(cost="n log n")
 @guvectorize(["void(float64[:], int64, float64[:])"], "(n),()->(n)", **nb_kwargs)
 def denoise_wave(wave: np.ndarray, level: np.int64, wave_denoise: np.ndarray) -> None:
     """Apply a symmetric trapezoidal filter to the waveform.
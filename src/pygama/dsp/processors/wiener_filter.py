@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+from typing import Callable
+
 import numpy as np
 from numba import guvectorize
 
 import pygama.lgdo.lh5_store as lh5
 from pygama.dsp.errors import DSPFatal
+from pygama.dsp.kernel_cache import cached_kernel
+from pygama.dsp.registry import register_processor
+from pygama.dsp.utils import GUFuncPartial
 from pygama.dsp.utils import numba_defaults_kwargs as nb_kwargs
 
 
-def wiener_filter(file_name_array: list[str]) -> np.ndarray:
+@register_processor(factory=True, cost="n log n")
+def wiener_filter(file_name_array: list[str]) -> Callable:
     """Apply a Wiener filter to the waveform.
 
     Note
@@ -71,7 +77,15 @@ def wiener_filter(file_name_array: list[str]) -> np.ndarray:
     noise_wf, _ = sto.read_object("spms/processed/noise_wf", file_name)
     noise_wf = noise_wf.nda
 
-    # Now check that the data are valid
+    w_filter = _wiener_kernel(superpulse, noise_wf)
+
+    return GUFuncPartial(_wiener_filter, w_filter, name="wiener_out")
+
+
+@cached_kernel
+def _wiener_kernel(superpulse: np.ndarray, noise_wf: np.ndarray) -> np.ndarray:
+    """Return the Wiener filter in the frequency domain of :func:`wiener_filter`."""
+    # Check that the data are valid
 
     if len(superpulse) <= 0:
         raise DSPFatal("The length of the filter must be positive")
@@ -111,33 +125,37 @@ def wiener_filter(file_name_array: list[str]) -> np.ndarray:
         (fft_psf * np.conj(fft_psf)) + (psd_noise_wf / psd_superpulse)
     )
 
-    # Create a factory function that performs the convolution with the wiener filter, the output is still in the frequency domain
+    return w_filter
 
-    @guvectorize(
-        ["void(complex64[:], complex64[:])", "void(complex128[:], complex128[:])"],
-        "(n)->(n)",
-        **nb_kwargs(
-            cache=False,
-            forceobj=True,
-        ),
-    )
-    def wiener_out(fft_w_in: np.ndarray, fft_w_out: np.ndarray) -> None:
-        """
-        Parameters
-        ----------
-        fft_w_in
-            the Fourier transformed input waveform.
-        fft_w_out
-            the filtered waveform, in the frequency domain.
-        """
-        fft_w_out[:] = np.nan
-
-        if np.isnan(fft_w_in).any():
-            return
-
-        if len(w_filter) != len(fft_w_in):
-            raise DSPFatal("The filter is not the same length of the input waveform")
-
-        fft_w_out[:] = fft_w_in * w_filter
-
-    return wiener_out
+
+@guvectorize(
+    [
+        "void(complex128[:], complex64[:], complex64[:])",
+        "void(complex128[:], complex128[:], complex128[:])",
+    ],
+    "(m),(n)->(n)",
+    **nb_kwargs(nopython=True),
+)
+def _wiener_filter(
+    w_filter: np.ndarray, fft_w_in: np.ndarray, fft_w_out: np.ndarray
+) -> None:
+    """
+    Parameters
+    ----------
+    w_filter
+        the Wiener filter in the frequency domain.
+    fft_w_in
+        the Fourier transformed input waveform.
+    fft_w_out
+        the filtered waveform, in the frequency domain.
+    """
+    fft_w_out[:] = np.nan
+
+    if np.isnan(fft_w_in).any():
+        return
+
+    if len(w_filter) != len(fft_w_in):
+        raise DSPFatal("The filter is not the same length of the input waveform")
+
+    for i in range(len(fft_w_in)):
+        fft_w_out[i] = fft_w_in[i] * w_filter[i]
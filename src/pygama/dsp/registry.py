@@ -0,0 +1,229 @@
+"""
+This module provides a registry of the DSP processors. Processors are added to
+it with the :func:`register_processor` decorator, which records the properties
+that the construction and the optimization of a
+:class:`~.processing_chain.ProcessingChain` depend on: the signature and type
+variants of the processor, whether it is a factory, a cost hint, whether it
+can be fused with the processors using its outputs, the arguments it writes in
+place and its block kernel (see :func:`block_kernel`).
+"""
+from __future__ import annotations
+
+import importlib
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+#: Module containing the pygama processors. Their names can be looked up
+#: before their submodule is imported.
+processors_module = "pygama.dsp.processors"
+
+
+@dataclass
+class ProcessorInfo:
+    """Properties of a registered processor."""
+
+    #: name of the processor.
+    name: str
+    #: module defining the processor.
+    module: str
+    #: the processor.
+    func: Callable
+    #: whether `func` is a factory, returning the processor to run when called
+    #: with the ``init_args`` of its configuration.
+    factory: bool = False
+    #: complexity of the processor in the length of its waveforms ``n`` (e.g.
+    #: ``"n"`` or ``"n log n"``), as a hint of its cost per waveform.
+    cost: str = None
+    #: whether the processor computes its outputs in a single forward pass
+    #: over its inputs, without scratch arrays, such that it can be fused with
+    #: the processors reading its outputs.
+    fusible: bool = False
+    #: indices of the arguments that the processor writes in place, for
+    #: signatures without outputs (``->``). The processors returned by
+    #: factories declare them with an ``in_place`` attribute instead.
+    in_place: tuple[int, ...] = ()
+    #: block kernel of the processor. See :func:`block_kernel`.
+    block_kernel: Callable = None
+
+    @property
+    def signature(self) -> str | None:
+        """Core dimensions of the (g)ufunc, or ``None`` for factories."""
+        return None if self.factory else self.func.signature
+
+    @property
+    def types(self) -> list[str]:
+        """Type variants of the (g)ufunc, or an empty list for factories."""
+        return [] if self.factory else list(self.func.types)
+
+    @property
+    def elementwise(self) -> bool:
+        """Whether all the arguments of the (g)ufunc are scalars."""
+        if self.signature is None:
+            return not self.factory
+        return all(dims.strip() == "" for dims in _core_dims(self.signature))
+
+    @property
+    def whole_waveform(self) -> bool:
+        """Whether the processor needs whole waveforms (arrays) as inputs."""
+        if self.signature is None:
+            return self.factory
+        n_in = len(_core_dims(self.signature.split("->")[0]))
+        return any(dims.strip() != "" for dims in _core_dims(self.signature)[:n_in])
+
+
+#: The registered processors, by name.
+registry: dict[str, ProcessorInfo] = {}
+
+# registered processors by id, to look up processors objects
+_by_id = {}
+
+# functions imported by get_function
+_imported = {}
+
+
+def register_processor(
+    func: Callable = None,
+    *,
+    name: str = None,
+    factory: bool = False,
+    cost: str = None,
+    fusible: bool = False,
+    in_place: tuple[int, ...] = None,
+) -> Callable:
+    """Add a processor to the :data:`registry`.
+
+    Can be used as a decorator, with or without arguments, on top of the
+    :func:`numba.guvectorize` decorator (or on a factory function).
+
+    Parameters
+    ----------
+    func
+        the processor.
+    name
+        name of the processor. Defaults to the name of `func`.
+    factory
+        whether `func` is a factory. See :class:`ProcessorInfo`.
+    cost
+        complexity in the waveform length. Defaults to ``"n"`` for processors
+        of waveforms and ``"1"`` for elementwise processors.
+    fusible
+        see :class:`ProcessorInfo`.
+    in_place
+        see :class:`ProcessorInfo`. Required for processors whose signature
+        has no outputs (``->``).
+
+    Examples
+    --------
+    >>> @register_processor(cost="n", fusible=True)
+    >>> @guvectorize(["void(float32[:], float32, float32[:])"], "(n),()->(n)")
+    >>> def my_processor(w_in, a, w_out): ...
+    """
+
+    def register(func: Callable) -> Callable:
+        info = ProcessorInfo(
+            name=func.__name__ if name is None else name,
+            module=func.__module__,
+            func=func,
+            factory=factory,
+            cost=cost,
+            fusible=fusible,
+            in_place=() if in_place is None else tuple(in_place),
+        )
+        if (
+            in_place is None
+            and info.signature is not None
+            and "->" not in info.signature
+        ):
+            raise ValueError(
+                f"processor {info.name} has no outputs in its signature and must "
+                f"declare the arguments it writes in place"
+            )
+        if info.cost is None:
+            info.cost = "1" if info.elementwise else "n"
+
+        old = registry.get(info.name)
+        if old is not None and old.module != info.module:
+            raise ValueError(
+                f"processor {info.name} of {info.module} is already registered "
+                f"by {old.module}"
+            )
+        registry[info.name] = info
+        _by_id[id(func)] = info
+        return func
+
+    return register if func is None else register(func)
+
+
+def block_kernel(processor: Callable) -> Callable:
+    """Register the block kernel of the registered `processor`.
+
+    A block kernel is a Numba function with ``parallel=True`` that does the
+    work of the processor on a whole block of waveforms, splitting the
+    waveforms between threads with :func:`numba.prange`. It takes the
+    arguments of the processor with a single outer dimension (the waveforms),
+    already broadcast to the same length.
+    :class:`~.processing_chain.ProcessingChain` calls it through
+    :class:`~.utils.ParallelGUFunc` instead of the processor if parallel
+    processing is enabled.
+
+    Examples
+    --------
+    >>> @block_kernel(pole_zero)
+    >>> @jit(nopython=True, **nb_defaults(parallel=True))
+    >>> def _pole_zero_block(w_in, t_tau, w_out):
+    >>>     for i in prange(len(w_in)):
+    >>>         _pole_zero(w_in[i], t_tau[i], w_out[i])
+    """
+
+    def register(kernel: Callable) -> Callable:
+        info = processor_info(processor)
+        if info is None:
+            raise ValueError(f"{processor.__name__} is not a registered processor")
+        info.block_kernel = kernel
+        return kernel
+
+    return register
+
+
+def processor_info(func: Callable) -> ProcessorInfo | None:
+    """The registry entry of the processor `func`, or ``None`` if it is not
+    registered."""
+    return _by_id.get(id(func))
+
+
+def get_processor(name: str) -> ProcessorInfo:
+    """Look up a processor of the :data:`registry` by name.
+
+    The pygama processors are found even if their submodule was not imported
+    yet.
+    """
+    if name not in registry:
+        processors = importlib.import_module(processors_module)
+        if name in processors.__lazy__:
+            getattr(processors, name)
+    try:
+        return registry[name]
+    except KeyError:
+        raise KeyError(f"no processor named {name} is registered") from None
+
+
+def get_function(name: str, module: str) -> Callable:
+    """Return the function `name` of `module`.
+
+    The processors of :data:`registry` are returned directly; other functions
+    are imported the first time and remembered.
+    """
+    info = registry.get(name)
+    if info is not None and module in (processors_module, info.module):
+        return info.func
+
+    func = _imported.get((module, name))
+    if func is None:
+        func = getattr(importlib.import_module(module), name)
+        _imported[(module, name)] = func
+    return func
+
+
+def _core_dims(signature: str) -> list[str]:
+    return re.findall(r"\((.*?)\)", signature)
@@ -1,6 +1,14 @@
+from __future__ import annotations
+
+import importlib
+import math
 import os
+import re
+import types
 from collections.abc import MutableMapping
-from typing import Any, Iterator
+from typing import Any, Callable, Iterator
+
+import numpy as np
 
 
 def getenv_bool(name: str, default: bool = False) -> bool:
@@ -20,6 +28,11 @@ class NumbaDefaults(MutableMapping):
     """Bare-bones class to store some Numba default options. Defaults values
     are set from environment variables
 
+    The ``parallel`` option is not passed to the Numba decorators: if true,
+    :class:`~.processing_chain.ProcessingChain` runs the processors that have
+    a block kernel (see :func:`~.registry.block_kernel`) with it, using all the threads
+    of Numba's threading layer.
+
     Examples
     --------
     Set all default option values for a processor at once by expanding the
@@ -44,9 +57,13 @@ class NumbaDefaults(MutableMapping):
     >>> build_dsp(...) # if not explicit, processors imports happen here
     """
 
+    # options read by pygama rather than passed to Numba
+    _pygama_options = ("parallel",)
+
     def __init__(self) -> None:
         self.cache: bool = getenv_bool("PYGAMA_CACHE")
         self.boundscheck: bool = getenv_bool("PYGAMA_BOUNDSCHECK")
+        self.parallel: bool = getenv_bool("PYGAMA_PARALLEL")
 
     def __getitem__(self, item: str) -> Any:
         return self.__dict__[item]
@@ -58,13 +75,13 @@ class NumbaDefaults(MutableMapping):
         del self.__dict__[item]
 
     def __iter__(self) -> Iterator:
-        return self.__dict__.__iter__()
+        return (k for k in self.__dict__ if k not in self._pygama_options)
 
     def __len__(self) -> int:
-        return len(self.__dict__)
+        return len(list(iter(self)))
 
     def __call__(self, **kwargs) -> dict:
-        mapping = self.__dict__.copy()
+        mapping = dict(self)
         mapping.update(**kwargs)
         return mapping
 
@@ -77,3 +94,200 @@ class NumbaDefaults(MutableMapping):
 
 numba_defaults = NumbaDefaults()
 numba_defaults_kwargs = numba_defaults
+
+
+class GUFuncPartial:
+    """Bind the leading arguments of a :class:`numpy.ufunc` to fixed values.
+
+    This works like :func:`functools.partial`, but the resulting object also
+    exposes the ``signature``, ``types``, ``nin`` and ``nout`` of the remaining
+    arguments, so that it can be added to a
+    :class:`~.dsp.processing_chain.ProcessingChain` like any other processor.
+    Like the ufunc, it computes each waveform independently (``row_wise``), and
+    it declares the arguments the ufunc writes in place (``in_place``).
+    Factory processors use it to pass constant arrays (e.g. a filter kernel) to
+    a module-level Numba kernel, which can be cached on disk, instead of
+    compiling a new function that closes over them.
+
+    Examples
+    --------
+    >>> @guvectorize(["void(float64[:], float32[:], float32[:])"], "(k),(n),(m)")
+    >>> def _convolve(kernel, w_in, w_out): ...
+    >>> def my_filter(length):
+    >>>     kernel = np.ones(length)
+    >>>     return GUFuncPartial(_convolve, kernel, name="my_filter_out", in_place=(1,))
+    """
+
+    #: waveforms are computed independently, so any subset of a block can be
+    #: processed (e.g. the waveforms selected by a processor ``condition``)
+    row_wise = True
+
+    def __init__(
+        self,
+        func: np.ufunc,
+        *args,
+        name: str = None,
+        in_place: tuple[int, ...] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        func
+            the (generalized) ufunc to wrap.
+        *args
+            values of the first ``len(args)`` input arguments of `func`.
+        name
+            name of the wrapped processor. Defaults to the name of `func`.
+        in_place
+            indices, among the remaining arguments, of those that `func`
+            writes in place. Required if the signature of `func` has no
+            outputs (``->``).
+        """
+        if len(args) > func.nin:
+            raise ValueError(f"cannot bind {len(args)} arguments to {func.__name__}")
+
+        self.func = func
+        self.args = args
+        self.__name__ = func.__name__ if name is None else name
+        self.nin = func.nin - len(args)
+        self.nout = func.nout
+        self.types = [t[len(args) :] for t in func.types]
+
+        if func.signature is None:
+            self.signature = None
+        else:
+            dims = re.findall(r"\(.*?\)", func.signature)
+            self.signature = ",".join(dims[len(args) : func.nin])
+            if func.nout > 0:
+                self.signature += "->" + ",".join(dims[func.nin :])
+
+        if in_place is None and self.signature is not None and self.nout == 0:
+            raise ValueError(
+                f"{self.__name__} has no outputs in its signature and must "
+                f"declare the arguments it writes in place"
+            )
+        self.in_place = () if in_place is None else tuple(in_place)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.func(*self.args, *args, **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the bound arrays (e.g. filter kernels)."""
+        return sum(a.nbytes for a in self.args if isinstance(a, np.ndarray))
+
+    def __repr__(self) -> str:
+        return f"GUFuncPartial({self.__name__}: {self.func.__name__}{self.signature})"
+
+
+class ParallelGUFunc:
+    """Call the block kernel of a generalized ufunc (see
+    :func:`~.registry.block_kernel`) in place of the ufunc.
+
+    The arguments are broadcast and cast as the ufunc would do, and their
+    outer dimensions are flattened into one. The ``signature``, ``types``,
+    ``nin`` and ``nout`` of the ufunc are exposed, so that it can be used like
+    any other processor. Outputs that cannot be written in place by the kernel
+    (e.g. of another type than `dtypes`) are computed with the ufunc.
+    """
+
+    def __init__(self, gufunc: np.ufunc, kernel: Callable, dtypes: list = None) -> None:
+        """
+        Parameters
+        ----------
+        gufunc
+            the generalized ufunc.
+        kernel
+            its block kernel.
+        dtypes
+            data types of the arguments, one of the ``types`` of `gufunc`.
+            Inputs are cast to them. If ``None``, the arguments are passed
+            with their own types.
+        """
+        self.gufunc = gufunc
+        self.kernel = kernel
+        self.__name__ = gufunc.__name__
+        self.signature = gufunc.signature
+        self.types = gufunc.types
+        self.nin = gufunc.nin
+        self.nout = gufunc.nout
+        self.dtypes = None if dtypes is None else [np.dtype(t) for t in dtypes]
+        self._core_ndims = [
+            len([d for d in dims.split(",") if d.strip()])
+            for dims in re.findall(r"\((.*?)\)", gufunc.signature)
+        ]
+
+    def __call__(self, *args, **kwargs) -> None:
+        if kwargs or len(args) != self.nin + self.nout:
+            return self.gufunc(*args, **kwargs)
+
+        args = [np.asarray(arg) for arg in args]
+        cores = [
+            arg.shape[arg.ndim - ndim :] for arg, ndim in zip(args, self._core_ndims)
+        ]
+        outer = np.broadcast_shapes(
+            *(arg.shape[: arg.ndim - ndim] for arg, ndim in zip(args, self._core_ndims))
+        )
+        n_outer = math.prod(outer)
+
+        flat_args = []
+        for i, (arg, core) in enumerate(zip(args, cores)):
+            dtype = arg.dtype if self.dtypes is None else self.dtypes[i]
+            if i < self.nin:
+                arg = np.broadcast_to(arg.astype(dtype, copy=False), outer + core)
+                arg = arg.reshape((n_outer,) + core)
+            else:
+                if arg.shape != outer + core or arg.dtype != dtype:
+                    return self.gufunc(*args)
+                # outputs must be written in place
+                arg = arg.view()
+                try:
+                    arg.shape = (n_outer,) + core
+                except AttributeError:
+                    return self.gufunc(*args)
+            flat_args.append(arg)
+
+        try:
+            self.kernel(*flat_args)
+        except SystemError as e:
+            # exceptions raised in parallel loops come back wrapped
+            if e.__cause__ is not None:
+                raise e.__cause__ from None
+            raise
+
+    def __repr__(self) -> str:
+        return f"ParallelGUFunc({self.__name__}{self.signature})"
+
+
+class LazyPackage(types.ModuleType):
+    """Package that imports its public objects from its submodules on first
+    access (see :pep:`562`), rather than when the package itself is imported.
+
+    A package opts in by listing its objects in a ``__lazy__`` mapping from
+    object name to the name of the submodule that defines it, and setting
+    ``sys.modules[__name__].__class__ = LazyPackage``.
+
+    The import system binds every imported submodule to the attribute of its
+    package with the same name. Objects that are named after their submodule
+    (e.g. :func:`.processors.windower.windower`) are bound back in place of the
+    submodule, as an eager ``from .windower import windower`` would do.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        lazy = self.__dict__.get("__lazy__", {})
+        if name not in lazy:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+
+        module = importlib.import_module(f"{self.__name__}.{lazy[name]}")
+        obj = getattr(module, name)
+        super().__setattr__(name, obj)
+        return obj
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        lazy = self.__dict__.get("__lazy__", {})
+        if isinstance(value, types.ModuleType) and lazy.get(name) == name:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self) -> list[str]:
+        return sorted(set(super().__dir__()) | set(self.__dict__.get("__lazy__", {})))
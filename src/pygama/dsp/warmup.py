@@ -0,0 +1,110 @@
+"""
+This module provides routines for compiling the DSP processors ahead of time
+and storing them in Numba's on-disk cache.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import sys
+import tempfile
+
+import numba
+
+from pygama.dsp.build_dsp import build_dsp
+from pygama.dsp.utils import numba_defaults
+
+log = logging.getLogger(__name__)
+
+
+def warmup(
+    dsp_config: str | dict = None,
+    f_raw: str = None,
+    lh5_tables: list[str] | str = None,
+    database: str | dict = None,
+    cache_dir: str = None,
+    n_max: int = 16,
+    fftw_wisdom: str = None,
+) -> None:
+    """Compile the DSP processors and store them in Numba's on-disk cache.
+
+    Every processor in :mod:`pygama.dsp.processors` is compiled for all of its
+    type signatures. If a DSP configuration and a raw file are given, the
+    configuration is also run on the first `n_max` rows of each table, which
+    compiles anything that is only compiled on first use for the data types
+    found in the file (e.g. unit conversions). Processors that run FFTW plans
+    instead of Numba code (e.g. :func:`.processors.cusp_filter`) are not
+    cached this way, see `fftw_wisdom`.
+
+    Later jobs load the precompiled code instead of compiling it again, as long
+    as they enable caching and use the same cache directory (e.g. with the
+    ``PYGAMA_CACHE=1`` and ``NUMBA_CACHE_DIR`` environment variables).
+
+    Parameters
+    ----------
+    dsp_config
+        :class:`dict` or name of JSON file containing a
+        :class:`~.processing_chain.ProcessingChain` config. Requires `f_raw`.
+    f_raw
+        name of raw-tier LH5 file used to run `dsp_config`.
+    lh5_tables
+        list of HDF5 groups to consider in `f_raw`. See
+        :func:`~.build_dsp.build_dsp`.
+    database
+        dictionary or name of JSON file containing a parameter database. See
+        :func:`~.build_dsp.build_dsp`.
+    cache_dir
+        directory to store the compiled code in. If ``None``, use the
+        ``NUMBA_CACHE_DIR`` environment variable, or Numba's default location
+        (next to the processor source files) if it is not set.
+    n_max
+        number of rows of each table to process with `dsp_config`.
+    fftw_wisdom
+        name of a file to store FFTW wisdom in. If given, the FFTs used by
+        `dsp_config` are planned with ``FFTW_PATIENT`` and the resulting
+        wisdom is added to the file. Later jobs load it if the
+        ``PYGAMA_FFTW_WISDOM`` environment variable points to this file. See
+        :func:`.processors.fftw.fftw_plan`.
+    """
+    if dsp_config is not None and f_raw is None:
+        raise ValueError("a raw file must be provided to warm up a DSP config")
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ["NUMBA_CACHE_DIR"] = cache_dir
+        numba.config.CACHE_DIR = cache_dir
+
+    if "pygama.dsp.processors" in sys.modules and not numba_defaults.cache:
+        log.warning(
+            "pygama.dsp.processors was imported before enabling the cache, "
+            "processors that are already compiled will not be stored"
+        )
+    numba_defaults.cache = True
+
+    processors = importlib.import_module("pygama.dsp.processors")
+    for name in processors.__all__:
+        getattr(processors, name)
+    log.info(f"compiled {len(processors.__all__)} processors")
+
+    if fftw_wisdom is not None:
+        fftw = importlib.import_module("pygama.dsp.processors.fftw")
+        fftw.wisdom_file = fftw_wisdom
+        fftw.planner_effort = "FFTW_PATIENT"
+
+    if dsp_config is not None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            build_dsp(
+                f_raw,
+                os.path.join(tmp_dir, "warmup_dsp.lh5"),
+                dsp_config,
+                lh5_tables=lh5_tables,
+                database=database,
+                n_max=n_max,
+                write_mode="r",
+            )
+        log.info(f"compiled processors used by DSP config for {f_raw}")
+
+    if fftw_wisdom is not None:
+        fftw.save_fftw_wisdom()
+        log.info(f"stored FFTW wisdom in {fftw_wisdom}")
@@ -144,12 +144,10 @@ class WaveformTable(Table):
                 if values is None:
                     values = VectorOfVectors(shape_guess=shape_guess, dtype=dtype)
                 else:
-                    flattened_data = np.concatenate(values)
-                    length = 0
-                    cumulative_length = []
-                    for i in range(size):
-                        length += len(values[i])
-                        cumulative_length.append(length)
+                    flattened_data = np.concatenate(values).astype(dtype, copy=False)
+                    cumulative_length = np.cumsum(
+                        [len(values[i]) for i in range(size)], dtype="uint32"
+                    )
                     values = VectorOfVectors(
                         flattened_data=flattened_data,
                         cumulative_length=cumulative_length,
@@ -3,7 +3,6 @@ pygama convenience functions.
 """
 import sys
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 
@@ -62,6 +61,8 @@ def set_plot_style(style):
     Current options: 'clint', 'root'
     Or add your own [label].mpl file in the pygama directory!
     """
+    import matplotlib.pyplot as plt
+
     path = __file__.rstrip('.utils.py')
     plt.style.use(path+'/'+style+'.mpl')
 
@@ -81,6 +82,8 @@ def plot_func(func, pars, range=None, npx=None, **kwargs):
     plot a function.  take care of the x-axis points automatically, or user can
     specify via range and npx arguments.
     """
+    import matplotlib.pyplot as plt
+
     if npx is None:
         npx = 100
     if range is None:
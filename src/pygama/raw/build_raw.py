@@ -15,7 +15,7 @@ from pygama.math.utils import sizeof_fmt
 
 from .fc.fc_streamer import FCStreamer
 from .orca.orca_streamer import OrcaStreamer
-from .raw_buffer import RawBufferLibrary, write_to_lh5_and_clear
+from .raw_buffer import RawBufferDSP, RawBufferLibrary, write_to_lh5_and_clear
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +27,10 @@ def build_raw(
     buffer_size: int = 8192,
     n_max: int = np.inf,
     overwrite: bool = False,
+    dsp_config: str | dict = None,
+    database: str | dict = None,
+    dsp_out_spec: str = None,
+    write_raw: bool = True,
     **kwargs,
 ) -> None:
     """Convert data into LEGEND HDF5 raw-tier format.
@@ -66,6 +70,30 @@ def build_raw(
     overwrite
         sets whether to overwrite the output file(s) if it (they) already exist.
 
+    dsp_config
+        :class:`dict` or name of JSON file containing a
+        :class:`~.dsp.processing_chain.ProcessingChain` configuration (see
+        :func:`~.dsp.build_dsp.build_dsp`). If given, the configuration is also
+        run on every raw buffer table as soon as it is full, and the results
+        are written to `dsp_out_spec`. This produces the same DSP-tier data as
+        :func:`~.dsp.build_dsp.build_dsp` on the raw-tier output, without
+        writing and reading back the raw data. Tables that lack the inputs of
+        the configuration are not processed.
+
+    database
+        dictionary or name of JSON file containing the parameter database of
+        `dsp_config`, with one entry per raw table (see
+        :func:`~.dsp.build_dsp.build_dsp`).
+
+    dsp_out_spec
+        name of the DSP-tier output file. Defaults to the raw output file name
+        (or `in_stream`, if `out_spec` is not a file name) with the ``_raw``
+        suffix and extension replaced by ``_dsp.lh5``. Tables are written under
+        the name of the raw table with ``/raw`` replaced by ``/dsp``.
+
+    write_raw
+        if ``False`` and `dsp_config` is given, only write the DSP-tier data.
+
     **kwargs
         sent to :class:`.RawBufferLibrary` generation as `kw_dict`.
     """
@@ -189,6 +217,14 @@ def build_raw(
     # rb_lib should now be fully initialized. Check if files need to be
     # overwritten or if we need to stop to avoid overwriting
     out_files = rb_lib.get_list_of("out_stream")
+    if dsp_config is not None:
+        if not write_raw:
+            out_files = []
+        if dsp_out_spec is None:
+            dsp_out_spec = out_spec if isinstance(out_spec, str) else in_stream
+            dsp_out_spec = os.path.splitext(dsp_out_spec)[0].removesuffix("_raw")
+            dsp_out_spec += "_dsp.lh5"
+        out_files = out_files + [dsp_out_spec]
     for out_file in out_files:
         colpos = out_file.find(":")
         if colpos != -1:
@@ -207,9 +243,15 @@ def build_raw(
 
         os.remove(out_file_glob[0])
 
+    # set up the processing of the raw buffers
+    raw_dsp = None
+    if dsp_config is not None:
+        raw_dsp = RawBufferDSP(dsp_config, database, dsp_out_spec)
+
     # Write header data
     lh5_store = lgdo.LH5Store(keep_open=True)
-    write_to_lh5_and_clear(header_data, lh5_store)
+    if write_raw or raw_dsp is None:
+        write_to_lh5_and_clear(header_data, lh5_store)
 
     # Now loop through the data
     n_bytes_last = streamer.n_bytes_read
@@ -228,14 +270,24 @@ def build_raw(
             n_read += rb.loc
         if log.level <= logging.INFO and n_max < np.inf:
             progress_bar.update(n_read)
-        write_to_lh5_and_clear(chunk_list, lh5_store)
+        if raw_dsp is not None:
+            raw_dsp.process(chunk_list, lh5_store)
+        if write_raw or raw_dsp is None:
+            write_to_lh5_and_clear(chunk_list, lh5_store)
+        else:
+            for rb in chunk_list:
+                rb.loc = 0
         if n_max <= 0:
             break
 
     streamer.close_stream()
     progress_bar.close()
+    if raw_dsp is not None:
+        raw_dsp.close(lh5_store)
 
     out_files = rb_lib.get_list_of("out_stream")
+    if raw_dsp is not None:
+        out_files = (out_files if write_raw else []) + [dsp_out_spec]
     if len(out_files) == 1:
         out_file = out_files[0].split(":", 1)[0]
         if os.path.exists(out_file):
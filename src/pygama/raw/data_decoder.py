@@ -138,18 +138,28 @@ class DataDecoder:
             # get datatype for complex objects
             datatype = attrs.pop("datatype")
 
-            # waveforms: must have attributes t0_units, dt, dt_units, wf_len
+            # waveforms: must have attributes t0_units, dt, dt_units, and
+            # wf_len (None for waveforms of varying length)
             if datatype == "waveform":
                 t0_units = attrs.pop("t0_units")
                 dt = attrs.pop("dt")
                 dt_units = attrs.pop("dt_units")
-                wf_len = attrs.pop("wf_len")
+                wf_len = attrs.pop("wf_len", None)
+                values = None
+                if wf_len is None:
+                    # waveforms of varying length: store each with its own
+                    # length instead of padding them
+                    length_guess = attrs.pop("length_guess", 1024)
+                    values = lgdo.VectorOfVectors(
+                        shape_guess=(size, length_guess), dtype=dtype
+                    )
                 wf_table = lgdo.WaveformTable(
                     size=size,
                     t0=0,
                     t0_units=t0_units,
                     dt=dt,
                     dt_units=dt_units,
+                    values=values,
                     wf_len=wf_len,
                     dtype=dtype,
                     attrs=attrs,
@@ -193,6 +203,24 @@ class DataDecoder:
 
         return data_obj
 
+    def put_waveform(
+        self, wf_table: lgdo.WaveformTable, i_row: int, wf: np.ndarray
+    ) -> None:
+        """Store waveform `wf` in row `i_row` of `wf_table`.
+
+        If the waveform values are a :class:`~.lgdo.vectorofvectors.VectorOfVectors`
+        (``wf_len`` is ``None`` in `decoded_values`), `wf` is stored with its
+        own length and rows must be filled in order. Otherwise, `wf` is copied
+        to the start of the row and truncated to its length, and the rest of
+        the row is filled with zeros.
+        """
+        if isinstance(wf_table.values, lgdo.VectorOfVectors):
+            wf_table.values.set_vector(i_row, wf)
+        else:
+            n_samples = min(len(wf), wf_table.wf_len)
+            wf_table.values.nda[i_row, :n_samples] = wf[:n_samples]
+            wf_table.values.nda[i_row, n_samples:] = 0
+
     def put_in_garbage(self, packet: int, packet_id: int, code: int) -> None:
         i_row = self.garbage_table.loc
         p8 = np.frombuffer(packet, dtype="uint8")
@@ -122,7 +122,9 @@ fc_decoded_values = {
     "waveform": {
         "dtype": "uint16",
         "datatype": "waveform",
-        "wf_len": 65532,  # max value. override this before initializing buffers to save RAM
+        # max value. override this before initializing buffers to save
+        # RAM, or set to None for waveforms of varying length
+        "wf_len": 65532,
         "dt": 16,  # override if a different clock rate is used
         "dt_units": "ns",
         "t0_units": "ns",
@@ -159,7 +161,8 @@ class FCEventDecoder(DataDecoder):
             extracted via :meth:`~.fc_config_decoder.FCConfigDecoder.decode_config`.
         """
         self.fc_config = fc_config
-        self.decoded_values["waveform"]["wf_len"] = self.fc_config["nsamples"].value
+        if self.decoded_values["waveform"]["wf_len"] is not None:
+            self.decoded_values["waveform"]["wf_len"] = self.fc_config["nsamples"].value
 
     def decode_packet(
         self,
@@ -205,7 +208,7 @@ class FCEventDecoder(DataDecoder):
                 self.skipped_channels[iwf] += 1
                 continue
             tbl = evt_rbkd[iwf].lgdo
-            if fcio.nsamples != tbl["waveform"]["values"].nda.shape[1]:
+            if tbl["waveform"].wf_len >= 0 and fcio.nsamples != tbl["waveform"].wf_len:
                 log.warning(
                     "event wf length was",
                     fcio.nsamples,
@@ -251,7 +254,7 @@ class FCEventDecoder(DataDecoder):
             tbl["deadtime"].nda[ii] = fcio.deadtime
 
             # if len(traces[iwf]) != fcio.nsamples: # number of sample per trace check
-            tbl["waveform"]["values"].nda[ii][:] = fcio.traces[iwf]
+            self.put_waveform(tbl["waveform"], ii, fcio.traces[iwf])
 
             evt_rbkd[iwf].loc += 1
             any_full |= evt_rbkd[iwf].is_full()
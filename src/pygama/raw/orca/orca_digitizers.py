@@ -47,7 +47,9 @@ class ORSIS3302DecoderForEnergy(OrcaDecoder):
             "waveform": {
                 "dtype": "uint16",
                 "datatype": "waveform",
-                "wf_len": 65532,  # max value. override this before initializing buffers to save RAM
+                # max value. override this before initializing buffers to save
+                # RAM, or set to None for waveforms of varying length
+                "wf_len": 65532,
                 "dt": 10,  # override if a different clock rate is used
                 "dt_units": "ns",
                 "t0_units": "ns",
@@ -91,7 +93,8 @@ class ORSIS3302DecoderForEnergy(OrcaDecoder):
                     if trace_length <= 0 or trace_length > 2**16:
                         raise RuntimeError(f"invalid trace_length {trace_length}")
                         sys.exit()
-                    self.decoded_values[ccc]["waveform"]["wf_len"] = trace_length
+                    if self.decoded_values[ccc]["waveform"]["wf_len"] is not None:
+                        self.decoded_values[ccc]["waveform"]["wf_len"] = trace_length
 
     def get_key_list(self) -> list[str]:
         key_list = []
@@ -183,7 +186,6 @@ class ORSIS3302DecoderForEnergy(OrcaDecoder):
             i_stop_2 = i_start_1
 
         # handle the waveform(s)
-        tbwf = tbl["waveform"]["values"].nda[ii]
         if wf_length32 > 0:
             if not buffer_wrap:
                 if i_wf_stop - i_wf_start != expected_wf_length16:
@@ -191,7 +193,7 @@ class ORSIS3302DecoderForEnergy(OrcaDecoder):
                         f"We expected {expected_wf_length16} waveform samples "
                         "and only got {i_wf_stop-i_wf_start}"
                     )
-                tbwf[:expected_wf_length16] = p16[i_wf_start:i_wf_stop]
+                wf = p16[i_wf_start:i_wf_stop]
             else:
                 len1 = i_stop_1 - i_start_1
                 len2 = i_stop_2 - i_start_2
@@ -199,8 +201,11 @@ class ORSIS3302DecoderForEnergy(OrcaDecoder):
                     raise RuntimeError(
                         f"We expected {expected_wf_length16} waveform samples and only got {len1+len2}"
                     )
-                tbwf[:len1] = p16[i_start_1:i_stop_1]
-                tbwf[len1 : len1 + len2] = p16[i_start_2:i_stop_2]
+                wf = np.concatenate((p16[i_start_1:i_stop_1], p16[i_start_2:i_stop_2]))
+            self.put_waveform(tbl["waveform"], ii, wf)
+        elif tbl["waveform"].wf_len < 0:
+            # waveforms of varying length need a (here empty) row per event
+            self.put_waveform(tbl["waveform"], ii, p16[:0])
 
         evt_rbkd[ccc].loc += 1
         return evt_rbkd[ccc].is_full()
@@ -307,7 +312,9 @@ class ORSIS3316WaveformDecoder(OrcaDecoder):
             "waveform": {
                 "dtype": "uint16",
                 "datatype": "waveform",
-                "wf_len": 65532,  # max value. override this before initializing buffers to save RAM
+                # max value. override this before initializing buffers to save
+                # RAM, or set to None for waveforms of varying length
+                "wf_len": 65532,
                 "dt": 8,  # override if a different clock rate is used
                 "dt_units": "ns",
                 "t0_units": "ns",
@@ -343,7 +350,8 @@ class ORSIS3316WaveformDecoder(OrcaDecoder):
                             trace_length,
                         )
 
-                    self.decoded_values[ccc]["waveform"]["wf_len"] = trace_length
+                    if self.decoded_values[ccc]["waveform"]["wf_len"] is not None:
+                        self.decoded_values[ccc]["waveform"]["wf_len"] = trace_length
                     global preTrig
                     preTrig = card_dict["preTriggerDelay"]
 
@@ -553,6 +561,11 @@ class ORSIS3316WaveformDecoder(OrcaDecoder):
 
                 i_wf_stop = i_wf_start + expected_wf_length
 
+                # waveforms of varying length are stored with their own length
+                wf_len = tbl["waveform"].wf_len
+                if wf_len < 0:
+                    wf_len = expected_wf_length
+
                 if i >= 1:
                     # print("index: ", ii)
                     for j in np.arange(0, 40, 1):
@@ -560,10 +573,7 @@ class ORSIS3316WaveformDecoder(OrcaDecoder):
                         # print("channel is: ", channel)
                         # print("index of 55 is: ", event_start + j)
                         try:
-                            if (
-                                packet[event_start + j] & 0x3FFFFFF
-                                == len(tbl["waveform"]["values"].nda[ii]) / 2
-                            ):
+                            if packet[event_start + j] & 0x3FFFFFF == wf_len / 2:
                                 # print("index for packet is: ", event_start + j)
                                 # print("index is: ", ii)
                                 # print(data_header_length)
@@ -583,10 +593,10 @@ class ORSIS3316WaveformDecoder(OrcaDecoder):
                                 (packet[event_start] & 0xFFFF0000) << 16
                             )
 
-                if expected_wf_length > 0:
-                    tbl["waveform"]["values"].nda[ii] = evt_data_16[
-                        i_wf_start:i_wf_stop
-                    ]
+                if expected_wf_length > 0 or tbl["waveform"].wf_len < 0:
+                    self.put_waveform(
+                        tbl["waveform"], ii, evt_data_16[i_wf_start:i_wf_stop]
+                    )
 
                 # move to the next index for the next event.
                 evt_rbkd[ccc].loc += 1
@@ -179,7 +179,8 @@ class ORFlashCamADCWaveformDecoder(OrcaDecoder):
                 "eventSamples"
             ]
             self.decoded_values[fcid] = copy.deepcopy(self.decoded_values_template)
-            self.decoded_values[fcid]["waveform"]["wf_len"] = wf_len
+            if self.decoded_values[fcid]["waveform"]["wf_len"] is not None:
+                self.decoded_values[fcid]["waveform"]["wf_len"] = wf_len
 
     def get_key_list(self) -> list[int]:
         key_list = []
@@ -200,7 +201,7 @@ class ORFlashCamADCWaveformDecoder(OrcaDecoder):
 
     def assert_nsamples(self, nsamples: int, fcid: int) -> None:
         orca_nsamples = self.decoded_values[fcid]["waveform"]["wf_len"]
-        if orca_nsamples != nsamples:
+        if orca_nsamples is not None and orca_nsamples != nsamples:
             log.warning(
                 f"orca miscalculated nsamples = {orca_nsamples} for fcid {fcid}, updating to {nsamples}"
             )
@@ -232,9 +233,10 @@ class ORFlashCamADCWaveformDecoder(OrcaDecoder):
         tbl = evt_rbkd[key].lgdo
         ii = evt_rbkd[key].loc
 
-        # check that the waveform length is as expected
-        rb_wf_len = tbl["waveform"]["values"].nda.shape[1]
-        if wf_samples != rb_wf_len:
+        # check that the waveform length is as expected. Waveforms of varying
+        # length (negative wf_len) are stored with their own length
+        rb_wf_len = tbl["waveform"].wf_len
+        if rb_wf_len >= 0 and wf_samples != rb_wf_len:
             if not hasattr(self, "wf_len_errs"):
                 self.wf_len_errs = {}
             # if dec_vals has been updated, orca miscalc'd and a warning has
@@ -307,7 +309,7 @@ class ORFlashCamADCWaveformDecoder(OrcaDecoder):
             offset * 2 : offset * 2 + wf_samples
         ]
 
-        tbl["waveform"]["values"].nda[ii][:wf_samples] = wf
+        self.put_waveform(tbl["waveform"], ii, wf)
 
         evt_rbkd[key].loc += 1
         return evt_rbkd[key].is_full()
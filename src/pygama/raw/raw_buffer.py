@@ -19,6 +19,10 @@ all have the same structure (same type, same fields, etc). A
 :class:`.RawBufferLibrary`: a dictionary of :class:`RawBufferList`\ s, e.g. one
 for each :class:`~.raw.data_decoder.DataDecoder`. Keyed by the decoder name.
 
+:class:`.RawBufferDSP`: runs a DSP configuration on the tables of
+:class:`RawBuffer`\ s as they are filled, producing DSP-tier data without
+writing the raw data to disk first.
+
 :class:`.RawBuffer` supports a JSON short-hand notation, see
 :meth:`.RawBufferLibrary.set_from_json_dict` for full specification.
 
@@ -61,12 +65,16 @@ keys.
 """
 from __future__ import annotations
 
+import json
+import logging
 import os
 from typing import Union
 
 from pygama import lgdo
 from pygama.lgdo.lh5_store import LH5Store
 
+log = logging.getLogger(__name__)
+
 LGDO = Union[lgdo.Scalar, lgdo.Struct, lgdo.Array, lgdo.VectorOfVectors]
 
 
@@ -326,6 +334,141 @@ class RawBufferLibrary(dict):
             rb_list.clear_full()
 
 
+class RawBufferDSP:
+    r"""Run a DSP configuration on the tables of :class:`RawBuffer`\ s.
+
+    Every :class:`~.lgdo.table.Table` passed to :meth:`process` is bound
+    directly as the input of a :class:`~.dsp.processing_chain.ProcessingChain`
+    (one per output table, reused as long as the buffer is), and the output
+    rows are appended to the DSP-tier file. Tables that lack the inputs of
+    the configuration are skipped.
+
+    Attributes
+    ----------
+    dsp_config
+        the :class:`~.dsp.processing_chain.ProcessingChain` configuration.
+    database
+        the parameter database, with one entry per raw table name.
+    out_stream
+        name of the DSP-tier LH5 file.
+    block_width
+        number of waveforms to process at a time.
+    """
+
+    def __init__(
+        self,
+        dsp_config: str | dict,
+        database: str | dict = None,
+        out_stream: str = "",
+        block_width: int = 16,
+    ) -> None:
+        if isinstance(dsp_config, str):
+            with open(dsp_config) as config_file:
+                dsp_config = json.load(config_file)
+        if isinstance(database, str):
+            with open(database) as db_file:
+                database = json.load(db_file)
+
+        self.dsp_config = dsp_config
+        self.database = database
+        self.out_stream = out_stream
+        self.block_width = block_width
+        # processing chains and the buffers they are bound to, or None for
+        # tables that cannot be processed. Keyed by raw table name
+        self.chains = {}
+        self.n_rows = {}
+
+    def process(self, raw_buffers: list[RawBuffer], lh5_store: LH5Store = None) -> None:
+        r"""Process the filled rows of `raw_buffers` and write the results.
+
+        The :class:`RawBuffer`\ s are not cleared.
+        """
+        from pygama.dsp.errors import DSPFatal
+
+        if lh5_store is None:
+            lh5_store = lgdo.LH5Store()
+        for rb in raw_buffers:
+            if not isinstance(rb.lgdo, lgdo.Table) or rb.loc == 0:
+                continue
+            filename, group = _split_out_stream(rb.out_stream)
+            tb = f"{group}/{rb.out_name}".strip("/")
+            chain = self._get_chain(tb, rb.lgdo)
+            if chain is None:
+                continue
+
+            proc_chain, tb_out = chain
+            start_row = self.n_rows.get(tb, 0)
+            try:
+                proc_chain.execute(0, rb.loc)
+            except DSPFatal as e:
+                # Update the wf_range to reflect the stream position
+                e.wf_range = f"{e.wf_range[0]+start_row}-{e.wf_range[1]+start_row}"
+                raise e
+            lh5_store.write_object(
+                tb_out,
+                tb.replace("/raw", "/dsp"),
+                self.out_stream,
+                n_rows=rb.loc,
+                wo_mode="append",
+            )
+            self.n_rows[tb] = start_row + rb.loc
+
+    def close(self, lh5_store: LH5Store = None) -> None:
+        """Write the processing metadata to ``dsp_info`` in the DSP-tier file,
+        as :func:`~.dsp.build_dsp.build_dsp` does."""
+        from pygama.dsp.build_dsp import _dsp_info, _release_processing_chain
+        from pygama.dsp.processing_chain import recipe_hashes
+
+        for chain in self.chains.values():
+            if chain is not None:
+                _release_processing_chain(chain[1])
+        self.chains = {}
+        if not self.n_rows:
+            return
+        if lh5_store is None:
+            lh5_store = lgdo.LH5Store()
+        recipes = {}
+        for tb in self.n_rows:
+            hashes = recipe_hashes(self.dsp_config, self._db_dict(tb))
+            recipes[tb] = {
+                out: hashes.get(out, "input") for out in self.dsp_config["outputs"]
+            }
+        dsp_info = _dsp_info()
+        dsp_info.add_field("recipes", lgdo.Scalar(json.dumps(recipes)))
+        lh5_store.write_object(dsp_info, "dsp_info", self.out_stream, wo_mode="o")
+
+    def _db_dict(self, tb: str) -> dict:
+        return self.database.get(tb.split("/")[0]) if self.database else None
+
+    def _get_chain(self, tb: str, lh5_in: lgdo.Table) -> tuple | None:
+        from pygama.dsp.build_dsp import (
+            _get_processing_chain,
+            _release_processing_chain,
+        )
+        from pygama.dsp.errors import ProcessingChainError
+
+        if tb in self.chains:
+            chain = self.chains[tb]
+            if chain is None or chain[0] is lh5_in:
+                return None if chain is None else chain[1:]
+            _release_processing_chain(chain[1])
+
+        try:
+            proc_chain, _, tb_out = _get_processing_chain(
+                lh5_in,
+                self.dsp_config,
+                self._db_dict(tb),
+                self.dsp_config["outputs"],
+                self.block_width,
+            )
+        except ProcessingChainError as e:
+            log.debug(f"not processing {tb}: {e}")
+            self.chains[tb] = None
+            return None
+        self.chains[tb] = (lh5_in, proc_chain, tb_out)
+        return proc_chain, tb_out
+
+
 def expand_rblist_json_dict(json_dict: dict, kw_dict: dict[str, str]) -> None:
     """Expand shorthands in a JSON dictionary representing a
     :class:`.RawBufferList`.
@@ -411,15 +554,7 @@ def write_to_lh5_and_clear(
     for rb in raw_buffers:
         if rb.lgdo is None or rb.loc == 0:
             continue  # no data to write
-        ii = rb.out_stream.find(":")
-        if ii == -1:
-            filename = rb.out_stream
-            group = "/"
-        else:
-            filename = rb.out_stream[:ii]
-            group = rb.out_stream[ii + 1 :]
-            if len(group) == 0:
-                group = "/"  # in case out_stream ends with :
+        filename, group = _split_out_stream(rb.out_stream)
         # write if requested...
         if filename != "":
             lh5_store.write_object(
@@ -432,3 +567,12 @@ def write_to_lh5_and_clear(
             )
         # and clear
         rb.loc = 0
+
+
+def _split_out_stream(out_stream: str) -> tuple[str, str]:
+    """Split a :class:`RawBuffer` `out_stream` into file name and group."""
+    ii = out_stream.find(":")
+    if ii == -1:
+        return out_stream, "/"
+    # in case out_stream ends with :
+    return out_stream[:ii], out_stream[ii + 1 :] or "/"
@@ -0,0 +1,161 @@
+import importlib
+import json
+
+import numpy as np
+import pytest
+
+import pygama.lgdo as lgdo
+from pygama.dsp import build_dsp
+from pygama.dsp.build_dsp import clear_chain_cache
+from pygama.dsp.processing_chain import ProcessingChain
+from pygama.lgdo import LH5Store
+
+autotune = importlib.import_module("pygama.dsp.autotune")
+
+dsp_config = {
+    "outputs": ["bl_slope", "bl_intercept", "trap_max"],
+    "processors": {
+        "bl_mean, bl_std, bl_slope, bl_intercept": {
+            "function": "linear_slope_fit",
+            "module": "pygama.dsp.processors",
+            "args": ["waveform[:100]", "bl_mean", "bl_std", "bl_slope", "bl_intercept"],
+            "unit": ["ADC", "ADC", "ADC", "ADC"],
+        },
+        "wf_trap": {
+            "function": "trap_filter",
+            "module": "pygama.dsp.processors",
+            "args": ["waveform", "10", "5", "wf_trap"],
+            "unit": "ADC",
+        },
+        "trap_max": {
+            "function": "amax",
+            "module": "numpy",
+            "args": ["wf_trap", 1, "trap_max"],
+            "kwargs": {"signature": "(n),()->()", "types": ["fi->f"]},
+            "unit": "ADC",
+        },
+    },
+}
+
+
+@pytest.fixture
+def raw_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(autotune, "cache_file", str(tmp_path / "autotune.json"))
+    monkeypatch.setattr(autotune, "_cache", None)
+    monkeypatch.setattr(autotune, "block_widths", [8, 16])
+    monkeypatch.setattr(autotune, "buffer_lens", [50, 100])
+    # the chains cached by other tests count in the memory budget
+    clear_chain_cache()
+
+    rng = np.random.default_rng(1234)
+    n_rows = 200
+    wf = lgdo.WaveformTable(
+        t0=np.zeros(n_rows),
+        t0_units="ns",
+        dt=np.full(n_rows, 16.0),
+        dt_units="ns",
+        values=rng.normal(size=(n_rows, 500)).astype("float32"),
+        values_units="ADC",
+    )
+    f_raw = str(tmp_path / "raw.lh5")
+    LH5Store().write_object(lgdo.Table(col_dict={"waveform": wf}), "geds/raw", f_raw)
+    return f_raw
+
+
+def test_autotune(raw_file, monkeypatch):
+    settings = autotune.autotune(raw_file, "geds/raw", dsp_config, n_rows=100)
+    assert settings["block_width"] in (8, 16)
+    assert settings["buffer_len"] in (56, 104, 64, 112)
+    assert settings["buffer_len"] % settings["block_width"] == 0
+    assert settings["memory"] > 0
+
+    # the second call is answered from the cache file, without reading rows
+    autotune._cache = None
+    with monkeypatch.context() as m:
+        m.setattr(LH5Store, "read_object", None)
+        assert (
+            autotune.autotune(raw_file, "geds/raw", dsp_config, n_rows=100) == settings
+        )
+    with open(autotune.cache_file) as f:
+        assert list(json.load(f).values()) == [settings]
+
+    # nothing fits in the budget: use the smallest settings
+    settings = autotune.autotune(
+        raw_file, "geds/raw", dsp_config, max_memory=1, n_rows=100
+    )
+    assert settings["block_width"] == 8
+    assert settings["buffer_len"] == 56
+
+
+def test_build_dsp_autotune(raw_file, tmp_path):
+    f_dsp = str(tmp_path / "dsp.lh5")
+    build_dsp(raw_file, f_dsp, dsp_config, autotune=True)
+
+    store = LH5Store()
+    settings = json.loads(store.read_object("dsp_info/autotune", f_dsp)[0].value)
+    assert settings["geds/raw"]["block_width"] in (8, 16)
+
+    f_ref = str(tmp_path / "ref.lh5")
+    build_dsp(raw_file, f_ref, dsp_config, buffer_len=64, block_width=8)
+    for par in dsp_config["outputs"]:
+        assert np.array_equal(
+            store.read_object(f"geds/dsp/{par}", f_dsp)[0].nda,
+            store.read_object(f"geds/dsp/{par}", f_ref)[0].nda,
+        )
+
+
+def test_plan_memory(raw_file):
+    # everything fits: keep the requested settings
+    settings = autotune.plan_memory(
+        raw_file, "geds/raw", dsp_config, block_width=16, buffer_len=100
+    )
+    assert settings["block_width"] == 16
+    assert settings["buffer_len"] == 100
+
+    # the buffer length is reduced first
+    budget = settings["memory"] // 2
+    settings = autotune.plan_memory(
+        raw_file, "geds/raw", dsp_config, None, None, budget, 16, 100
+    )
+    assert settings["block_width"] == 16
+    assert settings["buffer_len"] % 16 == 0 and settings["buffer_len"] < 100
+    assert settings["memory"] <= budget
+
+    # then the block width
+    settings = autotune.plan_memory(
+        raw_file, "geds/raw", dsp_config, None, None, 1, 16, 100
+    )
+    assert settings["block_width"] == 1
+    assert settings["buffer_len"] == 1
+
+
+def test_build_dsp_max_memory(raw_file, tmp_path):
+    f_dsp = str(tmp_path / "dsp.lh5")
+    build_dsp(raw_file, f_dsp, dsp_config, max_memory=200000)
+
+    f_ref = str(tmp_path / "ref.lh5")
+    build_dsp(raw_file, f_ref, dsp_config)
+    store = LH5Store()
+    for par in dsp_config["outputs"]:
+        assert np.array_equal(
+            store.read_object(f"geds/dsp/{par}", f_dsp)[0].nda,
+            store.read_object(f"geds/dsp/{par}", f_ref)[0].nda,
+        )
+
+
+def test_plan_memory_reuse(raw_file, tmp_path, monkeypatch):
+    n_built = []
+    init_chain = ProcessingChain.__init__
+
+    def counting_init(self, *args, **kwargs):
+        n_built.append(1)
+        init_chain(self, *args, **kwargs)
+
+    monkeypatch.setattr(ProcessingChain, "__init__", counting_init)
+
+    # the chain measured by plan_memory is the one build_dsp runs
+    f_dsp = str(tmp_path / "dsp.lh5")
+    build_dsp(
+        raw_file, f_dsp, dsp_config, block_width=8, buffer_len=64, max_memory=2**30
+    )
+    assert len(n_built) == 1
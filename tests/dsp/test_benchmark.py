@@ -0,0 +1,50 @@
+import numpy as np
+
+import pygama.dsp.processors
+from pygama.dsp import benchmark
+
+
+def test_synthetic_waveforms():
+    tbl = benchmark.synthetic_waveforms(100, "hpge", dtype="uint16", seed=1)
+    wfs = tbl["waveform"].values.nda
+    assert wfs.shape == (100, benchmark.wf_lens["hpge"])
+    assert wfs.dtype == np.uint16
+    assert np.all(tbl["baseline"].nda == 10000)
+    # pulses start at 45% of the waveform
+    assert np.all(wfs[:, -100:].mean(axis=1) > wfs[:, :100].mean(axis=1))
+
+    tbl = benchmark.synthetic_waveforms(10, "sipm", wf_len=500, dtype="float32")
+    assert tbl["waveform"].values.nda.shape == (10, 500)
+    assert tbl["waveform"].values.nda.dtype == np.float32
+
+
+def test_all_processors_benchmarked():
+    assert set(benchmark.processor_benchmarks) | set(
+        benchmark.skipped_processors
+    ) == set(pygama.dsp.processors.__all__)
+
+
+def test_benchmark_processors():
+    results = benchmark.benchmark_processors(
+        ["trap_filter", "min_max", "histogram", "wiener_filter"], n_wfs=64, repeat=1
+    )
+    assert list(results) == ["trap_filter", "min_max", "histogram", "wiener_filter"]
+    assert all(rate > 0 for rate in results.values())
+
+
+def test_compare():
+    baseline = {
+        "info": {"host": "a"},
+        "processors": {"trap_filter": 1000, "min_max": 1000},
+        "chains": {"icpc": {"16": 100, "build_time": 1}},
+    }
+    results = {
+        "info": {"host": "a"},
+        "processors": {"trap_filter": 900, "min_max": 500, "pole_zero": 10},
+        "chains": {"icpc": {"16": 50, "build_time": 10}},
+    }
+    regressions = benchmark.compare(results, baseline, tolerance=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("min_max")
+    assert regressions[1].startswith("icpc (block_width 16)")
+    assert benchmark.compare(results, baseline, tolerance=0.6) == []
@@ -1,9 +1,19 @@
+import importlib
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 from pygama import lgdo
-from pygama.dsp import build_dsp
+from pygama.dsp import build_dsp, build_dsp_multi
+from pygama.dsp.build_dsp import (
+    _get_processing_chain,
+    _proc_chain_cache,
+    _release_processing_chain,
+    clear_chain_cache,
+)
+from pygama.dsp.errors import ProcessingChainError
+from pygama.dsp.processing_chain import ProcessingChain
 from pygama.lgdo.lh5_store import LH5Store, ls
 
 config_dir = Path(__file__).parent / "configs"
@@ -40,3 +50,333 @@ def test_build_dsp_spms_channelwise(dsp_test_file_spm):
     assert isinstance(lh5_obj, lgdo.ArrayOfEqualSizedArrays)
     assert len(lh5_obj) == 5
     assert len(lh5_obj.nda[0]) == 20
+
+
+def test_build_dsp_multi(lgnd_test_data, tmp_path):
+    raw_file = lgnd_test_data.get_path(
+        "lh5/LDQTA_r117_20200110T105115Z_cal_geds_raw.lh5"
+    )
+    dsp_config = f"{config_dir}/icpc-dsp-config.json"
+    databases = [
+        {"geds": {"pz": {"tau": 27460.5}}},
+        {"geds": {"pz": {"tau": 27000.0}}},
+    ]
+
+    build_dsp_multi(
+        raw_file,
+        [
+            (dsp_config, db, f"{tmp_path}/multi_{i}_dsp.lh5")
+            for i, db in enumerate(databases)
+        ],
+        n_max=100,
+        write_mode="r",
+    )
+
+    store = LH5Store()
+    for i, db in enumerate(databases):
+        build_dsp(
+            raw_file,
+            f"{tmp_path}/single_{i}_dsp.lh5",
+            dsp_config,
+            database=db,
+            n_max=100,
+            write_mode="r",
+        )
+        multi, _ = store.read_object("geds/dsp", f"{tmp_path}/multi_{i}_dsp.lh5")
+        single, _ = store.read_object("geds/dsp", f"{tmp_path}/single_{i}_dsp.lh5")
+        assert multi.keys() == single.keys()
+        for par in single.keys():
+            assert np.array_equal(single[par].nda, multi[par].nda, equal_nan=True)
+
+
+def test_build_dsp_incremental(lgnd_test_data, tmp_path):
+    raw_file = lgnd_test_data.get_path(
+        "lh5/LDQTA_r117_20200110T105115Z_cal_geds_raw.lh5"
+    )
+    dsp_config = f"{config_dir}/icpc-dsp-config.json"
+    dsp_file = f"{tmp_path}/incremental_dsp.lh5"
+    ref_file = f"{tmp_path}/ref_dsp.lh5"
+
+    database = {"geds": {"pz": {"tau": 27460.5}}}
+    build_dsp(raw_file, dsp_file, dsp_config, database=database, write_mode="r")
+    fields = ls(dsp_file, "geds/dsp/")
+
+    # only the outputs depending on the changed values are rewritten
+    database["geds"]["etrap"] = {"rise": "8*us", "flat": "2*us", "sample": 0.5}
+    build_dsp(raw_file, dsp_file, dsp_config, database=database, write_mode="i")
+    build_dsp(raw_file, ref_file, dsp_config, database=database, write_mode="r")
+    assert ls(dsp_file, "geds/dsp/") == fields
+
+    store = LH5Store()
+    dsp, _ = store.read_object("geds/dsp", dsp_file)
+    ref, _ = store.read_object("geds/dsp", ref_file)
+    assert dsp.keys() == ref.keys()
+    for par in ref.keys():
+        assert np.array_equal(dsp[par].nda, ref[par].nda, equal_nan=True)
+
+
+def test_build_dsp_resume(lgnd_test_data, tmp_path, monkeypatch):
+    raw_file = lgnd_test_data.get_path(
+        "lh5/LDQTA_r117_20200110T105115Z_cal_geds_raw.lh5"
+    )
+    dsp_config = f"{config_dir}/icpc-dsp-config.json"
+    dsp_file = f"{tmp_path}/resume_dsp.lh5"
+    ref_file = f"{tmp_path}/ref_dsp.lh5"
+    build_dsp(raw_file, ref_file, dsp_config, write_mode="r")
+
+    # interrupt the job after the first buffer
+    execute = ProcessingChain.execute
+    n_calls = []
+
+    def interrupted(self, *args):
+        n_calls.append(None)
+        if len(n_calls) > 1:
+            raise KeyboardInterrupt
+        execute(self, *args)
+
+    monkeypatch.setattr(ProcessingChain, "execute", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        build_dsp(raw_file, dsp_file, dsp_config, buffer_len=640, resume=True)
+    monkeypatch.setattr(ProcessingChain, "execute", execute)
+
+    store = LH5Store()
+    assert store.read_n_rows("geds/dsp", dsp_file) == 640
+    with pytest.raises(ValueError):
+        build_dsp(raw_file, dsp_file, dsp_config, outputs=["trapEmax"], resume=True)
+
+    build_dsp(raw_file, dsp_file, dsp_config, buffer_len=640, resume=True)
+    dsp, _ = store.read_object("geds/dsp", dsp_file)
+    ref, _ = store.read_object("geds/dsp", ref_file)
+    for par in ref.keys():
+        assert np.array_equal(dsp[par].nda, ref[par].nda, equal_nan=True)
+
+
+@pytest.fixture
+def synthetic_raw(tmp_path):
+    rng = np.random.default_rng(1234)
+    n_rows = 2000
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field("baseline", lgdo.Array(rng.integers(0, 100, n_rows)))
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            values=rng.integers(1000, 1100, (n_rows, 200)).astype("uint16"),
+            dt=16,
+            dt_units="ns",
+            t0=0,
+            t0_units="ns",
+        ),
+    )
+    f_raw = str(tmp_path / "raw.lh5")
+    LH5Store().write_object(tbl, "geds/raw", f_raw)
+    return f_raw
+
+
+synthetic_config = {
+    "outputs": ["bl_mean", "bl_std"],
+    "processors": {
+        "wf_blsub": {
+            "function": "bl_subtract",
+            "module": "pygama.dsp.processors",
+            "args": ["waveform", "baseline", "wf_blsub"],
+            "unit": "ADC",
+        },
+        "bl_mean, bl_std, bl_slope, bl_intercept": {
+            "function": "linear_slope_fit",
+            "module": "pygama.dsp.processors",
+            "args": [
+                "wf_blsub[0:50]",
+                "bl_mean",
+                "bl_std",
+                "bl_slope",
+                "bl_intercept",
+            ],
+            "unit": ["ADC", "ADC", "ADC", "ADC"],
+        },
+    },
+}
+
+
+def assert_same_dsp(dsp_file, ref_file):
+    store = LH5Store()
+    dsp, _ = store.read_object("geds/dsp", dsp_file)
+    ref, _ = store.read_object("geds/dsp", ref_file)
+    assert dsp.size == ref.size
+    for par in ref.keys():
+        assert np.array_equal(dsp[par].nda, ref[par].nda, equal_nan=True)
+
+
+def test_build_dsp_resume_uncommitted_rows(synthetic_raw, tmp_path, monkeypatch):
+    ref_file = str(tmp_path / "ref_dsp.lh5")
+    build_dsp(synthetic_raw, ref_file, synthetic_config, write_mode="r")
+    # progress is only recorded when resume is requested
+    assert "dsp_info/checkpoint" not in ls(ref_file, "dsp_info/")
+
+    # the job stops after writing the second buffer, before its checkpoint
+    build_dsp_module = importlib.import_module("pygama.dsp.build_dsp")
+    write_checkpoint = build_dsp_module._write_checkpoint
+    n_calls = []
+
+    def interrupted(*args):
+        n_calls.append(None)
+        if len(n_calls) > 2:
+            raise KeyboardInterrupt
+        write_checkpoint(*args)
+
+    dsp_file = str(tmp_path / "dsp.lh5")
+    monkeypatch.setattr(build_dsp_module, "_write_checkpoint", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        build_dsp(
+            synthetic_raw, dsp_file, synthetic_config, buffer_len=640, resume=True
+        )
+    monkeypatch.setattr(build_dsp_module, "_write_checkpoint", write_checkpoint)
+    assert LH5Store().read_n_rows("geds/dsp", dsp_file) == 1280
+
+    # the rows after the last checkpoint are written again
+    build_dsp(synthetic_raw, dsp_file, synthetic_config, buffer_len=640, resume=True)
+    assert_same_dsp(dsp_file, ref_file)
+
+
+def test_build_dsp_resume_no_checkpoint(synthetic_raw, tmp_path, monkeypatch):
+    ref_file = str(tmp_path / "ref_dsp.lh5")
+    build_dsp(synthetic_raw, ref_file, synthetic_config, write_mode="r")
+
+    execute = ProcessingChain.execute
+    n_calls = []
+
+    def interrupted(self, *args):
+        n_calls.append(None)
+        if len(n_calls) > 1:
+            raise KeyboardInterrupt
+        execute(self, *args)
+
+    dsp_file = str(tmp_path / "dsp.lh5")
+    monkeypatch.setattr(ProcessingChain, "execute", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        build_dsp(synthetic_raw, dsp_file, synthetic_config, buffer_len=640)
+    monkeypatch.setattr(ProcessingChain, "execute", execute)
+
+    # a table written without a checkpoint (e.g. by a call without resume,
+    # next to tables with one) is written again from scratch
+    store = LH5Store()
+    build_dsp_module = importlib.import_module("pygama.dsp.build_dsp")
+    build_dsp_module._write_checkpoint(
+        store,
+        dsp_file,
+        {"spms/raw": {"config": "", "start": 0, "rows": 0, "done": True}},
+    )
+    assert store.read_n_rows("geds/dsp", dsp_file) == 640
+    build_dsp(
+        synthetic_raw,
+        dsp_file,
+        synthetic_config,
+        buffer_len=640,
+        write_mode="r",
+        resume=True,
+    )
+    assert_same_dsp(dsp_file, ref_file)
+
+
+def test_build_dsp_ragged_waveforms(tmp_path):
+    rng = np.random.default_rng(1234)
+    n_rows = 300
+    # the waveforms of the first buffer are the shortest ones
+    lengths = np.concatenate(
+        [np.full(100, 300), rng.choice([300, 500, 800], size=n_rows - 100)]
+    )
+    wfs = [rng.integers(1000, 1100, size=n).astype("uint16") for n in lengths]
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            values=wfs, dt=16, dt_units="ns", t0=0, t0_units="ns", dtype="uint16"
+        ),
+    )
+    f_raw = str(tmp_path / "raw.lh5")
+    LH5Store().write_object(tbl, "geds/raw", f_raw)
+
+    dsp_config = {
+        "outputs": ["bl", "wf_blsub"],
+        "processors": {
+            "bl, bl_sig, bl_slope, bl_int": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform[0:100]", "bl", "bl_sig", "bl_slope", "bl_int"],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "wf_blsub": {
+                "function": "subtract",
+                "module": "numpy",
+                "args": ["waveform", "bl", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    dsp_file = str(tmp_path / "dsp.lh5")
+    build_dsp(f_raw, dsp_file, dsp_config, buffer_len=100, profile=True)
+
+    dsp, _ = LH5Store().read_object("geds/dsp", dsp_file)
+    assert dsp.size == n_rows
+    wf_out = dsp["wf_blsub"].values
+    assert np.array_equal(wf_out.cumulative_length.nda, np.cumsum(lengths))
+    for i in [0, 99, 100, 150, n_rows - 1]:
+        assert np.isclose(dsp["bl"].nda[i], wfs[i][:100].mean())
+        assert np.allclose(wf_out.get_vector(i), wfs[i] - dsp["bl"].nda[i], atol=1e-3)
+
+
+def test_chain_cache():
+    def raw_table(seed):
+        rng = np.random.default_rng(seed)
+        tbl = lgdo.Table(size=32)
+        tbl.add_field("baseline", lgdo.Array(rng.integers(0, 100, 32)))
+        tbl.add_field(
+            "waveform",
+            lgdo.WaveformTable(
+                values=rng.integers(1000, 1100, (32, 200)).astype("uint16"),
+                dt=16,
+                dt_units="ns",
+                t0=0,
+                t0_units="ns",
+            ),
+        )
+        return tbl
+
+    dsp_config = {
+        "outputs": ["baseline", "wf_blsub"],
+        "processors": {
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "baseline", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    clear_chain_cache()
+    tbl = raw_table(1)
+    proc_chain, _, tb_out = _get_processing_chain(tbl, dsp_config, None, None, 8)
+    proc_chain.execute()
+    _release_processing_chain(proc_chain)
+    assert len(_proc_chain_cache) == 1
+
+    # the cached chain does not hold on to the buffers it was linked to
+    del tbl, tb_out
+    assert proc_chain.memory_report()["inputs"] == []
+    with pytest.raises(ProcessingChainError):
+        proc_chain.execute()
+
+    tbl = raw_table(2)
+    reused, _, tb_out = _get_processing_chain(tbl, dsp_config, None, None, 8)
+    assert reused is proc_chain
+    assert len(_proc_chain_cache) == 0
+    assert list(tb_out.keys()) == ["baseline", "wf_blsub"]
+    assert tb_out["baseline"] is tbl["baseline"]
+    reused.execute()
+    assert np.array_equal(
+        tb_out["wf_blsub"].values.nda,
+        tbl["waveform"].values.nda - tbl["baseline"].nda[:, None].astype("float32"),
+    )
+
+    _release_processing_chain(reused)
+    clear_chain_cache()
+    assert len(_proc_chain_cache) == 0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import (
+    cusp_filter,
+    cusp_filter_bank,
+    t0_filter,
+    zac_filter,
+    zac_filter_bank,
+)
+
+
+def test_fft_convolution_valid():
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(4, 1000)).astype("float32")
+    w_in[2, 10] = np.nan
+
+    for factory in (cusp_filter, zac_filter):
+        conv = factory(900, 50, 20, 400)
+        w_out = np.zeros((4, 101), dtype="float32")
+        conv(w_in, w_out)
+
+        for i in (0, 1, 3):
+            expected = np.convolve(w_in[i], conv.kernel, "valid")
+            assert np.allclose(w_out[i], expected, rtol=1e-4, atol=1e-4)
+        assert np.isnan(w_out[2]).all()
+
+        with pytest.raises(DSPFatal):
+            conv(w_in, np.zeros((4, 100), dtype="float32"))
+
+
+def test_fft_convolution_head():
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(3, 500))
+    conv = t0_filter(8, 125)
+    assert conv.nbytes == conv.kernel.nbytes
+    w_out = np.zeros((3, 400))
+    conv(w_in, w_out)
+    # the FFT buffers of the block are reported
+    assert conv.nbytes > conv.kernel.nbytes + 4 * w_out.nbytes
+
+    for i in range(3):
+        expected = np.convolve(w_in[i], conv.kernel, "full")[:400]
+        assert np.allclose(w_out[i], expected)
+
+    # smaller blocks (e.g. waveforms selected by a condition) share the
+    # plans of a power of two rows
+    n_plans = len({id(plan) for plan in conv._plans.values()})
+    w_sub = np.zeros((1, 400))
+    conv(w_in[1:2], w_sub)
+    assert np.allclose(w_sub[0], w_out[1])
+    w_sub = np.zeros((2, 400))
+    conv(w_in[1:3], w_sub)
+    assert np.allclose(w_sub, w_out[1:3])
+    assert len({id(plan) for plan in conv._plans.values()}) == n_plans + 2
+
+    with pytest.raises(DSPFatal):
+        conv(w_in, np.zeros((3, 501)))
+
+
+def test_fft_convolution_bank():
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(4, 1000)).astype("float32")
+    sigma = [50, 100, 200]
+
+    for factory, bank_factory in (
+        (cusp_filter, cusp_filter_bank),
+        (zac_filter, zac_filter_bank),
+    ):
+        bank = bank_factory(900, sigma, 20, 400)
+        w_out = np.zeros((4, 3, 101), dtype="float32")
+        bank(w_in, w_out)
+
+        for j, s in enumerate(sigma):
+            expected = np.zeros((4, 101), dtype="float32")
+            factory(900, s, 20, 400)(w_in, expected)
+            assert np.allclose(w_out[:, j], expected, rtol=1e-4, atol=1e-4)
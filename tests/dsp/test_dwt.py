@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import pywt
+
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import discrete_wavelet_transform
+
+
+@pytest.mark.parametrize("wave_type", ["haar", "db4", "sym5"])
+@pytest.mark.parametrize("level", [1, 3])
+def test_discrete_wavelet_transform(wave_type, level):
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(3, 1001))
+    w_in[1, 10] = np.nan
+    n_out = len(pywt.downcoef("a", w_in[0], wave_type, level=level))
+    w_out = np.zeros((3, n_out))
+    discrete_wavelet_transform(wave_type, level)(w_in, w_out)
+
+    for i in (0, 2):
+        expected = pywt.downcoef("a", w_in[i], wave_type, level=level)
+        assert np.allclose(w_out[i], expected)
+    assert np.isnan(w_out[1]).all()
+
+    with pytest.raises(DSPFatal):
+        discrete_wavelet_transform(wave_type, level)(w_in, w_out[:, 1:])
+    with pytest.raises(DSPFatal):
+        discrete_wavelet_transform(wave_type, 0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pyfftw
+import pytest
+
+from pygama.dsp.processors import dft, fftw, inv_dft, psd
+
+
+def test_dft_round_trip():
+    rng = np.random.default_rng(1234)
+    w_in = pyfftw.empty_aligned((4, 1000), "float64")
+    w_dft = pyfftw.empty_aligned((4, 501), "complex128")
+    w_out = pyfftw.empty_aligned((4, 1000), "float64")
+
+    fwd = dft(w_in, w_dft)
+    bwd = inv_dft(w_dft, w_out)
+    assert fwd.signature == "(n),(l)"
+    assert fwd.types == ["dD->"]
+
+    w_in[:] = rng.normal(size=w_in.shape)
+    fwd(w_in, w_dft)
+    assert np.allclose(w_dft, np.fft.rfft(w_in))
+    bwd(w_dft, w_out)
+    assert np.allclose(w_out, w_in)
+
+    w_psd = np.zeros((4, 501))
+    psd(w_in, w_psd)(w_in, w_psd)
+    assert np.allclose(w_psd, np.abs(np.fft.rfft(w_in)))
+
+
+def test_plan_cache():
+    w_in = pyfftw.empty_aligned((4, 256), "float32")
+    w_out = pyfftw.empty_aligned((4, 129), "complex64")
+
+    plan = fftw.fftw_plan(w_in, w_out, "FFTW_FORWARD")
+    assert fftw.fftw_plan(w_in, w_out, "FFTW_FORWARD") is plan
+    other = pyfftw.empty_aligned((4, 256), "float32")
+    assert fftw.fftw_plan(other, w_out, "FFTW_FORWARD") is plan
+    assert fftw.fftw_plan(w_in[:2], w_out[:2], "FFTW_FORWARD") is not plan
+
+
+def test_wisdom(tmp_path, monkeypatch):
+    wisdom = tmp_path / "wisdom"
+    monkeypatch.setattr(fftw, "wisdom_file", None)
+    with pytest.raises(ValueError):
+        fftw.save_fftw_wisdom()
+    assert not fftw.load_fftw_wisdom(str(wisdom))
+
+    monkeypatch.setattr(fftw, "_plan_cache", {})
+    monkeypatch.setattr(fftw, "planner_effort", "FFTW_PATIENT")
+    w_in = pyfftw.empty_aligned((2, 60), "float64")
+    w_out = pyfftw.empty_aligned((2, 31), "complex128")
+    fftw.fftw_plan(w_in, w_out, "FFTW_FORWARD")
+    fftw.save_fftw_wisdom(str(wisdom))
+
+    pyfftw.forget_wisdom()
+    monkeypatch.setattr(fftw, "_plan_cache", {})
+    monkeypatch.setattr(fftw, "planner_effort", "FFTW_ESTIMATE")
+    monkeypatch.setattr(fftw, "wisdom_file", str(wisdom))
+    monkeypatch.setattr(fftw, "_wisdom_loaded", False)
+    plan = fftw.fftw_plan(w_in, w_out, "FFTW_FORWARD")
+    assert "FFTW_PATIENT" in plan.flags
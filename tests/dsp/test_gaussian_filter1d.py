@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter1d as scipy_gaussian_filter1d
+
+from pygama.dsp.processors import gaussian_filter1d
+
+
+@pytest.mark.parametrize("sigma", [1, 3, 10])
+def test_gaussian_filter1d(sigma):
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(4, 1000))
+    w_in[2, 10] = np.nan
+    w_out = np.zeros_like(w_in)
+    gaussian_filter1d(sigma)(w_in, w_out)
+
+    for i in (0, 1, 3):
+        expected = scipy_gaussian_filter1d(w_in[i], sigma, mode="reflect")
+        assert np.allclose(w_out[i], expected)
+    # the nan only spreads as far as the kernel reaches
+    radius = 4 * sigma
+    assert np.isnan(w_out[2, max(10 - radius, 0) : 10 + radius + 1]).all()
+    assert not np.isnan(w_out[2, 10 + radius + 1 :]).any()
+
+    w_in = w_in[:, :20].astype("float32")
+    w_out = np.zeros_like(w_in)
+    gaussian_filter1d(3)(w_in, w_out)
+    expected = scipy_gaussian_filter1d(w_in[0], 3, mode="reflect")
+    assert np.allclose(w_out[0], expected, rtol=1e-5, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        gaussian_filter1d(10)(w_in, w_out)
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from pygama.dsp import kernel_cache
+from pygama.dsp.errors import DSPFatal
+from pygama.math.units import unit_registry as ureg
+
+n_calls = 0
+
+
+@kernel_cache.cached_kernel
+def _ramp(length, scale=1.0):
+    global n_calls
+    n_calls += 1
+    if length <= 0:
+        raise DSPFatal("The length must be positive")
+    return scale * np.arange(length, dtype=float)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(kernel_cache, "cache_dir", str(tmp_path))
+    kernel_cache.clear()
+    yield tmp_path
+    kernel_cache.clear()
+
+
+def test_cached_kernel(cache):
+    global n_calls
+    n_calls = 0
+    kernel = _ramp(10, scale=2.0)
+    assert np.array_equal(kernel, 2 * np.arange(10))
+    assert not kernel.flags.writeable
+    assert _ramp(10, scale=2.0) is kernel
+    assert n_calls == 1
+
+    # dimensionless quantities are identified by their value
+    assert _ramp(10, scale=(32 * ureg.ns) / (16 * ureg.ns)) is kernel
+    assert n_calls == 1
+    assert not np.array_equal(_ramp(10, scale=3.0), kernel)
+    assert n_calls == 2
+
+    # the arrays are read back from the disk in a new job
+    assert len(os.listdir(cache)) == 2
+    kernel_cache.clear()
+    assert np.array_equal(_ramp(10, scale=2.0), kernel)
+    assert n_calls == 2
+    kernel_cache.clear(disk=True)
+    assert os.listdir(cache) == []
+
+    # errors are not cached
+    for _ in range(2):
+        with pytest.raises(DSPFatal):
+            _ramp(0)
+    assert n_calls == 4
+
+
+def test_kernel_key():
+    a = np.arange(5.0)
+    assert kernel_cache.kernel_key(_ramp, a) == kernel_cache.kernel_key(_ramp, a.copy())
+    assert kernel_cache.kernel_key(_ramp, a) != kernel_cache.kernel_key(_ramp, a + 1)
+    assert kernel_cache.kernel_key(_ramp, a) != kernel_cache.kernel_key(
+        _ramp, a.astype("float32")
+    )
+    assert kernel_cache.kernel_key(_ramp, 5 * ureg.us) != kernel_cache.kernel_key(
+        _ramp, 5 * ureg.ns
+    )
+    assert kernel_cache.kernel_key(_ramp, 5).startswith("ramp-")
+
+
+def test_kernel_key_version(cache, monkeypatch):
+    global n_calls
+    n_calls = 0
+    key = kernel_cache.kernel_key(_ramp, 10)
+    _ramp(10)
+    assert n_calls == 1
+
+    # kernels computed by a different implementation are not reused
+    def _ramp_v2(length, scale=1.0):
+        return scale * np.arange(1, length + 1, dtype=float)
+
+    _ramp_v2.__qualname__ = _ramp.__wrapped__.__qualname__
+    assert kernel_cache.kernel_key(_ramp_v2, 10) != key
+
+    # nor are kernels cached by another pygama release
+    monkeypatch.setattr(kernel_cache.pygama, "__version__", "0.0.0")
+    assert kernel_cache.kernel_key(_ramp, 10) != key
+    kernel_cache.clear()
+    _ramp(10)
+    assert n_calls == 2
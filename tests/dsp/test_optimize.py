@@ -0,0 +1,64 @@
+import numpy as np
+from iminuit import Minuit
+
+from pygama.dsp.processors import (
+    double_pole_zero,
+    optimize_1pz,
+    optimize_2pz,
+    pole_zero,
+)
+
+
+def make_waveforms(n_wfs=8, length=4000, t0=1000):
+    rng = np.random.default_rng(42)
+    t = np.arange(length)
+    amp = rng.uniform(500, 5000, size=(n_wfs, 1))
+    pulse = 0.97 * np.exp(-(t - t0) / 25000) + 0.03 * np.exp(-(t - t0) / 1200)
+    wfs = np.where(t >= t0, amp * pulse, 0) + rng.normal(100, 3, (n_wfs, length))
+    return wfs
+
+
+def slope(func, w_in, pars, beg=1500, end=3900):
+    x = np.arange(beg, end)
+    y = func(w_in - 100, *pars)[beg:end]
+    return np.abs(np.sum(x) * np.sum(y) - len(x) * np.sum(x * y))
+
+
+class Objective:
+    def __init__(self, func, w_in):
+        self.func = func
+        self.w_in = w_in
+
+    def __call__(self, pars):
+        return slope(self.func, self.w_in, pars)
+
+
+def test_optimize_1pz():
+    wfs = make_waveforms()
+    taus = optimize_1pz(wfs, 100.0, 1500.0, 3900.0, 20000.0)
+
+    # compare with a numerical minimization of the same objective
+    for w_in, tau in zip(wfs, taus):
+        m = Minuit(Objective(pole_zero, w_in), [20000.0])
+        m.errordef = Minuit.LEAST_SQUARES
+        m.migrad()
+        assert np.isclose(tau, m.values[0], rtol=1e-6)
+
+    wfs[0, 10] = np.nan
+    assert np.isnan(optimize_1pz(wfs[0], 100.0, 1500.0, 3900.0, 20000.0))
+
+
+def test_optimize_2pz():
+    wfs = make_waveforms()
+    guess = [24000.0, 1000.0, 0.02]
+    tau1, tau2, frac = optimize_2pz(wfs, 100.0, 1500.0, 3900.0, *guess)
+
+    for i, w_in in enumerate(wfs):
+        pars = [tau1[i], tau2[i], frac[i]]
+        assert slope(double_pole_zero, w_in, pars) < 1e-6 * slope(
+            double_pole_zero, w_in, guess
+        )
+
+    # unstable correction for the initial guess, or too few samples: no result
+    assert np.isnan(optimize_2pz(wfs[0], 100.0, 1500.0, 3900.0, 100, 10, 5)).all()
+    assert np.isnan(optimize_2pz(wfs[0], 100.0, 0.0, 2.0, *guess)).all()
@@ -1,7 +1,20 @@
+import gc
+import sys
+
+import numpy as np
 import pytest
+from numba import guvectorize
 
 from pygama import lgdo
-from pygama.dsp.processing_chain import build_processing_chain
+from pygama.dsp.errors import ProcessingChainError
+from pygama.dsp.processing_chain import (
+    ProcessingChain,
+    build_processing_chain,
+    merge_dsp_configs,
+    recipe_hashes,
+)
+from pygama.dsp.processors import fftw
+from pygama.dsp.utils import GUFuncPartial
 
 
 def test_waveform_slicing(geds_raw_tbl):
@@ -45,6 +58,32 @@ def test_processor_none_arg(geds_raw_tbl):
     proc_chain.execute(0, 1)
 
 
+def test_filter_banks(geds_raw_tbl):
+    dsp_config = {
+        "outputs": ["trap_energies", "wf_cusp_bank"],
+        "processors": {
+            "trap_energies": {
+                "function": "trap_pickoff_bank",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "[100, 200]", "[50, 50]", 3000, "trap_energies"],
+                "unit": "ADC",
+            },
+            "wf_cusp_bank": {
+                "function": "cusp_filter_bank",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "wf_cusp_bank([2, 101], 'f')"],
+                "init_args": ["len(waveform)-100", "[500, 1000]", "100", "27460.5"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(geds_raw_tbl, dsp_config)
+    proc_chain.execute(0, 1)
+
+    assert tbl_out["trap_energies"].nda.shape[1:] == (2,)
+    assert tbl_out["wf_cusp_bank"].nda.shape[1:] == (2, 101)
+
+
 def test_processor_kwarg_assignment(geds_raw_tbl):
     dsp_config = {
         "outputs": ["wf_cum"],
@@ -148,3 +187,688 @@ def test_processor_variable_array_output(spms_raw_tbl):
 
     proc_chain, _, _ = build_processing_chain(spms_raw_tbl, dsp_config)
     proc_chain.execute(0, 1)
+
+
+def test_profiling(geds_raw_tbl):
+    dsp_config = {
+        "outputs": ["wf_blsub"],
+        "processors": {
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "baseline", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, _ = build_processing_chain(geds_raw_tbl, dsp_config)
+    with pytest.raises(ProcessingChainError):
+        proc_chain.profile_report()
+
+    proc_chain.enable_profiling()
+    proc_chain.execute(0, 10)
+    report = proc_chain.profile_report()
+
+    assert [p["name"] for p in report["inputs"]] == ["waveform", "baseline"]
+    assert [p["name"] for p in report["outputs"]] == ["wf_blsub"]
+    assert report["processors"][-1]["name"].startswith("bl_subtract")
+    for entry in report["inputs"] + report["processors"] + report["outputs"]:
+        assert entry["calls"] == 1
+        assert entry["time"] >= 0
+        assert entry["bytes"] > 0
+
+
+def test_relink_input_buffers(geds_raw_tbl):
+    dsp_config = {
+        "outputs": ["wf_blsub"],
+        "processors": {
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "baseline", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(geds_raw_tbl, dsp_config)
+
+    new_tbl = lgdo.Table(size=geds_raw_tbl.size)
+    new_tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=geds_raw_tbl["waveform"].t0.nda.copy(),
+            t0_units=geds_raw_tbl["waveform"].t0_units,
+            dt=geds_raw_tbl["waveform"].dt.nda.copy(),
+            dt_units=geds_raw_tbl["waveform"].dt_units,
+            values=geds_raw_tbl["waveform"].values.nda[::-1].copy(),
+            values_units=geds_raw_tbl["waveform"].values_units,
+        ),
+    )
+    new_tbl.add_field("baseline", lgdo.Array(geds_raw_tbl["baseline"].nda[::-1].copy()))
+
+    proc_chain.relink_input_buffers(new_tbl)
+    proc_chain.execute(0, 10)
+    wf_blsub = tbl_out["wf_blsub"].values.nda[:10]
+    assert (
+        wf_blsub
+        == new_tbl["waveform"].values.nda[:10]
+        - new_tbl["baseline"].nda[:10, None].astype("float32")
+    ).all()
+
+    with pytest.raises(ProcessingChainError):
+        proc_chain.relink_input_buffers({"waveform": new_tbl["waveform"]})
+
+
+def test_memory_report(geds_raw_tbl):
+    dsp_config = {
+        "outputs": ["wf_blsub"],
+        "processors": {
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "baseline", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(
+        geds_raw_tbl, dsp_config, block_width=8
+    )
+    report = proc_chain.memory_report()
+
+    assert report["block_width"] == 8
+    assert report["buffer_len"] == geds_raw_tbl.size
+    wf_blsub = tbl_out["wf_blsub"].values.nda
+    variables = {v["name"]: v["bytes"] for v in report["variables"]}
+    assert variables["wf_blsub"] == 8 * wf_blsub.shape[1] * wf_blsub.itemsize
+    assert [b["name"] for b in report["inputs"]] == ["waveform", "baseline"]
+    assert report["outputs"][0]["bytes"] >= wf_blsub.nbytes
+    assert report["processors"] == []
+    assert report["total"] == sum(
+        v["bytes"] for v in report["variables"] + report["inputs"] + report["outputs"]
+    )
+
+
+def test_zero_copy():
+    rng = np.random.default_rng(1234)
+    n_rows = 100
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=np.zeros(n_rows),
+            t0_units="ns",
+            dt=np.full(n_rows, 16.0),
+            dt_units="ns",
+            values=rng.integers(0, 1000, size=(n_rows, 200)).astype("float32"),
+            values_units="ADC",
+        ),
+    )
+    dsp_config = {
+        "outputs": ["bl_mean", "wf_blsub", "wf_trap"],
+        "processors": {
+            "bl_mean, bl_std, bl_slope, bl_intercept": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": [
+                    "waveform[:50]",
+                    "bl_mean",
+                    "bl_std",
+                    "bl_slope",
+                    "bl_intercept",
+                ],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "wf_blsub": {
+                "function": "subtract",
+                "module": "numpy",
+                "args": ["waveform", "bl_mean", "wf_blsub"],
+                "unit": "ADC",
+            },
+            "wf_trap": {
+                "function": "trap_filter",
+                "module": "pygama.dsp.processors",
+                "args": ["wf_blsub", 10, 5, "wf_trap"],
+                "unit": "ADC",
+            },
+        },
+    }
+    wf_in = tbl["waveform"].values.nda.copy()
+
+    outputs = []
+    # also run the block kernel of trap_filter on the buffers
+    for zero_copy, parallel in [(False, False), (True, False), (True, True)]:
+        dsp_config["processors"]["wf_trap"]["parallel"] = parallel
+        proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=16)
+        proc_chain.enable_zero_copy(zero_copy)
+        gc.collect()
+        n_refs = sys.getrefcount(tbl["waveform"].values.nda)
+        # the last block does not fit in the buffers and is copied
+        proc_chain.execute(0, n_rows)
+        # no views of the buffers are kept after execute
+        gc.collect()
+        new_refs = sys.getrefcount(tbl["waveform"].values.nda)
+        assert new_refs == n_refs
+        outputs.append(
+            {
+                "bl_mean": tbl_out["bl_mean"].nda.copy(),
+                "wf_blsub": tbl_out["wf_blsub"].values.nda.copy(),
+                "wf_trap": tbl_out["wf_trap"].values.nda.copy(),
+            }
+        )
+
+    for par in outputs[0]:
+        for out in outputs[1:]:
+            assert np.array_equal(outputs[0][par], out[par], equal_nan=True)
+    assert (tbl["waveform"].values.nda == wf_in).all()
+
+
+def test_vector_of_vectors_io():
+    rng = np.random.default_rng(1234)
+    n_rows = 50
+    lengths = rng.integers(0, 8, size=n_rows)
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "hits",
+        lgdo.VectorOfVectors(
+            flattened_data=lgdo.Array(rng.normal(size=lengths.sum())),
+            cumulative_length=lgdo.Array(np.cumsum(lengths)),
+            attrs={"units": "ns"},
+        ),
+    )
+    dsp_config = {
+        "outputs": ["hits_x2"],
+        "processors": {
+            "hits_x2": {
+                "function": "multiply",
+                "module": "numpy",
+                "args": ["hits", 2, "hits_x2"],
+                "unit": "ns",
+                "lgdo_type": "VectorOfVectors",
+            }
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=16)
+    assert proc_chain.get_variable("hits").shape == (lengths.max(),)
+    proc_chain.execute()
+
+    vov_out = tbl_out["hits_x2"]
+    assert isinstance(vov_out, lgdo.VectorOfVectors)
+    assert vov_out.attrs["units"] == "ns"
+    assert np.array_equal(vov_out.cumulative_length.nda, np.cumsum(lengths))
+    n_data = lengths.sum()
+    assert np.allclose(
+        vov_out.flattened_data.nda[:n_data], 2 * tbl["hits"].flattened_data.nda
+    )
+
+    # NaN inside a vector does not end it
+    tbl["hits"].flattened_data.nda[lengths[0]] = np.nan
+    proc_chain.execute()
+    assert np.array_equal(vov_out.cumulative_length.nda, np.cumsum(lengths))
+    assert np.array_equal(
+        vov_out.flattened_data.nda[:n_data],
+        2 * tbl["hits"].flattened_data.nda,
+        equal_nan=True,
+    )
+
+
+def test_ragged_waveforms():
+    rng = np.random.default_rng(1234)
+    n_rows = 40
+    lengths = rng.choice([300, 500, 800], size=n_rows)
+    wfs = [rng.integers(1000, 1100, size=n).astype("uint16") for n in lengths]
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            values=wfs, dt=16, dt_units="ns", t0=0, t0_units="ns", dtype="uint16"
+        ),
+    )
+    assert isinstance(tbl["waveform"].values, lgdo.VectorOfVectors)
+    dsp_config = {
+        "outputs": ["bl", "wf_blsub"],
+        "processors": {
+            "bl, bl_sig, bl_slope, bl_int": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform[0:100]", "bl", "bl_sig", "bl_slope", "bl_int"],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "wf_blsub": {
+                "function": "subtract",
+                "module": "numpy",
+                "args": ["waveform", "bl", "wf_blsub"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=8)
+    # padded to the longest waveform, in floating point to pad with NaN
+    assert proc_chain.get_variable("waveform").shape == (lengths.max(),)
+    assert proc_chain.get_variable("waveform").dtype == np.float32
+    proc_chain.execute()
+
+    # waveforms computed from ragged waveforms keep their length
+    wf_out = tbl_out["wf_blsub"]
+    assert isinstance(wf_out.values, lgdo.VectorOfVectors)
+    assert np.array_equal(wf_out.values.cumulative_length.nda, np.cumsum(lengths))
+    assert np.allclose(wf_out.dt.nda, 16)
+    for i in [0, 17, n_rows - 1]:
+        assert np.isclose(tbl_out["bl"].nda[i], wfs[i][:100].mean())
+        assert np.allclose(
+            wf_out.values.get_vector(i), wfs[i] - tbl_out["bl"].nda[i], atol=1e-3
+        )
+
+    # waveforms longer than the variable cannot be read
+    tbl["waveform"].values.cumulative_length.nda[0] = lengths.max() + 1
+    with pytest.raises(ProcessingChainError):
+        proc_chain.execute()
+
+
+def test_precision(caplog):
+    rng = np.random.default_rng(1234)
+    n_rows = 32
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=np.zeros(n_rows),
+            t0_units="ns",
+            dt=np.full(n_rows, 16.0),
+            dt_units="ns",
+            values=rng.normal(size=(n_rows, 200)),
+            values_units="ADC",
+        ),
+    )
+    tbl.add_field("baseline", lgdo.Array(rng.normal(size=n_rows)))
+    dsp_config = {
+        "outputs": ["bl_mean", "wf_max", "tp_max"],
+        "precision": "float32",
+        "processors": {
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "baseline", "wf_blsub"],
+                "unit": "ADC",
+            },
+            "bl_mean, bl_std, bl_slope, bl_intercept": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": [
+                    "wf_blsub[:100]",
+                    "bl_mean",
+                    "bl_std",
+                    "bl_slope",
+                    "bl_intercept",
+                ],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "tp_min, tp_max, wf_min, wf_max": {
+                "function": "min_max",
+                "module": "pygama.dsp.processors",
+                "args": ["wf_blsub", "tp_min", "tp_max", "wf_min", "wf_max"],
+                "unit": ["ns", "ns", "ADC", "ADC"],
+            },
+        },
+    }
+    proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config)
+    assert tbl_out.attrs["precision"] == "float32"
+    assert proc_chain.get_variable("waveform").dtype == np.float32
+    proc_chain.execute()
+    for name in dsp_config["outputs"]:
+        assert tbl_out[name].nda.dtype == np.float32
+
+    wfs = tbl["waveform"].values.nda - tbl["baseline"].nda[:, None]
+    assert np.allclose(tbl_out["wf_max"].nda, wfs.max(axis=1), rtol=1e-5)
+    assert np.allclose(tbl_out["bl_mean"].nda, wfs[:, :100].mean(axis=1), atol=1e-5)
+    assert np.array_equal(tbl_out["tp_max"].nda, 16 * wfs.argmax(axis=1))
+
+    # processors without a float32 type signature warn
+    dsp_config["processors"]["wf_blsub"]["args"][2] = "wf_blsub(200, 'd')"
+    with caplog.at_level("WARNING"):
+        build_processing_chain(tbl, dsp_config, precision="float32")
+    assert "computes in float64" in caplog.text
+
+    with pytest.raises(ProcessingChainError):
+        build_processing_chain(tbl, dsp_config, precision="int32")
+
+
+def test_condition():
+    rng = np.random.default_rng(1234)
+    n_rows = 40
+    values = rng.normal(size=(n_rows, 200))
+    values[::3, 100:] += 100
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=np.zeros(n_rows),
+            t0_units="ns",
+            dt=np.full(n_rows, 16.0),
+            dt_units="ns",
+            values=values,
+            values_units="ADC",
+        ),
+    )
+    dsp_config = {
+        "outputs": ["wf_max", "trap_max", "trap_sum", "tp_max"],
+        "processors": {
+            "wf_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["waveform", 1, "wf_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["di->d"]},
+                "unit": "ADC",
+            },
+            "wf_trap": {
+                "function": "trap_norm",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "10*16*ns", "2*16*ns", "wf_trap"],
+                "unit": "ADC",
+            },
+            "trap_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["wf_trap", 1, "trap_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["di->d"]},
+                "unit": "ADC",
+            },
+            "trap_sum": {
+                "function": "add",
+                "module": "numpy",
+                "args": ["trap_max", "wf_max", "trap_sum"],
+                "condition": None,
+                "unit": "ADC",
+            },
+            "tp_max": {
+                "function": "argmax",
+                "module": "numpy",
+                "args": ["wf_trap", 1, "tp_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["di->i"]},
+            },
+        },
+    }
+    proc_chain, _, tbl_ref = build_processing_chain(tbl, dsp_config, block_width=16)
+    proc_chain.execute()
+
+    dsp_config["processors"]["wf_trap"]["condition"] = "wf_max > 50 and wf_max < 1e6"
+    for parallel in (False, True):
+        dsp_config["processors"]["wf_trap"]["parallel"] = parallel
+        proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=16)
+        # the condition is inherited by the processors using wf_trap
+        assert str(proc_chain).count(" if ((wf_max>50) and (wf_max<1000000.0))") == 3
+        proc_chain.execute()
+
+        passed = np.zeros(n_rows, dtype=bool)
+        passed[::3] = True
+        for name in ("trap_max", "tp_max"):
+            assert np.array_equal(tbl_out[name].nda[passed], tbl_ref[name].nda[passed])
+        assert np.isnan(tbl_out["trap_max"].nda[~passed]).all()
+        assert (tbl_out["tp_max"].nda[~passed] == 0).all()
+        assert np.array_equal(tbl_out["wf_max"].nda, tbl_ref["wf_max"].nda)
+        # trap_sum opted out of the condition, and sees the NaNs
+        assert np.isnan(tbl_out["trap_sum"].nda[~passed]).all()
+        assert np.allclose(
+            tbl_out["trap_sum"].nda[passed], tbl_ref["trap_sum"].nda[passed]
+        )
+
+    # conditions need one value per waveform
+    dsp_config["processors"]["wf_trap"]["condition"] = "waveform > 0"
+    with pytest.raises(ProcessingChainError):
+        build_processing_chain(tbl, dsp_config)
+
+
+def test_condition_in_place(monkeypatch):
+    # processors writing their outputs in place (no "->" in their signature)
+    rng = np.random.default_rng(1234)
+    n_rows = 40
+    values = rng.normal(size=(n_rows, 400))
+    values[::3, 200:] += 100
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=0, t0_units="ns", dt=16, dt_units="ns", values=values, values_units="ADC"
+        ),
+    )
+    dsp_config = {
+        "outputs": ["wf_max", "wf_cusp", "wf_presum", "wf_psd"],
+        "processors": {
+            "wf_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["waveform", 1, "wf_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["di->d"]},
+                "unit": "ADC",
+            },
+            "wf_cusp": {
+                "function": "cusp_filter",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "wf_cusp(101, 'f')"],
+                "init_args": ["len(waveform)-100", "10", "1", "1000"],
+                "unit": "ADC",
+            },
+            "wf_presum": {
+                "function": "presum",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "wf_presum(len(waveform)/4, 'd')"],
+                "unit": "ADC",
+            },
+            "wf_psd": {
+                "function": "psd",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "wf_psd"],
+                "init_args": ["waveform", "wf_psd(len(waveform)//2+1, 'd')"],
+            },
+        },
+    }
+    proc_chain, _, tbl_ref = build_processing_chain(tbl, dsp_config, block_width=16)
+    proc_chain.execute()
+
+    passed = np.zeros(n_rows, dtype=bool)
+    passed[::3] = True
+    # the FFTs of psd are computed for the selected waveforms only
+    n_transformed = []
+    sub_block_fft = fftw._SubBlockFFT.__call__
+
+    def counted(self, wf_in):
+        n_transformed.append(len(wf_in))
+        return sub_block_fft(self, wf_in)
+
+    monkeypatch.setattr(fftw._SubBlockFFT, "__call__", counted)
+    for name in ("wf_cusp", "wf_presum", "wf_psd"):
+        dsp_config["processors"][name]["condition"] = "wf_max > 50"
+    proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=16)
+    proc_chain.execute()
+    assert n_transformed[:2] == [6, 5]
+    for name in ("wf_cusp", "wf_presum", "wf_psd"):
+        wf_out = tbl_out[name].nda
+        wf_ref = tbl_ref[name].nda
+        assert np.abs(wf_ref[passed]).max() > 0
+        assert np.allclose(wf_out[passed], wf_ref[passed], rtol=1e-5)
+        assert np.isnan(wf_out[~passed]).all()
+    # the inputs are left untouched
+    assert np.array_equal(tbl_out["wf_max"].nda, tbl_ref["wf_max"].nda)
+
+
+def test_condition_gufunc_partial(monkeypatch):
+    rng = np.random.default_rng(1234)
+    n_rows = 40
+    values = rng.normal(size=(n_rows, 400))
+    values[::3, 200:] += 100
+    tbl = lgdo.Table(size=n_rows)
+    tbl.add_field(
+        "waveform",
+        lgdo.WaveformTable(
+            t0=0, t0_units="ns", dt=16, dt_units="ns", values=values, values_units="ADC"
+        ),
+    )
+    dsp_config = {
+        "outputs": ["wf_max", "wf_gauss"],
+        "processors": {
+            "wf_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["waveform", 1, "wf_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["di->d"]},
+                "unit": "ADC",
+            },
+            "wf_gauss": {
+                "function": "gaussian_filter1d",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "wf_gauss"],
+                "init_args": ["5"],
+                "unit": "ADC",
+            },
+        },
+    }
+    proc_chain, _, tbl_ref = build_processing_chain(tbl, dsp_config, block_width=16)
+    proc_chain.execute()
+
+    # only the selected waveforms are filtered
+    n_filtered = []
+    call = GUFuncPartial.__call__
+
+    def counted(self, w_in, *args, **kwargs):
+        n_filtered.append(len(w_in))
+        return call(self, w_in, *args, **kwargs)
+
+    monkeypatch.setattr(GUFuncPartial, "__call__", counted)
+    passed = np.zeros(n_rows, dtype=bool)
+    passed[::3] = True
+    dsp_config["processors"]["wf_gauss"]["condition"] = "wf_max > 50"
+    proc_chain, _, tbl_out = build_processing_chain(tbl, dsp_config, block_width=16)
+    proc_chain.execute()
+    # 6 and 5 of the waveforms of the first two blocks pass
+    assert n_filtered[:2] == [6, 5]
+    wf_out = tbl_out["wf_gauss"].values.nda
+    wf_ref = tbl_ref["wf_gauss"].values.nda
+    assert np.allclose(wf_out[passed], wf_ref[passed])
+    assert np.isnan(wf_out[~passed]).all()
+
+
+def test_condition_undeclared_in_place():
+    @guvectorize(["void(float64[:], float64[:])"], "(n),(n)", nopython=True)
+    def copy(w_in, w_out):
+        w_out[:] = w_in
+
+    proc_chain = ProcessingChain(block_width=4, buffer_len=4)
+    proc_chain.link_input_buffer("wf", np.zeros((4, 10)))
+    proc_chain.link_input_buffer("energy", np.zeros(4))
+    proc_chain.add_processor(copy, "wf", "wf_copy(10, 'd')")
+    # the processor writes wf_copy, but does not say so
+    with pytest.raises(ProcessingChainError):
+        proc_chain.add_processor(
+            copy, "wf", "wf_copy2(10, 'd')", condition="energy > 0"
+        )
+
+
+def test_merge_dsp_configs():
+    def config(rise):
+        return {
+            "outputs": ["bl", "trap_max"],
+            "processors": {
+                "bl, bl_std, bl_slope, bl_intercept": {
+                    "function": "linear_slope_fit",
+                    "module": "pygama.dsp.processors",
+                    "args": [
+                        "waveform[:100]",
+                        "bl",
+                        "bl_std",
+                        "bl_slope",
+                        "bl_intercept",
+                    ],
+                    "unit": ["ADC", "ADC", "ADC", "ADC"],
+                },
+                "wf_blsub": {
+                    "function": "bl_subtract",
+                    "module": "pygama.dsp.processors",
+                    "args": ["waveform", "bl", "wf_blsub"],
+                    "unit": "ADC",
+                },
+                "wf_trap": {
+                    "function": "trap_norm",
+                    "module": "pygama.dsp.processors",
+                    "args": ["wf_blsub", rise, "db.trap.flat", "wf_trap"],
+                    "defaults": {"db.trap.flat": "2*us"},
+                    "unit": "ADC",
+                },
+                "trap_max": {
+                    "function": "amax",
+                    "module": "numpy",
+                    "args": ["wf_trap", 1, "trap_max"],
+                    "kwargs": {"signature": "(n),()->()", "types": ["fi->f"]},
+                    "unit": "ADC",
+                },
+            },
+        }
+
+    merged, names = merge_dsp_configs(
+        [config("10*us"), config("10*us"), config("8*us"), config("10*us")],
+        [None, None, None, {"trap": {"flat": "1*us"}}],
+    )
+    assert names[0] == names[1] == {"bl": "bl", "trap_max": "trap_max"}
+    assert names[2] == {"bl": "bl", "trap_max": "trap_max_2"}
+    assert names[3] == {"bl": "bl", "trap_max": "trap_max_3"}
+    assert merged["outputs"] == ["bl", "trap_max", "trap_max_2", "trap_max_3"]
+
+    # the baseline processors are shared, the trapezoids are not
+    procs = merged["processors"]
+    assert len(procs) == 8
+    assert procs["wf_trap_2"]["args"] == ["wf_blsub", "8*us", "2*us", "wf_trap_2"]
+    assert procs["wf_trap_3"]["args"] == ["wf_blsub", "10*us", "1*us", "wf_trap_3"]
+    assert procs["trap_max_3"]["args"] == ["wf_trap_3", 1, "trap_max_3"]
+
+
+def test_recipe_hashes():
+    dsp_config = {
+        "outputs": ["trap_max", "bl_std"],
+        "processors": {
+            "bl_mean, bl_std, bl_slope, bl_intercept": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": [
+                    "waveform[:100]",
+                    "bl_mean",
+                    "bl_std",
+                    "bl_slope",
+                    "bl_intercept",
+                ],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "wf_blsub": {
+                "function": "bl_subtract",
+                "module": "pygama.dsp.processors",
+                "args": ["waveform", "bl_mean", "wf_blsub"],
+                "unit": "ADC",
+            },
+            "wf_trap": {
+                "function": "trap_norm",
+                "module": "pygama.dsp.processors",
+                "args": ["wf_blsub", "db.trap.rise", "2*us", "wf_trap"],
+                "defaults": {"db.trap.rise": "10*us"},
+                "unit": "ADC",
+            },
+            "trap_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["wf_trap", 1, "trap_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["fi->f"]},
+                "unit": "ADC",
+            },
+        },
+    }
+    hashes = recipe_hashes(dsp_config)
+    assert hashes["bl_mean"] == hashes["bl_std"]
+    assert recipe_hashes(dsp_config, {"trap": {"rise": "10*us"}}) == hashes
+
+    # a change propagates to everything downstream only
+    new_hashes = recipe_hashes(dsp_config, {"trap": {"rise": "8*us"}})
+    assert new_hashes["wf_blsub"] == hashes["wf_blsub"]
+    assert new_hashes["wf_trap"] != hashes["wf_trap"]
+    assert new_hashes["trap_max"] != hashes["trap_max"]
+
+    dsp_config["processors"]["wf_blsub"]["args"][1] = "bl_intercept"
+    new_hashes = recipe_hashes(dsp_config)
+    assert new_hashes["bl_std"] == hashes["bl_std"]
+    assert new_hashes["trap_max"] != hashes["trap_max"]
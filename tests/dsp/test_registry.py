@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from numba import guvectorize
+
+import pygama.dsp.processors
+from pygama.dsp import registry
+
+
+def test_all_processors_registered():
+    for name in pygama.dsp.processors.__all__:
+        info = registry.get_processor(name)
+        assert info.func is getattr(pygama.dsp.processors, name)
+        assert registry.processor_info(info.func) is info
+
+
+def test_processor_info():
+    info = registry.get_processor("trap_filter")
+    assert info.module == "pygama.dsp.processors.trap_filters"
+    assert info.signature == "(n),(),()->(n)"
+    assert info.types == ["fii->f", "dii->d"]
+    assert info.whole_waveform and not info.elementwise
+    assert info.cost == "n" and info.fusible
+    assert info.block_kernel is not None
+
+    info = registry.get_processor("cusp_filter")
+    assert info.factory and info.signature is None and info.types == []
+    assert info.cost == "n log n" and info.block_kernel is None
+
+    with pytest.raises(KeyError):
+        registry.get_processor("no_such_processor")
+
+
+def test_register_processor(monkeypatch):
+    registry.get_processor("trap_filter")
+    monkeypatch.setattr(registry, "registry", dict(registry.registry))
+    monkeypatch.setattr(registry, "_by_id", dict(registry._by_id))
+
+    @registry.register_processor
+    @guvectorize(["void(float64, float64[:])"], "()->()", nopython=True)
+    def double(a, out):
+        out[0] = 2 * a
+
+    info = registry.get_processor("double")
+    assert info.elementwise and not info.whole_waveform
+    assert info.cost == "1" and not info.fusible
+    assert registry.get_function("double", __name__) is double
+
+    # processor names are unique
+    with pytest.raises(ValueError):
+        registry.register_processor(name="trap_filter")(double)
+
+    # processors writing their outputs in place declare them
+    @guvectorize(["void(float64[:], float64[:])"], "(n),(n)", nopython=True)
+    def double_in_place(w_in, w_out):
+        w_out[:] = 2 * w_in
+
+    with pytest.raises(ValueError):
+        registry.register_processor(double_in_place)
+    registry.register_processor(in_place=(1,))(double_in_place)
+    assert registry.get_processor("double_in_place").in_place == (1,)
+    assert registry.get_processor("presum").in_place == (1,)
+
+
+def test_get_function():
+    assert registry.get_function("add", "numpy") is np.add
+    assert (
+        registry.get_function("pole_zero", "pygama.dsp.processors")
+        is pygama.dsp.processors.pole_zero
+    )
+    assert (
+        registry.get_function("pole_zero", "pygama.dsp.processors.pole_zero")
+        is pygama.dsp.processors.pole_zero
+    )
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import (
+    interpolated_time_point_thresh,
+    interpolating_upsampler,
+    time_point_thresh,
+)
+
+
+@pytest.mark.parametrize("mode", ["l", "h", "s"])
+def test_interpolated_time_point_thresh(mode):
+    rng = np.random.default_rng(1234)
+    t = np.arange(300)
+    t_rise = 150 + rng.uniform(-20, 20, size=(16, 1))
+    wfs = 1 / (1 + np.exp(-(t - t_rise) / rng.uniform(1, 5, size=(16, 1))))
+    wfs += rng.normal(0, 0.01, size=wfs.shape)
+    wfs[3, 10] = np.nan
+
+    t_out = np.zeros(16)
+    interpolated_time_point_thresh(wfs, 0.5, 100, 1, np.int8(ord(mode)), t_out)
+
+    # same crossing as on the upsampled waveform, to its sampling period
+    upsample = 100
+    wfs_up = np.zeros((16, 300 * upsample))
+    interpolating_upsampler(wfs, np.int8(ord(mode)), wfs_up)
+    t_up = np.zeros(16)
+    time_point_thresh(wfs_up, 0.5, 100 * upsample, 1, t_up)
+    assert np.isnan(t_out[3]) and np.isnan(t_up[3])
+    assert ((t_out - t_up / upsample)[t_up >= 0] <= 1 / upsample).all()
+    assert ((t_out - t_up / upsample)[t_up >= 0] > 0).all()
+
+    # the first crossing is found walking backward too
+    t_back = np.zeros(16)
+    interpolated_time_point_thresh(wfs, 0.5, 250, 0, np.int8(ord(mode)), t_back)
+    assert np.allclose(t_back, t_out, equal_nan=True)
+
+
+def test_interpolated_time_point_thresh_errors():
+    t_out = np.zeros(1)
+    interpolated_time_point_thresh(np.zeros(10), 1, 0, 1, np.int8(ord("s")), t_out)
+    assert np.isnan(t_out[0])
+    with pytest.raises(DSPFatal):
+        interpolated_time_point_thresh(
+            np.arange(10.0), 5, 0, 1, np.int8(ord("x")), t_out
+        )
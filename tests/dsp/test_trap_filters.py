@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import (
+    trap_filter,
+    trap_filter_bank,
+    trap_pickoff,
+    trap_pickoff_bank,
+)
+
+
+def test_trap_filter_bank():
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(4, 1000))
+    w_in[2, 10] = np.nan
+    rise = np.array([10, 20, 50], dtype="int32")
+    flat = np.array([5, 0, 30], dtype="int32")
+
+    w_out = trap_filter_bank(w_in, rise, flat)
+    assert w_out.shape == (4, 3, 1000)
+
+    for j in range(3):
+        expected = trap_filter(w_in, rise[j], flat[j])
+        assert np.allclose(w_out[:, j], expected, equal_nan=True)
+    assert np.isnan(w_out[2]).all()
+
+    with pytest.raises(DSPFatal):
+        trap_filter_bank(w_in, np.array([600], "int32"), np.array([0], "int32"))
+
+
+def test_trap_pickoff_bank():
+    rng = np.random.default_rng(1234)
+    w_in = rng.normal(size=(4, 1000))
+    rise = np.array([10, 20, 50, 400], dtype="int32")
+    flat = np.array([5, 0, 30, 100], dtype="int32")
+
+    a_out = trap_pickoff_bank(w_in, rise, flat, 500.0)
+    for j in range(4):
+        expected = trap_pickoff(w_in, rise[j], flat[j], 500.0)
+        assert np.allclose(a_out[:, j], expected, equal_nan=True)
+    # the trapezoid does not fit before the pick-off index
+    assert np.isnan(a_out[:, 3]).all()
@@ -1,6 +1,89 @@
-from pygama.dsp.utils import numba_defaults
+import numpy as np
+import pytest
+from numba import guvectorize
+
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import bl_subtract, time_point_thresh, trap_filter
+from pygama.dsp.registry import processor_info
+from pygama.dsp.utils import GUFuncPartial, ParallelGUFunc, numba_defaults
 
 
 def test_numba_defaults_loading():
     numba_defaults.cache = False
     numba_defaults.boundscheck = True
+    numba_defaults.parallel = True
+    # not a Numba option
+    assert "parallel" not in dict(numba_defaults)
+    numba_defaults.parallel = False
+
+
+def test_gufunc_partial():
+    @guvectorize(
+        ["void(float64[:], float32[:], float32[:])"],
+        "(k),(n)->(n)",
+        nopython=True,
+    )
+    def scale(factors, w_in, w_out):
+        w_out[:] = w_in * factors[0]
+
+    scale_by_2 = GUFuncPartial(scale, np.array([2.0]), name="scale_by_2")
+    assert scale_by_2.__name__ == "scale_by_2"
+    assert scale_by_2.signature == "(n)->(n)"
+    assert scale_by_2.types == ["f->f"]
+    assert scale_by_2.nin == 1 and scale_by_2.nout == 1
+
+    w_in = np.arange(4, dtype="float32")
+    w_out = np.zeros_like(w_in)
+    scale_by_2(w_in, w_out)
+    assert (w_out == 2 * w_in).all()
+    assert scale_by_2.row_wise and scale_by_2.in_place == ()
+
+    # the arguments written in place must be declared
+    @guvectorize(
+        ["void(float64[:], float32[:], float32[:])"],
+        "(k),(n),(n)",
+        nopython=True,
+    )
+    def in_place_scale(factors, w_in, w_out):
+        w_out[:] = w_in * factors[0]
+
+    with pytest.raises(ValueError):
+        GUFuncPartial(in_place_scale, np.array([2.0]))
+    scale_by_2 = GUFuncPartial(in_place_scale, np.array([2.0]), in_place=(1,))
+    assert scale_by_2.signature == "(n),(n)" and scale_by_2.in_place == (1,)
+
+
+def test_parallel_gufunc():
+    rng = np.random.default_rng(1234)
+    w_in = rng.integers(0, 1000, size=(2, 8, 100)).astype("uint16")
+    baseline = rng.integers(0, 1000, size=(2, 8)).astype("uint16")
+
+    # inputs are broadcast and cast like the gufunc does
+    par_bl_subtract = ParallelGUFunc(
+        bl_subtract, processor_info(bl_subtract).block_kernel, dtypes=["f", "f", "f"]
+    )
+    assert par_bl_subtract.signature == bl_subtract.signature
+    w_out = np.zeros(w_in.shape, "float32")
+    par_bl_subtract(w_in, baseline, w_out)
+    assert np.array_equal(w_out, bl_subtract(w_in, baseline).astype("float32"))
+
+    par_trap_filter = ParallelGUFunc(
+        trap_filter,
+        processor_info(trap_filter).block_kernel,
+        dtypes=["d", "i", "i", "d"],
+    )
+    w_trap = np.zeros(w_out.shape)
+    par_trap_filter(w_out, np.int32(10), np.int32(5), w_trap)
+    assert np.allclose(w_trap, trap_filter(w_out.astype("d"), 10, 5))
+
+    par_time_point_thresh = ParallelGUFunc(
+        time_point_thresh, processor_info(time_point_thresh).block_kernel
+    )
+    t_out = np.zeros(w_trap.shape[:-1])
+    par_time_point_thresh(w_trap, 0.0, 50.0, 0.0, t_out)
+    assert np.array_equal(
+        t_out, time_point_thresh(w_trap, 0.0, 50.0, 0.0), equal_nan=True
+    )
+
+    with pytest.raises(DSPFatal):
+        par_trap_filter(w_out, np.int32(-1), np.int32(5), w_trap)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from pygama import lgdo
+from pygama.dsp.errors import DSPFatal
+from pygama.dsp.processors import wiener_filter
+
+
+def test_wiener_filter(tmp_path):
+    rng = np.random.default_rng(1234)
+    t = np.arange(500)
+    superpulse = np.where(t > 100, np.exp(-(t - 100) / 50), 0)
+    noise_wf = rng.normal(size=500)
+
+    f_wiener = str(tmp_path / "wiener.lh5")
+    store = lgdo.LH5Store()
+    store.write_object(
+        lgdo.Array(superpulse), "superpulse", f_wiener, group="spms/processed"
+    )
+    store.write_object(
+        lgdo.Array(noise_wf), "noise_wf", f_wiener, group="spms/processed"
+    )
+
+    fft_w_in = np.fft.fft(rng.normal(size=(3, 500)))
+    fft_w_in[1, 10] = np.nan
+    fft_w_out = np.zeros_like(fft_w_in)
+    wiener_filter([f_wiener])(fft_w_in, fft_w_out)
+
+    fft_superpulse = np.fft.fft(superpulse)
+    delta = np.zeros(500)
+    delta[np.argmax(superpulse)] = np.amax(superpulse)
+    fft_psf = fft_superpulse / np.fft.fft(delta)
+    w_filter = np.conj(fft_psf) / (
+        np.abs(fft_psf) ** 2
+        + np.abs(np.fft.fft(noise_wf)) ** 2 / np.abs(fft_superpulse) ** 2
+    )
+    assert np.allclose(fft_w_out[[0, 2]], fft_w_in[[0, 2]] * w_filter)
+    assert np.isnan(fft_w_out[1]).all()
+
+    with pytest.raises(DSPFatal):
+        wiener_filter([f_wiener])(fft_w_in[:, :100], fft_w_out[:, :100])
@@ -61,3 +61,11 @@ def test_init():
 
     wft = WaveformTable(t0=[1, 1, 1], dt=[2, 2, 2], wf_len=1000, dtype=np.float32)
     assert wft.values.nda.dtype == np.float32
+
+    wft = WaveformTable(
+        values=[np.zeros(3), np.ones(5), np.full(2, 2)], dtype=np.uint16
+    )
+    assert isinstance(wft.values, lgdo.VectorOfVectors)
+    assert wft.values.dtype == np.uint16
+    assert (wft.values.cumulative_length.nda == [3, 8, 10]).all()
+    assert (wft.values.get_vector(1) == np.ones(5)).all()
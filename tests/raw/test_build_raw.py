@@ -1,8 +1,10 @@
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
+from pygama.dsp import build_dsp
 from pygama.lgdo.lh5_store import LH5Store, ls
 from pygama.raw import build_raw
 
@@ -158,3 +160,73 @@ def test_build_raw_orca_sis3316(lgnd_test_data):
     )
 
     assert os.path.exists(out_file)
+
+
+def test_build_raw_dsp(lgnd_test_data, tmp_path):
+    in_stream = lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio")
+    out_spec = {
+        "FCEventDecoder": {
+            "ch{key}": {
+                "key_list": [[0, 6]],
+                "out_stream": f"{tmp_path}/raw.lh5:{{name}}",
+                "out_name": "raw",
+            }
+        }
+    }
+    dsp_config = {
+        "outputs": ["bl_mean", "wf_max"],
+        "processors": {
+            "bl_mean, bl_std, bl_slope, bl_intercept": {
+                "function": "linear_slope_fit",
+                "module": "pygama.dsp.processors",
+                "args": [
+                    "waveform[:100]",
+                    "bl_mean",
+                    "bl_std",
+                    "bl_slope",
+                    "bl_intercept",
+                ],
+                "unit": ["ADC", "ADC", "ADC", "ADC"],
+            },
+            "wf_max": {
+                "function": "amax",
+                "module": "numpy",
+                "args": ["waveform", 1, "wf_max"],
+                "kwargs": {"signature": "(n),()->()", "types": ["fi->f"]},
+                "unit": "ADC",
+            },
+        },
+    }
+
+    # DSP-tier data streamed from the raw buffers is the same as that
+    # processed from the raw-tier file
+    build_raw(
+        in_stream,
+        out_spec=out_spec,
+        buffer_size=100,
+        overwrite=True,
+        dsp_config=dsp_config,
+        dsp_out_spec=f"{tmp_path}/dsp.lh5",
+    )
+    build_dsp(f"{tmp_path}/raw.lh5", f"{tmp_path}/ref.lh5", dsp_config)
+    assert ls(f"{tmp_path}/dsp.lh5") == ls(f"{tmp_path}/ref.lh5")
+
+    store = LH5Store()
+    for ch in ls(f"{tmp_path}/ref.lh5"):
+        if ch == "dsp_info":
+            continue
+        dsp, _ = store.read_object(f"{ch}/dsp", f"{tmp_path}/dsp.lh5")
+        ref, _ = store.read_object(f"{ch}/dsp", f"{tmp_path}/ref.lh5")
+        for par in ref.keys():
+            assert np.array_equal(dsp[par].nda, ref[par].nda, equal_nan=True)
+
+    # only write the DSP-tier data
+    build_raw(
+        in_stream,
+        out_spec=f"{tmp_path}/raw_only.lh5",
+        overwrite=True,
+        dsp_config=dsp_config,
+        write_raw=False,
+    )
+    assert os.path.exists(f"{tmp_path}/raw_only_dsp.lh5")
+    assert not os.path.exists(f"{tmp_path}/raw_only.lh5")
@@ -0,0 +1,46 @@
+import numpy as np
+
+from pygama import lgdo
+from pygama.raw.data_decoder import DataDecoder
+
+
+class WaveformDecoder(DataDecoder):
+    def __init__(self, wf_len) -> None:
+        self.decoded_values = {
+            "waveform": {
+                "dtype": "uint16",
+                "datatype": "waveform",
+                "wf_len": wf_len,
+                "dt": 16,
+                "dt_units": "ns",
+                "t0_units": "ns",
+            }
+        }
+        super().__init__()
+
+
+def test_make_lgdo_waveforms():
+    wfs = [np.arange(n, dtype="uint16") for n in [10, 30, 0, 20]]
+
+    decoder = WaveformDecoder(wf_len=20)
+    tbl = decoder.make_lgdo(size=4)
+    assert isinstance(tbl["waveform"].values, lgdo.ArrayOfEqualSizedArrays)
+    # samples of previous events must not be left in the rows
+    tbl["waveform"].values.nda[:] = 999
+    for i, wf in enumerate(wfs):
+        decoder.put_waveform(tbl["waveform"], i, wf)
+    nda = tbl["waveform"].values.nda
+    assert np.array_equal(nda[0], np.concatenate([wfs[0], np.zeros(10)]))
+    assert np.array_equal(nda[1], wfs[1][:20])
+    assert np.array_equal(nda[2], np.zeros(20))
+    assert np.array_equal(nda[3], wfs[3])
+
+    # waveforms of varying length are stored with their own length
+    decoder = WaveformDecoder(wf_len=None)
+    tbl = decoder.make_lgdo(size=4)
+    assert isinstance(tbl["waveform"].values, lgdo.VectorOfVectors)
+    assert tbl["waveform"].dt_units == "ns"
+    for i, wf in enumerate(wfs):
+        decoder.put_waveform(tbl["waveform"], i, wf)
+    for i, wf in enumerate(wfs):
+        assert np.array_equal(tbl["waveform"].values.get_vector(i), wf)
@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# modules that are expensive to import and must only be loaded when needed
+heavy_modules = [
+    "numba",
+    "iminuit",
+    "matplotlib",
+    "pyfftw",
+    "pywt",
+    "sklearn",
+    "pygama.dsp.processing_chain",
+    "pygama.dsp.processors.fftw",
+]
+
+
+def loaded_modules(code, modules=heavy_modules):
+    """Run `code` in a fresh interpreter and return which of `modules` it
+    loaded."""
+    out = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys\n{code}\n"
+            f"print(json.dumps([m for m in {modules} if m in sys.modules]))",
+        ]
+    )
+    return json.loads(out.decode().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import pygama.cli",
+        "import pygama.dsp",
+        "import pygama.dsp.processors",
+    ],
+)
+def test_lazy_imports(code):
+    assert loaded_modules(code) == []
+
+
+def test_cli_does_not_import_dsp():
+    assert loaded_modules("import pygama.cli", ["pygama.dsp"]) == []
+
+
+def test_processors_loaded_on_access():
+    assert loaded_modules("from pygama.dsp.processors import trap_filter") == ["numba"]
+    assert loaded_modules("from pygama.dsp.processors import dft") == [
+        "pygama.dsp.processors.fftw"
+    ]
+    assert "pygama.dsp.processing_chain" in loaded_modules(
+        "from pygama.dsp import build_dsp"
+    )
+
+
+def import_time(module):
+    """Cumulative time in seconds to import `module` in a fresh interpreter,
+    as reported by ``python -X importtime`` (best of three runs)."""
+    times = []
+    for _ in range(3):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            check=True,
+        )
+        for line in out.stderr.decode().splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = [f.strip() for f in line.split(":", 1)[-1].split("|")]
+            if len(fields) == 3 and fields[2] == module:
+                times.append(int(fields[1]) / 1e6)
+    return min(times)
+
+
+@pytest.mark.parametrize("module", ["pygama.cli", "pygama.dsp"])
+def test_import_time(module):
+    # compared with the processing chain and its dependencies (numba, scipy,
+    # ...) timed on the same machine, so that the test does not depend on its
+    # speed: this takes about a tenth of the time, and about as long if they
+    # are imported eagerly
+    assert import_time(module) < 0.5 * import_time("pygama.dsp.processing_chain")